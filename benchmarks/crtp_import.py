@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Benchmark the time it takes to import cflib.crtp, and to load the drivers,
+in a fresh interpreter. Each case is run several times and the best and the
+median times are reported.
+
+Usage: python benchmarks/crtp_import.py [-n <runs>]
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = []
+
+import os
+import sys
+import argparse
+import subprocess
+
+LIB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib")
+
+# Code run in a fresh interpreter for each case, it prints the elapsed time
+CASES = [("import cflib.crtp",
+          "import cflib.crtp"),
+         ("import + udp:// driver",
+          "import cflib.crtp\n"
+          "cflib.crtp.init_drivers()\n"
+          "cflib.crtp._get_driver('udp')"),
+         ("import + all drivers",
+          "import cflib.crtp\n"
+          "cflib.crtp.init_drivers(enable_debug_driver=True)\n"
+          "cflib.crtp._loaded_drivers()")]
+
+TEMPLATE = """
+import sys, time
+sys.path.insert(0, %r)
+start = time.time()
+%s
+print time.time() - start
+"""
+
+
+def run_case(code, runs):
+    """Run the code in runs fresh interpreters, return the times in s"""
+    times = []
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, "-c",
+                                       TEMPLATE % (LIB, code)])
+        times.append(float(out.strip().splitlines()[-1]))
+    return sorted(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the import "
+                                     "time of cflib.crtp")
+    parser.add_argument("-n", "--runs", type=int, default=10,
+                        help="Number of runs per case")
+    args = parser.parse_args()
+
+    print "%-28s %10s %10s" % ("Case", "Best (ms)", "Median (ms)")
+    for (name, code) in CASES:
+        try:
+            times = run_case(code, args.runs)
+        except subprocess.CalledProcessError:
+            print "%-28s %21s" % (name, "failed")
+            continue
+        print "%-28s %10.1f %10.1f" % (name, times[0] * 1000,
+                                       times[len(times) / 2] * 1000)
+
+if __name__ == "__main__":
+    main()
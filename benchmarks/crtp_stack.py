@@ -0,0 +1,821 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+
+"""
+Benchmark the CRTP stack end to end without any hardware. The link is either
+the DebugDriver, a RadioDriver on top of a Crazyradio with a mocked USB
+handle echoing the packets back, a UdpDriver talking to a UdpGateway on the
+loopback interface or a SerialDriver on a pty echoing the frames. The
+link_process_jitter case also runs the DebugDriver in a CrazyflieProcess.
+
+The results are written as JSON, to stdout or to the file given with -o, so
+that they can be compared between versions.
+
+Usage: python benchmarks/crtp_stack.py [-o <file>] [-n <scale>] [<case> ...]
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = []
+
+import os
+import sys
+import json
+import time
+import shutil
+import struct
+import logging
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+from array import array
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+LIB = os.path.join(ROOT, "lib")
+# Same layout as when running the client: sys.path[0] is the install folder
+# and sys.path[1] the config folder
+CONFIG_DIR = tempfile.mkdtemp(prefix="cfbench")
+sys.path[0:0] = [LIB, CONFIG_DIR]
+
+from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
+
+# Number of times each timed loop is repeated, the best run is kept
+REPEAT = 3
+
+
+def _timeit(func, iterations):
+    """Return the stats of the best of REPEAT runs of func(iterations)"""
+    best = None
+    for _ in range(REPEAT):
+        start = time.time()
+        func(iterations)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    best = max(best, 1e-9)
+    return {"iterations": iterations,
+            "seconds": best,
+            "per_second": iterations / best,
+            "us_per_op": best * 1e6 / iterations}
+
+
+def _summary(times):
+    """Return the stats of a list of durations in seconds"""
+    times = sorted(times)
+    return {"runs": len(times),
+            "best_ms": times[0] * 1000,
+            "median_ms": times[len(times) / 2] * 1000,
+            "worst_ms": times[-1] * 1000}
+
+
+def bench_packet_encode(scale):
+    """Build a commander set-point packet"""
+    def run(n):
+        for _ in xrange(n):
+            pk = CRTPPacket()
+            pk.port = CRTPPort.COMMANDER
+            pk.data = struct.pack('<fffH', 1.0, -2.0, 3.0, 40000)
+            pk.header
+    return _timeit(run, 20000 * scale)
+
+
+def bench_packet_decode(scale):
+    """Create a packet from raw radio data and read its fields"""
+    raw = [0x52, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]
+
+    def run(n):
+        for _ in xrange(n):
+            pk = CRTPPacket(raw[0], raw[1:])
+            (pk.port, pk.channel, pk.datal)
+    return _timeit(run, 20000 * scale)
+
+
+class _EndOfPackets(Exception):
+    pass
+
+
+class _ListLink():
+    """Link returning packets from a list, used to drive the dispatch loop"""
+    def __init__(self, packets):
+        self._packets = iter(packets)
+
+    def receive_packet(self, wait=0):
+        try:
+            return next(self._packets)
+        except StopIteration:
+            raise _EndOfPackets()
+
+
+def bench_incoming_dispatch(scale):
+    """Dispatch packets on three ports to the registered callbacks"""
+    from cflib.crazyflie import _IncomingPacketHandler
+    from cflib.utils.callbacks import Caller
+
+    class _Cf():
+        receivedPacket = Caller()
+        link = None
+
+    cf = _Cf()
+    handler = _IncomingPacketHandler(cf)
+    counter = [0]
+
+    def count(pk):
+        counter[0] += 1
+    for port in (CRTPPort.CONSOLE, CRTPPort.PARAM, CRTPPort.LOGGING):
+        handler.add_port_callback(port, count)
+    cf.receivedPacket.add_callback(lambda pk: None)
+    packets = [CRTPPacket(h << 4, [1, 2, 3, 4]) for h in (0, 2, 5)] * 100
+
+    def run(n):
+        cf.link = _ListLink(packets * (n / len(packets)))
+        try:
+            handler.run()
+        except _EndOfPackets:
+            pass
+    return _timeit(run, len(packets) * 30 * scale)
+
+
+def bench_incoming_dispatch_profiled(scale):
+    """
+    The incoming_dispatch case with the callback profiling enabled, with the
+    slowest callbacks of the profiling report
+    """
+    from cflib.utils import callbacks
+    callbacks.reset_profiling()
+    callbacks.enable_profiling()
+    try:
+        result = bench_incoming_dispatch(scale)
+    finally:
+        callbacks.enable_profiling(False)
+    result["report"] = callbacks.get_report()[:3]
+    callbacks.reset_profiling()
+    return result
+
+
+def bench_unpack_log_data(scale):
+    """Unpack a log packet with 6 variables of different types"""
+    from cflib.crazyflie.log import LogConfig
+    conf = LogConfig("bench", 10)
+    for (name, fetch_as) in [("stabilizer.roll", "float"),
+                             ("stabilizer.pitch", "float"),
+                             ("stabilizer.yaw", "float"),
+                             ("stabilizer.thrust", "uint16_t"),
+                             ("pm.vbat", "FP16"),
+                             ("motor.m1", "int32_t")]:
+        conf.add_variable(name, fetch_as)
+    data = struct.pack("<fffHhi", 1.0, 2.0, 3.0, 4, 5, 6)
+    conf.data_received_cb.add_callback(lambda ts, data, conf: None)
+
+    def run(n):
+        for i in xrange(n):
+            conf.unpack_log_data(data, i)
+    return _timeit(run, 10000 * scale)
+
+
+def bench_unpack_log_data_plan(scale):
+    """Unpack the same log packet with the LogBlockPlan of an added block"""
+    from cflib.crazyflie.log import LogConfig, LogTocElement, LogBlockPlan
+    from cflib.crazyflie.toc import Toc
+    conf = LogConfig("bench", 10)
+    toc = Toc()
+    for (ident, (name, fetch_as)) in enumerate([("stabilizer.roll", "float"),
+                                                ("stabilizer.pitch", "float"),
+                                                ("stabilizer.yaw", "float"),
+                                                ("stabilizer.thrust",
+                                                 "uint16_t"),
+                                                ("pm.vbat", "FP16"),
+                                                ("motor.m1", "int32_t")]):
+        conf.add_variable(name, fetch_as)
+        toc.add_element(LogTocElement(struct.pack(
+            "<BB", ident, LogTocElement.get_id_from_cstring(fetch_as)) +
+            name.replace(".", "\0") + "\0"))
+    conf.plan = LogBlockPlan(conf.variables, toc)
+    data = struct.pack("<fffHhi", 1.0, 2.0, 3.0, 4, 5, 6)
+    conf.data_received_cb.add_callback(lambda ts, data, conf: None)
+
+    def run(n):
+        for i in xrange(n):
+            conf.unpack_log_data(data, i)
+    return _timeit(run, 10000 * scale)
+
+
+def _connect(cf, uri="debug://0/0", timeout=10):
+    """Open the link and return the time until the setup is finished"""
+    done = threading.Event()
+
+    def finished(uri):
+        done.set()
+    cf.connectSetupFinished.add_callback(finished)
+    start = time.time()
+    cf.open_link(uri)
+    done.wait(timeout)
+    elapsed = time.time() - start
+    cf.connectSetupFinished.remove_callback(finished)
+    if not done.is_set():
+        raise Exception("Connection setup to %s timed out" % uri)
+    return elapsed
+
+
+def bench_toc_fetch(scale):
+    """Connect to the debug driver and fetch the log and param TOCs"""
+    from cflib.crazyflie import Crazyflie
+    times = []
+    for _ in range(5 * scale):
+        cf = Crazyflie()
+        times.append(_connect(cf))
+        cf.close_link()
+    return _summary(times)
+
+
+def bench_toc_fetch_cached(scale):
+    """Connect to the debug driver with the TOCs found in the TocCache"""
+    from cflib.crazyflie import Crazyflie
+    cache = os.path.join(CONFIG_DIR, "cache")
+    # Fill the cache
+    cf = Crazyflie(rw_cache=cache)
+    _connect(cf)
+    cf.close_link()
+    times = []
+    for _ in range(5 * scale):
+        cf = Crazyflie(rw_cache=cache)
+        times.append(_connect(cf))
+        cf.close_link()
+    return _summary(times)
+
+
+def bench_reconnect_resume(scale):
+    """
+    Resume a connection to the debug driver after a simulated link loss,
+    with a started log block that has to be re-created
+    """
+    from cflib.crazyflie import Crazyflie
+    from cflib.crazyflie.log import LogConfig
+    cf = Crazyflie()
+    cf.set_resume_enabled(True)
+    _connect(cf)
+    block = LogConfig("bench", 10)
+    block.add_variable("stabilizer.roll", "float")
+    cf.log.add_config(block)
+    block.start()
+    resumed = threading.Event()
+    cf.connectionResumed.add_callback(lambda uri: resumed.set())
+    times = []
+    try:
+        for _ in range(20 * scale):
+            cf._link_error_cb("Simulated link loss")
+            resumed.clear()
+            start = time.time()
+            cf.open_link("debug://0/0")
+            if not resumed.wait(5):
+                raise Exception("The connection was not resumed")
+            times.append(time.time() - start)
+        return _summary(times)
+    finally:
+        cf.close_link()
+
+def bench_log_setup(scale):
+    """
+    Set up eight log blocks at once on the debug driver, the blocks are too
+    large for a single create command
+    """
+    from cflib.crazyflie import Crazyflie
+    from cflib.crazyflie.log import LogConfig
+    names = ["imu.gyro_x", "imu.gyro_y", "imu.gyro_z", "imu.acc_x",
+             "imu.acc_y", "imu.acc_z", "stabilizer.roll", "stabilizer.pitch",
+             "stabilizer.yaw", "pm.vbat", "motor.m1", "motor.m2",
+             "motor.m3", "motor.m4", "stabilizer.thrust", "baro.asl"]
+    cf = Crazyflie()
+    _connect(cf)
+    times = []
+    try:
+        for _ in range(5 * scale):
+            blocks = []
+            for i in range(8):
+                block = LogConfig("bench%d" % i, 100)
+                for name in names:
+                    block.add_variable(name, "uint8_t")
+                cf.log.add_config(block)
+                blocks.append(block)
+            setup = cf.log.start_configs(blocks)
+            if not setup.wait(5):
+                raise Exception("The log setup timed out")
+            if setup.failed:
+                raise Exception("Log setup failed: %s" % setup.failed[0][1])
+            times.append(setup.duration)
+            for block in blocks:
+                block.delete()
+        return _summary(times)
+    finally:
+        cf.close_link()
+
+
+def _gui_load(stop):
+    """Keep the interpreter busy like a redrawing GUI until stop is set"""
+    import random
+    points = [random.random() for _ in xrange(100000)]
+    while not stop.is_set():
+        # Python code, then a long call holding the interpreter lock
+        sum(x * 2.0 for x in points[:20000])
+        sorted(points)
+
+
+def _log_jitter(cf, received, duration):
+    """
+    Return the statistics of the intervals between the samples of a 10 ms
+    log block, received is the Caller called with their receive time
+    """
+    from cflib.crazyflie.log import LogConfig
+    block = LogConfig("jitter", 10)
+    block.add_variable("stabilizer.roll", "float")
+    cf.log.add_config(block)
+    times = []
+    received.add_callback(lambda *args: times.append(args[-1]))
+    stop = threading.Event()
+    load = threading.Thread(target=_gui_load, args=(stop,))
+    load.start()
+    try:
+        if not block.start().wait(5):
+            raise Exception("The log setup timed out")
+        time.sleep(duration)
+    finally:
+        stop.set()
+        load.join()
+        block.stop()
+    intervals = sorted(b - a for (a, b) in zip(times[1:-1], times[2:]))
+    mean = sum(intervals) / len(intervals)
+    deviation = (sum((i - mean) ** 2 for i in intervals) /
+                 len(intervals)) ** 0.5
+    return {"samples": len(intervals),
+            "mean_ms": mean * 1000,
+            "stdev_ms": deviation * 1000,
+            "p99_ms": intervals[len(intervals) * 99 / 100] * 1000,
+            "max_ms": intervals[-1] * 1000}
+
+
+def bench_link_process_jitter(scale):
+    """
+    Jitter of a 10 ms log block on the debug driver while the process is
+    busy as with a heavy GUI, with the link in the same process and in a
+    CrazyflieProcess
+    """
+    from cflib.crazyflie import Crazyflie
+    from cflib.crazyflie.process import CrazyflieProcess
+    from cflib.utils.callbacks import Caller
+    results = {}
+    cf = Crazyflie()
+    _connect(cf)
+    try:
+        # The time the callback runs is the receive time in process
+        received = Caller()
+        cf.log.block_added_cb.add_callback(
+            lambda block: block.data_received_cb.add_callback(
+                lambda *args: received.call(time.time())))
+        results["in_process"] = _log_jitter(cf, received, 2 * scale)
+    finally:
+        cf.close_link()
+    cf = CrazyflieProcess(enable_debug_driver=True)
+    try:
+        _connect(cf)
+        results["link_process"] = _log_jitter(cf, cf.receivedLogSample,
+                                              2 * scale)
+        cf.close_link()
+    finally:
+        cf.stop()
+    return results
+
+
+def bench_param_roundtrip(scale):
+    """Write and read back a parameter through the debug driver"""
+    from cflib.crazyflie import Crazyflie
+    cf = Crazyflie()
+    _connect(cf)
+    updated = threading.Event()
+    cf.param.add_update_callback(group="rpid", name="prp",
+                                 cb=lambda name, value: updated.set())
+
+    def roundtrip(request):
+        updated.clear()
+        request()
+        if not updated.wait(1):
+            raise Exception("No answer to the param request")
+
+    def write(n):
+        for i in xrange(n):
+            roundtrip(lambda: cf.param.set_value("rpid.prp", str(i * 0.1)))
+
+    def read(n):
+        for i in xrange(n):
+            roundtrip(lambda: cf.param.request_param_update("rpid.prp"))
+    try:
+        return {"write": _timeit(write, 100 * scale),
+                "read": _timeit(read, 100 * scale)}
+    finally:
+        cf.close_link()
+
+
+def bench_log_writer(scale):
+    """Write log data rows to a CSV file with the LogWriter"""
+    from cflib.crazyflie.log import LogConfig
+    from cfclient.utils.logdatawriter import LogWriter
+    conf = LogConfig("bench", 10)
+    names = ["stabilizer.roll", "stabilizer.pitch", "stabilizer.yaw",
+             "stabilizer.thrust", "pm.vbat", "motor.m1"]
+    for name in names:
+        conf.add_variable(name, "float")
+    data = dict((name, 1.2345) for name in names)
+    writer = LogWriter(conf)
+    writer.start()
+
+    def run(n):
+        for i in xrange(n):
+            conf.data_received_cb.call(i, data, conf)
+    try:
+        return _timeit(run, 10000 * scale)
+    finally:
+        writer.stop()
+
+
+def bench_log_stream(scale):
+    """
+    Write log data rows to a shared memory log stream and read them back
+    from a LogStreamReader
+    """
+    from cflib.crazyflie.log import LogConfig
+    from cflib.utils.logstream import _StreamWriter, LogStreamReader
+    conf = LogConfig("bench", 10)
+    names = ["stabilizer.roll", "stabilizer.pitch", "stabilizer.yaw",
+             "stabilizer.thrust", "pm.vbat", "motor.m1"]
+    for name in names:
+        conf.add_variable(name, "float")
+    data = dict((name, 1.2345) for name in names)
+    path = os.path.join(tempfile.mkdtemp(), "cflog-bench")
+    writer = _StreamWriter(path, conf, 1 << 16)
+    reader = LogStreamReader(path)
+
+    def write(n):
+        for i in xrange(n):
+            writer.write(i, data)
+
+    def read(n):
+        reader.read = reader.written - n
+        reader.read_new()
+    try:
+        return {"write": _timeit(write, 10000 * scale),
+                "read": _timeit(read, 10000 * scale)}
+    finally:
+        reader.close()
+        writer.close()
+        os.rmdir(os.path.dirname(path))
+
+
+def bench_plot_ingest(scale):
+    """Add samples to a PlotWidget with 6 curves, without redrawing"""
+    from PyQt4 import QtGui
+    from cfclient.ui.widgets.plotwidget import PlotWidget
+    app = QtGui.QApplication.instance() or QtGui.QApplication([])
+    plot = PlotWidget(fps=1)
+    names = ["a", "b", "c", "d", "e", "f"]
+    for name in names:
+        plot.add_curve(name)
+    data = dict((name, 1.0) for name in names)
+
+    def run(n):
+        for i in xrange(n):
+            plot.add_data(data, i)
+    return _timeit(run, 10000 * scale)
+
+
+class _EchoDevice():
+    """
+    Mocked Crazyradio USB device, the packets written are acked and sent back
+    as ack payload. Supports both the pyusb 0.x and 1.x APIs.
+    """
+    bcdDevice = 0x0040
+    deviceVersion = "0.4"
+
+    def __init__(self):
+        self._last = array('B', [0xFF])
+
+    def set_configuration(self, configuration=None):
+        pass
+
+    def open(self):
+        return self
+
+    def setConfiguration(self, configuration):
+        pass
+
+    def claimInterface(self, interface):
+        pass
+
+    def ctrl_transfer(self, *args, **kwargs):
+        return array('B')
+
+    def controlMsg(self, *args, **kwargs):
+        return array('B')
+
+    def write(self, endpoint, data, interface=0, timeout=0):
+        self._last = array('B', data)
+        return len(data)
+
+    def read(self, endpoint, size, interface=0, timeout=0):
+        if list(self._last) == [0xFF]:
+            return array('B', [0x01])
+        return array('B', [0x01]) + self._last
+
+    def bulkWrite(self, endpoint, data, timeout=0):
+        return self.write(endpoint, data)
+
+    def bulkRead(self, endpoint, size, timeout=0):
+        return self.read(endpoint, size)
+
+
+def _mocked_radio():
+    from cflib.drivers.crazyradio import Crazyradio
+    return Crazyradio(device=_EchoDevice())
+
+
+def bench_radio_usb(scale):
+    """Send packets with Crazyradio.send_packet on a mocked USB handle"""
+    radio = _mocked_radio()
+    data = array('B', [0x30] + range(14))
+
+    def run(n):
+        for _ in xrange(n):
+            radio.send_packet(data)
+    return _timeit(run, 20000 * scale)
+
+
+def bench_radio_link(scale):
+    """
+    Send packets through a RadioDriver on a mocked Crazyradio and receive
+    their echo, with the driver thread and the send/receive queues.
+    """
+    from cflib.crtp.radiodriver import RadioDriver, _RadioDriverThread
+    from cflib.crtp.priorityqueue import PriorityPacketQueue
+    from cflib.crtp.sendqueue import SendScheduler
+
+    driver = RadioDriver()
+    driver.cradio = _mocked_radio()
+    driver.in_queue = PriorityPacketQueue()
+    driver.out_queue = SendScheduler()
+    driver._thread = _RadioDriverThread(driver.cradio, driver.in_queue,
+                                        driver.out_queue, None, None)
+    driver._thread.start()
+
+    def run(n):
+        for i in xrange(n):
+            pk = CRTPPacket()
+            pk.set_header(CRTPPort.PARAM, 1)
+            pk.data = (i & 0xFF, )
+            driver.send_packet(pk)
+            if driver.receive_packet(1) is None:
+                raise Exception("Packet lost on the mocked radio link")
+    try:
+        result = _timeit(run, 1000 * scale)
+        result["send_stats"] = driver.get_send_stats()
+        return result
+    finally:
+        driver._thread.stop()
+
+
+def _param_read_request(var_id=0):
+    pk = CRTPPacket()
+    pk.set_header(CRTPPort.PARAM, 1)
+    pk.data = (var_id, )
+    return pk
+
+
+def _wait_param_answer(link, timeout=1):
+    """Wait for a param value packet, skipping the console packets"""
+    end = time.time() + timeout
+    while time.time() < end:
+        pk = link.receive_packet(end - time.time())
+        if pk is not None and pk.port == CRTPPort.PARAM and pk.channel == 2:
+            return pk
+    raise Exception("No answer to the param read request")
+
+
+def _link_rtt(link, count):
+    """Return the round trip times of count param reads"""
+    times = []
+    for _ in xrange(count):
+        start = time.time()
+        link.send_packet(_param_read_request())
+        _wait_param_answer(link)
+        times.append(time.time() - start)
+    return times
+
+
+def _pipelined(link, n, window=32):
+    """
+    Do n param reads keeping window requests in flight, below the depth of
+    the send queue
+    """
+    sent = 0
+    for _ in xrange(n):
+        while sent < n and sent < window:
+            link.send_packet(_param_read_request())
+            sent += 1
+        _wait_param_answer(link)
+        if sent < n:
+            link.send_packet(_param_read_request())
+            sent += 1
+
+
+def bench_udp_link(scale):
+    """
+    Round trip time and throughput of param reads to the debug driver through
+    a UdpGateway and a UdpDriver on the loopback interface, with the round
+    trip time of the debug driver alone as reference.
+    """
+    import cflib.crtp
+    from cflib.crtp.udpdriver import UdpDriver
+    from cflib.crtp.udpgateway import UdpGateway
+
+    direct = cflib.crtp.get_link_driver("debug://0/0")
+    try:
+        direct_rtt = _link_rtt(direct, 100 * scale)
+    finally:
+        direct.close()
+
+    gateway = UdpGateway("debug://0/0", "127.0.0.1", 0)
+    port = gateway.start()
+    client = UdpDriver()
+    client.connect("udp://127.0.0.1:%d" % port, None, None)
+    try:
+        # The first request waits for the gateway to open its link
+        _link_rtt(client, 1)
+        udp_rtt = _link_rtt(client, 100 * scale)
+        throughput = _timeit(lambda n: _pipelined(client, n), 2000 * scale)
+        stats = client.get_datagram_stats()
+        return {"direct_rtt": _summary(direct_rtt),
+                "udp_rtt": _summary(udp_rtt),
+                "udp_throughput": throughput,
+                "packets_per_datagram": {
+                    "sent": (float(stats["packets_sent"]) /
+                             max(1, stats["datagrams_sent"])),
+                    "received": (float(stats["packets_received"]) /
+                                 max(1, stats["datagrams_received"]))}}
+    finally:
+        client.close()
+        gateway.stop()
+
+
+def _serial_echo(fd):
+    """
+    Stand-in for the copter at the other end of a pty: answer each frame
+    with the same packet on channel 2, like a param value
+    """
+    import io
+    from cflib.crtp.serialdriver import FrameDecoder, encode_frame
+    decoder = FrameDecoder()
+    stream = io.FileIO(fd, "r", closefd=False)
+    while True:
+        try:
+            if not decoder.read_from(stream):
+                return
+        except (OSError, IOError):
+            return
+        answers = []
+        for pk in decoder.packets():
+            pk.channel = 2
+            answers.append(encode_frame(pk))
+        if answers:
+            os.write(fd, "".join(answers))
+
+
+def bench_serial_link(scale):
+    """
+    Round trip time and throughput of packets through a SerialDriver on a pty
+    pair, the other end of the pty echoing the frames.
+    """
+    import pty
+    from cflib.crtp.serialdriver import SerialDriver
+
+    (master, slave) = pty.openpty()
+    echo = threading.Thread(target=_serial_echo, args=(master, ))
+    echo.daemon = True
+    echo.start()
+    driver = SerialDriver()
+    driver.connect("serial://" + os.ttyname(slave), None, None)
+    os.close(slave)
+    try:
+        rtt = _link_rtt(driver, 100 * scale)
+        throughput = _timeit(lambda n: _pipelined(driver, n), 2000 * scale)
+        stats = driver.get_frame_stats()
+        return {"rtt": _summary(rtt),
+                "throughput": throughput,
+                "frames_per_write": (float(stats["frames_sent"]) /
+                                     max(1, stats["writes"])),
+                "crc_errors": stats["crc_errors"]}
+    finally:
+        driver.close()
+        os.close(master)
+
+BENCHMARKS = [("packet_encode", bench_packet_encode),
+              ("packet_decode", bench_packet_decode),
+              ("incoming_dispatch", bench_incoming_dispatch),
+              ("incoming_dispatch_profiled",
+               bench_incoming_dispatch_profiled),
+              ("unpack_log_data", bench_unpack_log_data),
+              ("unpack_log_data_plan", bench_unpack_log_data_plan),
+              ("toc_fetch", bench_toc_fetch),
+              ("toc_fetch_cached", bench_toc_fetch_cached),
+              ("reconnect_resume", bench_reconnect_resume),
+              ("log_setup", bench_log_setup),
+              ("link_process_jitter", bench_link_process_jitter),
+              ("param_roundtrip", bench_param_roundtrip),
+              ("log_writer", bench_log_writer),
+              ("log_stream", bench_log_stream),
+              ("plot_ingest", bench_plot_ingest),
+              ("radio_usb", bench_radio_usb),
+              ("radio_link", bench_radio_link),
+              ("udp_link", bench_udp_link),
+              ("serial_link", bench_serial_link)]
+
+
+def _version():
+    """Return the git version of the tree, None if not in git"""
+    try:
+        with open(os.devnull, "w") as devnull:
+            return subprocess.check_output(["git", "describe", "--always",
+                                            "--dirty"], cwd=ROOT,
+                                           stderr=devnull).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CRTP stack "
+                                     "without hardware, results as JSON")
+    parser.add_argument("cases", nargs="*", metavar="case",
+                        help="Cases to run, all by default: %s" %
+                        ", ".join(name for (name, _) in BENCHMARKS))
+    parser.add_argument("-o", "--output", help="Write the JSON to this file")
+    parser.add_argument("-n", "--scale", type=int, default=1,
+                        help="Multiply the number of iterations")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    import cflib.crtp
+    cflib.crtp.init_drivers(enable_debug_driver=True)
+
+    results = {}
+    for (name, bench) in BENCHMARKS:
+        if args.cases and name not in args.cases:
+            continue
+        sys.stderr.write("%s... " % name)
+        try:
+            results[name] = bench(args.scale)
+            sys.stderr.write("done\n")
+        except ImportError as e:
+            # Optional dependency (pyusb, PyQt4) not installed
+            results[name] = {"skipped": str(e)}
+            sys.stderr.write("skipped (%s)\n" % e)
+        except Exception as e:
+            results[name] = {"error": str(e)}
+            sys.stderr.write("error (%s)\n" % e)
+
+    report = {"version": _version(),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "scale": args.scale,
+              "results": results}
+    out = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out + "\n")
+    else:
+        print out
+    shutil.rmtree(CONFIG_DIR, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -56,6 +56,10 @@ def main():
     parser.add_argument('--debug', '-d', nargs=1, default='info', type=str,
                         help="set debug level "
                         "[minimal, info, debug, debugfile]")
+    parser.add_argument('--profile-startup', action='store_true',
+                        dest='profile_startup',
+                        help="print the time spent importing and creating "
+                        "each part of the client during startup")
     args = parser.parse_args()
     globals().update(vars(args))
 
@@ -110,10 +114,19 @@ def main():
         sys.stdout = os.fdopen(stdout, 'w')
         logger.info("Disabling STL printouts")
 
+    from utils.startupprofile import StartupProfile
+    if profile_startup:
+        StartupProfile().enable()
+
     # Start up the main user-interface
-    from ui.main import MainUI
+    with StartupProfile().measure("import main window"):
+        from ui.main import MainUI
     from PyQt4.QtGui import QApplication
+    from PyQt4.QtCore import QTimer
     app = QApplication(sys.argv)
-    main_window = MainUI()
+    with StartupProfile().measure("create main window"):
+        main_window = MainUI()
     main_window.show()
+    # Report when the event loop is running, the window is then shown
+    QTimer.singleShot(0, StartupProfile().report)
     sys.exit(app.exec_())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Bridge from the callbacks of cflib to the widgets of the GUI.
+
+The callbacks are called from the threads of the library and are not allowed
+to touch the widgets. Instead of emitting a Qt signal for each call, the
+bridge records the call and a single timer delivers the recorded calls in the
+GUI thread once per frame. For data that is only displayed, like the link
+quality or the attitude, only the latest call for each key is kept, so a fast
+log block costs one update per frame whatever its rate.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['CallbackBridge']
+
+import logging
+import threading
+from collections import OrderedDict
+
+from PyQt4 import QtCore
+
+logger = logging.getLogger(__name__)
+
+# Number of times per second the recorded calls are delivered
+DEFAULT_FPS = 60
+
+
+class CallbackBridge(QtCore.QObject):
+    """Deliver calls made from any thread in the GUI thread, once per frame"""
+
+    def __init__(self, fps=DEFAULT_FPS, parent=None):
+        super(CallbackBridge, self).__init__(parent)
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._sequence = 0
+        self._posted = 0
+        self._delivered = 0
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(int(1000 / fps))
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def latest(self, slot, key=None):
+        """
+        Return a callback that records its arguments as the latest value of
+        key (the slot if None). Only the last call for a key before a frame
+        is delivered to the slot.
+        """
+        if key is None:
+            key = slot
+
+        def post(*args):
+            with self._lock:
+                # Move the key last so the calls are delivered in the order
+                # of their latest update
+                self._pending.pop(key, None)
+                self._pending[key] = (slot, args)
+                self._posted += 1
+        return post
+
+    def queued(self, slot):
+        """
+        Return a callback where every call is delivered to the slot, in
+        order, for events that must not be lost like the connection state.
+        """
+        def post(*args):
+            with self._lock:
+                self._sequence += 1
+                self._pending[(self, self._sequence)] = (slot, args)
+                self._posted += 1
+        return post
+
+    def flush(self):
+        """Deliver the recorded calls, called from the GUI thread"""
+        with self._lock:
+            if not self._pending:
+                return
+            pending = self._pending
+            self._pending = OrderedDict()
+
+        for (slot, args) in pending.itervalues():
+            try:
+                slot(*args)
+            except Exception:
+                logger.exception("Exception in bridged callback %s", slot)
+        self._delivered += len(pending)
+
+    def stop(self):
+        """Stop delivering the calls"""
+        self._timer.stop()
+
+    def get_stats(self):
+        """Return the number of calls posted, delivered and coalesced"""
+        with self._lock:
+            posted = self._posted
+            pending = len(self._pending)
+        return {"posted": posted,
+                "delivered": self._delivered,
+                "pending": pending,
+                "coalesced": posted - self._delivered - pending}
@@ -42,10 +42,11 @@ from PyQt4.Qt import *
 import cfclient
 
 import cflib.crtp
+from cfclient.utils.uiloader import load_ui_type
 
 (about_widget_class,
-about_widget_base_class) = (uic.loadUiType(sys.path[0] +
-                                           '/cfclient/ui/dialogs/about.ui'))
+about_widget_base_class) = (load_ui_type(sys.path[0] +
+                                         '/cfclient/ui/dialogs/about.ui'))
 
 DEBUG_INFO_FORMAT = """
 <b>Cfclient</b><br>
@@ -71,8 +72,6 @@ FIRMWARE_FORMAT = "{:x}{:x} ({})"
 
 class AboutDialog(QtGui.QWidget, about_widget_class):
 
-    _disconnected_signal = pyqtSignal(str)
-
     """Crazyflie client About box for debugging and information"""
     def __init__(self, helper, *args):
         super(AboutDialog, self).__init__(*args)
@@ -96,10 +95,10 @@ class AboutDialog(QtGui.QWidget, about_widget_class):
                                             cb=self._imu_sensor_tests_update)
         helper.cf.param.add_update_callback(group="firmware",
                                             cb=self._firmware_update)
-        helper.cf.connectSetupFinished.add_callback(self._connected)
-
-        self._disconnected_signal.connect(self._disconnected)
-        helper.cf.disconnected.add_callback(self._disconnected_signal.emit)
+        helper.cf.connectSetupFinished.add_callback(
+                                    helper.bridge.queued(self._connected))
+        helper.cf.disconnected.add_callback(
+                                    helper.bridge.queued(self._disconnected))
 
     def showEvent(self, event):
         """Event when the about box is shown"""
@@ -48,10 +48,12 @@ from cfclient.ui.tab import Tab
 import cflib.crtp
 
 from cflib.bootloader.cloader import Cloader
+from cflib.bootloader.manifest import FlashManifest, DEFAULT_MANIFEST_DIR
 from cfclient.utils.guiconfig import GuiConfig
+from cfclient.utils.uiloader import load_ui_type
 
-service_dialog_class = uic.loadUiType(sys.path[0] +
-                                      "/cfclient/ui/dialogs/bootloader.ui")[0]
+service_dialog_class = load_ui_type(sys.path[0] +
+                                    "/cfclient/ui/dialogs/bootloader.ui")[0]
 
 
 class UIState:
@@ -184,8 +186,14 @@ class BootloaderDialog(QtGui.QWidget, service_dialog_class):
         # self.setStatusLabel("Initiate programming")
         self.resetButton.setEnabled(False)
         if self.imagePathLine.text() != "":
-            self.clt.program.emit(self.imagePathLine.text(),
-                                  self.verifyCheckBox.isChecked())
+            verify = Cloader.VERIFY_NONE
+            if self.verifyCheckBox.isChecked():
+                if self.verifyModeCombo.currentIndex() == 0:
+                    verify = Cloader.VERIFY_SAMPLED
+                else:
+                    verify = Cloader.VERIFY_FULL
+            self.clt.program.emit(self.imagePathLine.text(), verify,
+                                  self.deltaCheckBox.isChecked())
         else:
             msgBox = QtGui.QMessageBox()
             msgBox.setText("Please choose an image file to program.")
@@ -236,7 +244,7 @@ class BootloaderDialog(QtGui.QWidget, service_dialog_class):
 # event loop which is what we want
 class CrazyloadThread(QThread):
     # Input signals declaration (not sure it should be used like that...)
-    program = pyqtSignal(str, bool)
+    program = pyqtSignal(str, str, bool)
     verify = pyqtSignal()
     initiateColdBootSignal = pyqtSignal(str)
     resetCopterSignal = pyqtSignal()
@@ -266,6 +274,7 @@ class CrazyloadThread(QThread):
         self.resetCopterSignal.connect(self.resetCopter)
         self.loader = None
         self.link = None
+        self._manifest = FlashManifest(DEFAULT_MANIFEST_DIR)
 
     def __del__(self):
         self.quit()
@@ -291,7 +300,7 @@ class CrazyloadThread(QThread):
                 logger.info("Connected in coldboot mode failed")
                 self.link.close()
 
-    def programAction(self, filename, verify):
+    def programAction(self, filename, verify, delta):
         logger.info("Flashing file [%s]", filename)
         f = open(filename, "rb")
         if not f:
@@ -301,7 +310,18 @@ class CrazyloadThread(QThread):
         image = f.read()
         f.close()
 
-        self.loadAndFlash(image, verify)
+        cpuid = self.loader.cpuid
+        pages = None
+        if delta:
+            pages = self._manifest.delta_pages(self.loader, image)
+            logger.info("Delta flashing %d of %d pages", len(pages),
+                        len(FlashManifest.page_checksums(
+                            image, self.loader.page_size)))
+
+        self._manifest.invalidate(cpuid)
+        if self.loadAndFlash(image, str(verify), pages=pages):
+            self._manifest.insert(cpuid, image, self.loader.page_size,
+                                  self.loader.start_page)
 
     def checksum256(self, st):
         return reduce(lambda x, y: x + y, map(ord, st)) % 256
@@ -313,7 +333,7 @@ class CrazyloadThread(QThread):
         image = "0xBC" + image
         image += struct.pack("B", 256 - self.checksum256(image))
 
-        self.loadAndFlash(image, True, 117)
+        self.loadAndFlash(image, Cloader.VERIFY_FULL, 117)
 
     def readConfigAction(self):
         self.statusChanged.emit("Reading config block...", 0)
@@ -335,89 +355,72 @@ class CrazyloadThread(QThread):
         else:
             self.statusChanged.emit("Reading config block failed!", 0)
 
-    def loadAndFlash(self, image, verify=False, startpage=0):
-
-        factor = ((100.0 * self.loader.page_size) / len(image))
-        if (verify == True):
+    def _verify_flashed_pages(self, image, startpage, first_page, count,
+                              verify, progress, factor):
+        """Verify count pages that has been written starting at first_page.
+        Return the updated progress or None if the verification failed"""
+        for p in range(first_page, first_page + count):
+            buffStart = ((p - self.loader.start_page - startpage) *
+                         self.loader.page_size)
+            ver = image[buffStart:buffStart + self.loader.page_size]
+            if not self.loader.verify_page(p, ver, verify):
+                self.statusChanged.emit("Verification failed!",
+                                        int(progress))
+                return None
+            progress += factor
+            self.statusChanged.emit("Verifying flashed data...",
+                                    int(progress))
+        return progress
+
+    def loadAndFlash(self, image, verify=Cloader.VERIFY_NONE, startpage=0,
+                     pages=None):
+        """Flash the image starting at startpage. If pages is given only
+        those image pages are flashed. Return True if successful"""
+
+        if pages is None:
+            pages = range(0, int((len(image) - 1) /
+                                 self.loader.page_size) + 1)
+        if len(pages) == 0:
+            self.statusChanged.emit("Flashing...done, no pages changed!", 100)
+            return True
+
+        factor = 100.0 / len(pages)
+        if (verify != Cloader.VERIFY_NONE):
             factor /= 2
         progress = 0
-        # For each page
-        ctr = 0  # Buffer counter
-        for i in range(0, int((len(image) - 1) / self.loader.page_size) + 1):
+        # For each run of pages that fits in the buffer
+        for run in self.loader.page_runs(pages):
             # Load the buffer
-            if ((i + 1) * self.loader.page_size) > len(image):
+            for ctr, i in enumerate(run):
                 self.loader.upload_buffer(ctr, 0,
-                                          image[i * self.loader.page_size:])
-            else:
-                self.loader.upload_buffer(ctr, 0,
-                                          image[i *
-                                                self.loader.page_size:(i + 1) *
+                                          image[i * self.loader.page_size:
+                                                (i + 1) *
                                                 self.loader.page_size])
 
-            ctr += 1
+                progress += factor
+                self.statusChanged.emit("Uploading buffer...", int(progress))
 
-            progress += factor
-            self.statusChanged.emit("Uploading buffer...", int(progress))
-
-            # Flash when the complete buffers are full
-            if ctr >= self.loader.buffer_pages:
-                self.statusChanged.emit("Writing buffer...", int(progress))
-                firstFlashPage = (self.loader.start_page + startpage + i -
-                                  (ctr - 1))
-                if not self.loader.write_flash(0, firstFlashPage, ctr):
-                    self.disconnectedSignal.emit()
-                    self.statusChanged.emit("Error during flash operation "
-                                            "(err code %d)" %
-                                            self.loader.error_code,
-                                            int(progress))
-                    self.link.close()
-                    return
-                if (verify == True):
-                    for p in range(firstFlashPage, firstFlashPage + ctr):
-                        test = self.loader.read_flash(p)
-                        buffStart = ((p - self.loader.start_page) *
-                                     self.loader.page_size)
-                        ver = image[buffStart:buffStart +
-                                    self.loader.page_size]
-                        if (test != ver):
-                            self.statusChanged.emit("Verification failed!",
-                                                    int(progress))
-                            return
-                        progress += factor
-                        self.statusChanged.emit("Verifying flashed data...",
-                                                int(progress))
-
-                ctr = 0
-
-        if ctr > 0:
+            # Flash the loaded buffers
             self.statusChanged.emit("Writing buffer...", int(progress))
-            firstFlashPage = (self.loader.start_page + startpage +
-                              (int((len(image) - 1) / self.loader.page_size)) -
-                              (ctr - 1))
-            if not self.loader.write_flash(0, firstFlashPage, ctr):
+            firstFlashPage = self.loader.start_page + startpage + run[0]
+            if not self.loader.write_flash(0, firstFlashPage, len(run)):
+                self.disconnectedSignal.emit()
                 self.statusChanged.emit("Error during flash operation "
                                         "(err code %d)" %
                                         self.loader.error_code,
                                         int(progress))
-                self.disconnectedSignal.emit()
                 self.link.close()
-                return
-            if (verify == True):
-                for p in range(firstFlashPage, firstFlashPage + ctr):
-                    buffStart = ((p - self.loader.start_page) *
-                                 self.loader.page_size)
-                    ver = image[buffStart:buffStart + self.loader.page_size]
-                    # We read back more than we should compare.
-                    test = self.loader.read_flash(p)[0:len(ver)]
-                    if (test != ver):
-                        self.statusChanged.emit("Verification failed!",
-                                                int(progress))
-                        return
-                    progress += factor
-                    self.statusChanged.emit("Verifying flashed data...",
-                                            int(progress))
+                return False
+            if (verify != Cloader.VERIFY_NONE):
+                progress = self._verify_flashed_pages(image, startpage,
+                                                      firstFlashPage,
+                                                      len(run), verify,
+                                                      progress, factor)
+                if progress is None:
+                    return False
 
         self.statusChanged.emit("Flashing...done!", 100)
+        return True
 
     def resetCopter(self):
         self.disconnectedSignal.emit()
@@ -38,9 +38,10 @@ from PyQt4 import QtGui, uic
 from PyQt4.QtCore import pyqtSignal, pyqtSlot, QThread
 
 import cflib.crtp
+from cfclient.utils.uiloader import load_ui_type
 
 (connect_widget_class,
-connect_widget_base_class) = (uic.loadUiType(sys.path[0] +
+connect_widget_base_class) = (load_ui_type(sys.path[0] +
                                  '/cfclient/ui/dialogs/connectiondialogue.ui'))
 
 
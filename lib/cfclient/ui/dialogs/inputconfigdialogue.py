@@ -49,9 +49,10 @@ from PyQt4.QtGui import *
 from PyQt4.Qt import *
 
 from cfclient.utils.input import JoystickReader
+from cfclient.utils.uiloader import load_ui_type
 
 (inputconfig_widget_class,
-connect_widget_base_class) = (uic.loadUiType(sys.path[0] +
+connect_widget_base_class) = (load_ui_type(sys.path[0] +
                              '/cfclient/ui/dialogs/inputconfigdialogue.ui'))
 
 
@@ -166,7 +167,10 @@ class InputConfigDialogue(QtGui.QWidget, inputconfig_widget_class):
         self.box.show()
 
     def startConfigOfInputDevice(self):
-        self.joystickReader.enableRawReading(self.inputDeviceSelector.currentIndex())
+        # The device ids are not list positions (jsN for the jsdev driver)
+        (device_id, _) = self.inputDeviceSelector.itemData(
+                            self.inputDeviceSelector.currentIndex()).toInt()
+        self.joystickReader.enableRawReading(device_id)
         self.rawinputreader.startReading()
         self.populateDropDown()
         self.profileCombo.setEnabled(True)
@@ -417,6 +421,12 @@ class RawJoystickReader(QThread):
 
     @pyqtSlot()
     def read_input(self):
-        [rawaxis, rawbuttons] = self.joystickReader.readRawValues()
+        try:
+            [rawaxis, rawbuttons] = self.joystickReader.readRawValues()
+        except Exception as e:
+            # The device failed (e.g. unplugged), stop polling it
+            logger.warning("Could not read input device: %s", e)
+            self.stopReading()
+            return
         self.rawAxisUpdateSignal.emit(rawaxis)
         self.rawButtonUpdateSignal.emit(rawbuttons)
@@ -46,9 +46,10 @@ from PyQt4.QtGui import *
 from PyQt4.Qt import *
 
 from cflib.crazyflie.log import Log, LogVariable, LogConfig
+from cfclient.utils.uiloader import load_ui_type
 
 (logconfig_widget_class,
-connect_widget_base_class) = (uic.loadUiType(sys.path[0] +
+connect_widget_base_class) = (load_ui_type(sys.path[0] +
                                  '/cfclient/ui/dialogs/logconfigdialogue.ui'))
 
 NAME_FIELD = 0
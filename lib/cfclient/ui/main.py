@@ -43,6 +43,8 @@ from PyQt4.QtGui import QLabel, QActionGroup, QMessageBox, QAction
 from dialogs.connectiondialogue import ConnectDialogue
 from dialogs.inputconfigdialogue import InputConfigDialogue
 from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.process import CrazyflieProcess
+from cflib.utils.logstream import LogStreamExporter
 from dialogs.logconfigdialogue import LogConfigDialogue
 
 from cfclient.utils.input import JoystickReader
@@ -58,10 +60,12 @@ from cflib.crazyflie.log import Log, LogVariable, LogConfig
 
 from cfclient.ui.dialogs.bootloader import BootloaderDialog
 from cfclient.ui.dialogs.about import AboutDialog
+from cfclient.ui.bridge import CallbackBridge
+from cfclient.utils.uiloader import load_ui_type
 
 (main_window_class,
-main_windows_base_class) = (uic.loadUiType(sys.path[0] +
-                                           '/cfclient/ui/main.ui'))
+main_windows_base_class) = (load_ui_type(sys.path[0] +
+                                         '/cfclient/ui/main.ui'))
 
 
 class MyDockWidget(QtGui.QDockWidget):
@@ -80,28 +84,32 @@ class UIState:
 
 class MainUI(QtGui.QMainWindow, main_window_class):
 
-    connectionLostSignal = pyqtSignal(str, str)
-    connectionInitiatedSignal = pyqtSignal(str)
-    batteryUpdatedSignal = pyqtSignal(int, object, object)
-    connectionDoneSignal = pyqtSignal(str)
-    connectionFailedSignal = pyqtSignal(str, str)
-    disconnectedSignal = pyqtSignal(str)
-    linkQualitySignal = pyqtSignal(int)
-
-    _input_device_error_signal = pyqtSignal(str)
-    _input_discovery_signal = pyqtSignal(object)
-    _log_error_signal = pyqtSignal(object, str)
-
     def __init__(self, *args):
         super(MainUI, self).__init__(*args)
         self.setupUi(self)
 
-        self.cf = Crazyflie(ro_cache=sys.path[0] + "/cflib/cache",
-                            rw_cache=sys.path[1] + "/cache")
+        if GuiConfig().get("link_process"):
+            # The link, the TOCs and the log decoding run in a child process
+            self.cf = CrazyflieProcess(
+                ro_cache=sys.path[0] + "/cflib/cache",
+                rw_cache=sys.path[1] + "/cache",
+                enable_debug_driver=GuiConfig().get("enable_debug_driver"))
+        else:
+            self.cf = Crazyflie(ro_cache=sys.path[0] + "/cflib/cache",
+                                rw_cache=sys.path[1] + "/cache")
 
         cflib.crtp.init_drivers(enable_debug_driver=GuiConfig()
                                                 .get("enable_debug_driver"))
 
+        # Publish the log blocks for external analysis processes
+        self._log_stream_exporter = None
+        if GuiConfig().get("log_stream_export"):
+            self._log_stream_exporter = LogStreamExporter(self.cf)
+            self._log_stream_exporter.start()
+
+        # Delivers the callbacks of the library in the GUI thread
+        self.bridge = CallbackBridge()
+
         # Create the connection dialogue
         self.connectDialogue = ConnectDialogue()
 
@@ -119,17 +127,17 @@ class MainUI(QtGui.QMainWindow, main_window_class):
         # Connections for the Connect Dialogue
         self.connectDialogue.requestConnectionSignal.connect(self.cf.open_link)
 
-        self.connectionDoneSignal.connect(self.connectionDone)
-        self.cf.connectionFailed.add_callback(self.connectionFailedSignal.emit)
-        self.connectionFailedSignal.connect(self.connectionFailed)
-        
-        
-        self._input_device_error_signal.connect(self.inputDeviceError)
+        # A resumed connection keeps its log blocks, only update the UI
+        self.cf.connectionResumed.add_callback(self.bridge.queued(
+                        lambda linkURI: self.setUIState(UIState.CONNECTED,
+                                                        linkURI)))
+        self.cf.connectionFailed.add_callback(
+                        self.bridge.queued(self.connectionFailed))
+
         self.joystickReader.device_error.add_callback(
-                        self._input_device_error_signal.emit)
-        self._input_discovery_signal.connect(self.device_discovery)
+                        self.bridge.queued(self.inputDeviceError))
         self.joystickReader.device_discovery.add_callback(
-                        self._input_discovery_signal.emit)
+                        self.bridge.queued(self.device_discovery))
 
         # Connect UI signals
         self.menuItemConnect.triggered.connect(self.connectButtonClicked)
@@ -139,10 +147,10 @@ class MainUI(QtGui.QMainWindow, main_window_class):
         self.menuItemQuickConnect.triggered.connect(self.quickConnect)
         self.menuItemConfInputDevice.triggered.connect(self.configInputDevice)
         self.menuItemExit.triggered.connect(self.closeAppRequest)
-        self.batteryUpdatedSignal.connect(self.updateBatteryVoltage)
         self._menuitem_rescandevices.triggered.connect(self._rescan_devices)
            
         self._auto_reconnect_enabled = GuiConfig().get("auto_reconnect")
+        self.cf.set_resume_enabled(self._auto_reconnect_enabled)
         self.autoReconnectCheckBox.toggled.connect(
                                               self._auto_reconnect_changed)
         self.autoReconnectCheckBox.setChecked(GuiConfig().get("auto_reconnect"))
@@ -155,27 +163,21 @@ class MainUI(QtGui.QMainWindow, main_window_class):
         self.joystickReader.input_updated.add_callback(
                                          self.cf.commander.send_setpoint)
 
-        # Connection callbacks and signal wrappers for UI protection
+        # Connection callbacks, delivered in the GUI thread by the bridge
         self.cf.connectSetupFinished.add_callback(
-                                              self.connectionDoneSignal.emit)
-        self.connectionDoneSignal.connect(self.connectionDone)
-        self.cf.disconnected.add_callback(self.disconnectedSignal.emit)
-        self.disconnectedSignal.connect(
+                        self.bridge.queued(self.connectionDone))
+        self.cf.disconnected.add_callback(self.bridge.queued(
                         lambda linkURI: self.setUIState(UIState.DISCONNECTED,
-                                                        linkURI))
-        self.cf.connectionLost.add_callback(self.connectionLostSignal.emit)
-        self.connectionLostSignal.connect(self.connectionLost)
-        self.cf.connectionInitiated.add_callback(
-                                         self.connectionInitiatedSignal.emit)
-        self.connectionInitiatedSignal.connect(
+                                                        linkURI)))
+        self.cf.connectionLost.add_callback(
+                        self.bridge.queued(self.connectionLost))
+        self.cf.connectionInitiated.add_callback(self.bridge.queued(
                            lambda linkURI: self.setUIState(UIState.CONNECTING,
-                                                           linkURI))
-        self._log_error_signal.connect(self._logging_error)
+                                                           linkURI)))
 
-        # Connect link quality feedback
-        self.cf.linkQuality.add_callback(self.linkQualitySignal.emit)
-        self.linkQualitySignal.connect(
-                   lambda percentage: self.linkQualityBar.setValue(percentage))
+        # Connect link quality feedback, only the latest value is shown
+        self.cf.linkQuality.add_callback(self.bridge.latest(
+                   self.linkQualityBar.setValue, key="linkQuality"))
 
         # Set UI state in disconnected buy default
         self.setUIState(UIState.DISCONNECTED)
@@ -187,23 +189,31 @@ class MainUI(QtGui.QMainWindow, main_window_class):
         cfclient.ui.pluginhelper.cf = self.cf
         cfclient.ui.pluginhelper.inputDeviceReader = self.joystickReader
         cfclient.ui.pluginhelper.logConfigReader = self.logConfigReader
+        cfclient.ui.pluginhelper.bridge = self.bridge
 
         self.logConfigDialogue = LogConfigDialogue(cfclient.ui.pluginhelper)
         self._bootloader_dialog = BootloaderDialog(cfclient.ui.pluginhelper)
         self.menuItemBootloader.triggered.connect(self._bootloader_dialog.show)
         self._about_dialog = AboutDialog(cfclient.ui.pluginhelper)
         self.menuItemAbout.triggered.connect(self._about_dialog.show)
-        # Loading toolboxes (A bit of magic for a lot of automatic)
+        # Loading toolboxes (A bit of magic for a lot of automatic). The
+        # toolboxes are only created when they are opened the first time.
         self.toolboxes = []
         self.toolboxesMenuItem.setMenu(QtGui.QMenu())
-        for t_class in cfclient.ui.toolboxes.toolboxes:
-            toolbox = t_class(cfclient.ui.pluginhelper)
-            dockToolbox = MyDockWidget(toolbox.getName())
-            dockToolbox.setWidget(toolbox)
+        for descriptor in cfclient.ui.toolboxes.toolboxes:
+            if descriptor.names:
+                name = descriptor.names["name"]
+            else:
+                name = self._create_plugin(descriptor,
+                                           cfclient.ui.pluginhelper).getName()
+            dockToolbox = MyDockWidget(name)
+            dockToolbox.descriptor = descriptor
+            if descriptor.instance:
+                dockToolbox.setWidget(descriptor.instance)
             self.toolboxes += [dockToolbox, ]
 
             # Add menu item for the toolbox
-            item = QtGui.QAction(toolbox.getName(), self)
+            item = QtGui.QAction(name, self)
             item.setCheckable(True)
             item.triggered.connect(self.toggleToolbox)
             self.toolboxesMenuItem.menu().addAction(item)
@@ -216,19 +226,27 @@ class MainUI(QtGui.QMainWindow, main_window_class):
             dockToolbox.dockToolbox = dockToolbox
             dockToolbox.menuItem = item
 
-        # Load and connect tabs
+        # Load and connect tabs. Like the toolboxes the tabs are created when
+        # opened, unless the names could not be found without creating them.
         self.tabsMenuItem.setMenu(QtGui.QMenu())
         tabItems = {}
         self.loadedTabs = []
-        for tabClass in cfclient.ui.tabs.available:
-            tab = tabClass(self.tabs, cfclient.ui.pluginhelper)
-            item = QtGui.QAction(tab.getMenuName(), self)
+        for descriptor in cfclient.ui.tabs.available:
+            if descriptor.names:
+                menu_name = descriptor.names["menuName"]
+                tab_name = descriptor.names["tabName"]
+            else:
+                tab = self._create_plugin(descriptor, self.tabs,
+                                          cfclient.ui.pluginhelper)
+                menu_name = tab.getMenuName()
+                tab_name = tab.getTabName()
+            item = QtGui.QAction(menu_name, self)
             item.setCheckable(True)
-            item.toggled.connect(tab.toggleVisibility)
+            item.descriptor = descriptor
+            item.toggled.connect(self._toggle_tab)
             self.tabsMenuItem.menu().addAction(item)
-            tabItems[tab.getTabName()] = item
-            self.loadedTabs.append(tab)
-            if not tab.enabled:
+            tabItems[tab_name] = item
+            if descriptor.instance and not descriptor.instance.enabled:
                 item.setEnabled(False)
 
         # First instantiate all tabs and then open them in the correct order
@@ -241,6 +259,50 @@ class MainUI(QtGui.QMainWindow, main_window_class):
         except Exception as e:
             logger.warning("Exception while opening tabs [%s]", e)
 
+    def _create_plugin(self, descriptor, *args):
+        """Create a tab or toolbox from its descriptor. If we are already
+        connected the connection and log block callbacks it registered are
+        called, so it's in the same state as if it had been created at
+        startup."""
+        connected_cbs = list(self.cf.connectSetupFinished.callbacks)
+        block_cbs = list(self.cf.log.block_added_cb.callbacks)
+
+        plugin = descriptor.create(*args)
+        if (isinstance(descriptor, cfclient.ui.tabs.TabDescriptor) and
+                plugin not in self.loadedTabs):
+            self.loadedTabs.append(plugin)
+
+        if self.uiState == UIState.CONNECTED:
+            for cb in self.cf.connectSetupFinished.callbacks:
+                if cb not in connected_cbs:
+                    cb(self.cf.link_uri)
+            for cb in self.cf.log.block_added_cb.callbacks:
+                if cb not in block_cbs:
+                    for block in self.cf.log.log_blocks:
+                        cb(block)
+
+        return plugin
+
+    @pyqtSlot(bool)
+    def _toggle_tab(self, checked):
+        """Show or hide a tab, it's created the first time it's shown"""
+        item = self.sender()
+        tab = item.descriptor.instance
+        if tab is None:
+            if not checked:
+                return
+            tab = self._create_plugin(item.descriptor, self.tabs,
+                                      cfclient.ui.pluginhelper)
+            if not tab.enabled:
+                logger.warning("Tab [%s] could not be enabled",
+                               tab.getTabName())
+                item.blockSignals(True)
+                item.setChecked(False)
+                item.blockSignals(False)
+                item.setEnabled(False)
+                return
+        tab.toggleVisibility(checked)
+
     def setUIState(self, newState, linkURI=""):
         self.uiState = newState
         if (newState == UIState.DISCONNECTED):
@@ -275,6 +337,10 @@ class MainUI(QtGui.QMainWindow, main_window_class):
         dockToolbox = self.sender().dockToolbox
 
         if display and not dockToolbox.isVisible():
+            if dockToolbox.widget() is None:
+                dockToolbox.setWidget(self._create_plugin(
+                                      dockToolbox.descriptor,
+                                      cfclient.ui.pluginhelper))
             dockToolbox.widget().enable()
             self.addDockWidget(dockToolbox.widget().preferedDockArea(),
                                dockToolbox)
@@ -302,6 +368,8 @@ class MainUI(QtGui.QMainWindow, main_window_class):
         
     def _auto_reconnect_changed(self, checked):
         self._auto_reconnect_enabled = checked 
+        # Auto reconnect resumes the lost connection
+        self.cf.set_resume_enabled(checked)
         GuiConfig().set("auto_reconnect", checked)
         logger.info("Auto reconnect enabled: %s", checked)     
 
@@ -320,8 +388,9 @@ class MainUI(QtGui.QMainWindow, main_window_class):
         lg.add_variable("pm.vbat", "float")
         self.cf.log.add_config(lg)
         if lg.valid:
-            lg.data_received_cb.add_callback(self.batteryUpdatedSignal.emit)
-            lg.error_cb.add_callback(self._log_error_signal.emit)
+            lg.data_received_cb.add_callback(
+                        self.bridge.latest(self.updateBatteryVoltage))
+            lg.error_cb.add_callback(self.bridge.queued(self._logging_error))
             lg.start()
         else:
             logger.warning("Could not setup loggingblock!")
@@ -352,6 +421,11 @@ class MainUI(QtGui.QMainWindow, main_window_class):
     def closeEvent(self, event):
         self.hide()
         self.cf.close_link()
+        if self._log_stream_exporter:
+            self._log_stream_exporter.stop()
+        if isinstance(self.cf, CrazyflieProcess):
+            self.cf.stop()
+        self.bridge.stop()
         GuiConfig().save_file()
 
     def connectButtonClicked(self):
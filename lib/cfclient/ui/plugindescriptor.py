@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Lightweight description of a tab or toolbox. The names shown in the menus
+are read from the source of the module so that the module does not have to be
+imported, and the class instantiated, until it's opened the first time.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['PluginDescriptor']
+
+import os
+import re
+
+import logging
+logger = logging.getLogger(__name__)
+
+from cfclient.utils.startupprofile import StartupProfile
+
+
+class PluginDescriptor():
+    """Describe a tab or toolbox class found in a package"""
+
+    # Name of the attributes read from the source and the regular expression
+    # used for finding them. Set by the subclasses.
+    NAME_PATTERNS = {}
+
+    def __init__(self, package, module_name):
+        self.package = package
+        self.module_name = module_name
+        self.instance = None
+        self.names = self._scan_names(os.path.join(
+                                      os.path.dirname(package.__file__),
+                                      module_name + ".py"))
+
+    def _scan_names(self, filename):
+        """Read the names from the source, return None if they could not all
+        be found. It's then up to the user to create the instance to get
+        them."""
+        try:
+            source = open(filename).read()
+        except IOError:
+            return None
+        names = {}
+        for (name, pattern) in self.NAME_PATTERNS.iteritems():
+            match = re.search(pattern, source)
+            if not match:
+                logger.info("No static %s found in [%s]", name, filename)
+                return None
+            names[name] = match.group(1)
+        return names
+
+    def get_class(self):
+        """Import the module and return the class"""
+        with StartupProfile().measure("import %s" % self.module_name):
+            module = __import__(self.package.__name__ + "." +
+                                self.module_name,
+                                globals(), locals(), [self.module_name], -1)
+        return getattr(module, self.module_name)
+
+    def create(self, *args):
+        """Create the instance, only done once"""
+        if self.instance is None:
+            plugin_class = self.get_class()
+            with StartupProfile().measure("create %s" % self.module_name):
+                self.instance = plugin_class(*args)
+        return self.instance
@@ -39,3 +39,4 @@ class PluginHelper():
         self.cf = None
         self.menu = None
         self.logConfigReader = None
+        self.bridge = None
@@ -42,14 +42,14 @@ from PyQt4 import QtCore, QtGui, uic
 from PyQt4.QtCore import pyqtSlot, pyqtSignal
 
 from cfclient.ui.tab import Tab
+from cfclient.utils.uiloader import load_ui_type
 
-console_tab_class = uic.loadUiType(sys.path[0] +
-                                   "/cfclient/ui/tabs/consoleTab.ui")[0]
+console_tab_class = load_ui_type(sys.path[0] +
+                                 "/cfclient/ui/tabs/consoleTab.ui")[0]
 
 
 class ConsoleTab(Tab, console_tab_class):
     """Console tab for showing printouts from Crazyflie"""
-    update = pyqtSignal(str)
 
     def __init__(self, tabWidget, helper, *args):
         super(ConsoleTab, self).__init__(*args)
@@ -61,9 +61,8 @@ class ConsoleTab(Tab, console_tab_class):
         self.tabWidget = tabWidget
         self.helper = helper
 
-        self.update.connect(self.printText)
-
-        self.helper.cf.console.receivedChar.add_callback(self.update.emit)
+        self.helper.cf.console.receivedChar.add_callback(
+                                      helper.bridge.queued(self.printText))
 
     def printText(self, text):
         # Make sure we get printouts from the Crazyflie into the log (such as
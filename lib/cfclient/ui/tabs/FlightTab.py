@@ -51,9 +51,10 @@ from cfclient.utils.guiconfig import GuiConfig
 from cflib.crazyflie.log import Log, LogVariable, LogConfig
 
 from cfclient.ui.tab import Tab
+from cfclient.utils.uiloader import load_ui_type
 
-flight_tab_class = uic.loadUiType(sys.path[0] +
-                                  "/cfclient/ui/tabs/flightTab.ui")[0]
+flight_tab_class = load_ui_type(sys.path[0] +
+                                "/cfclient/ui/tabs/flightTab.ui")[0]
 
 MAX_THRUST = 65365.0
 
@@ -62,22 +63,8 @@ class FlightTab(Tab, flight_tab_class):
 
     uiSetupReadySignal = pyqtSignal()
 
-    _motor_data_signal = pyqtSignal(int, object, object)
-    _imu_data_signal = pyqtSignal(int, object, object)
-    _althold_data_signal = pyqtSignal(int, object, object)
-    _baro_data_signal = pyqtSignal(int, object, object)
-
-    _input_updated_signal = pyqtSignal(float, float, float, float)
-    _rp_trim_updated_signal = pyqtSignal(float, float)
-    _emergency_stop_updated_signal = pyqtSignal(bool)
-
-    _log_error_signal = pyqtSignal(object, str)
-
     #UI_DATA_UPDATE_FPS = 10
 
-    connectionFinishedSignal = pyqtSignal(str)
-    disconnectedSignal = pyqtSignal(str)
-
     def __init__(self, tabWidget, helper, *args):
         super(FlightTab, self).__init__(*args)
         self.setupUi(self)
@@ -88,33 +75,23 @@ class FlightTab(Tab, flight_tab_class):
         self.tabWidget = tabWidget
         self.helper = helper
 
-        self.disconnectedSignal.connect(self.disconnected)
-        self.connectionFinishedSignal.connect(self.connected)
-        # Incomming signals
+        # Incomming callbacks, delivered in the GUI thread by the bridge
         self.helper.cf.connectSetupFinished.add_callback(
-                                     self.connectionFinishedSignal.emit)
-        self.helper.cf.disconnected.add_callback(self.disconnectedSignal.emit)
+                                     self.helper.bridge.queued(self.connected))
+        self.helper.cf.disconnected.add_callback(
+                                  self.helper.bridge.queued(self.disconnected))
 
-        self._input_updated_signal.connect(self.updateInputControl)
+        # The input is only displayed, the latest value of each is enough
         self.helper.inputDeviceReader.input_updated.add_callback(
-                                     self._input_updated_signal.emit)
-        self._rp_trim_updated_signal.connect(self.calUpdateFromInput)
+                          self.helper.bridge.latest(self.updateInputControl))
         self.helper.inputDeviceReader.rp_trim_updated.add_callback(
-                                     self._rp_trim_updated_signal.emit)
-        self._emergency_stop_updated_signal.connect(self.updateEmergencyStop)
+                          self.helper.bridge.latest(self.calUpdateFromInput))
         self.helper.inputDeviceReader.emergency_stop_updated.add_callback(
-                                     self._emergency_stop_updated_signal.emit)
+                          self.helper.bridge.latest(self.updateEmergencyStop))
         
         self.helper.inputDeviceReader.althold_updated.add_callback(
                     lambda enabled: self.helper.cf.param.set_value("flightmode.althold", enabled))
 
-        self._imu_data_signal.connect(self._imu_data_received)
-        self._baro_data_signal.connect(self._baro_data_received)
-        self._althold_data_signal.connect(self._althold_data_received)
-        self._motor_data_signal.connect(self._motor_data_received)
-
-        self._log_error_signal.connect(self._logging_error)
-
         # Connect UI signals that are in this tab
         self.flightModeCombo.currentIndexChanged.connect(self.flightmodeChange)
         self.minThrust.valueChanged.connect(self.minMaxThrustChanged)
@@ -140,7 +117,7 @@ class FlightTab(Tab, flight_tab_class):
                                                             str(enabled)))
         self.helper.cf.param.add_update_callback(
                         group="flightmode", name="xmode",
-                        cb=( lambda name, checked:
+                        cb=self.helper.bridge.latest(lambda name, checked:
                         self.crazyflieXModeCheckbox.setChecked(eval(checked))))
         self.ratePidRadioButton.clicked.connect(
                     lambda enabled:
@@ -152,7 +129,7 @@ class FlightTab(Tab, flight_tab_class):
                                                    str(not enabled)))
         self.helper.cf.param.add_update_callback(
                     group="flightmode", name="ratepid",
-                    cb=(lambda name, checked:
+                    cb=self.helper.bridge.latest(lambda name, checked:
                     self.ratePidRadioButton.setChecked(eval(checked))))
         
         self.helper.cf.param.add_update_callback(
@@ -162,7 +139,8 @@ class FlightTab(Tab, flight_tab_class):
 
         self.helper.cf.param.add_update_callback(
                         group="imu_sensors",
-                        cb=self._set_available_sensors)
+                        cb=self.helper.bridge.queued(
+                                                self._set_available_sensors))
                 
         self.logBaro = None
         self.logAltHold = None
@@ -229,6 +207,9 @@ class FlightTab(Tab, flight_tab_class):
                                  data["stabilizer.pitch"])
 
     def connected(self, linkURI):
+        # The blocks are set up together, see Log.start_configs()
+        configs = []
+
         # IMU & THRUST
         lg = LogConfig("Stabalizer", 200)
         lg.add_variable("stabilizer.roll", "float")
@@ -238,9 +219,11 @@ class FlightTab(Tab, flight_tab_class):
 
         self.helper.cf.log.add_config(lg)
         if (lg.valid):
-            lg.data_received_cb.add_callback(self._imu_data_signal.emit)
-            lg.error_cb.add_callback(self._log_error_signal.emit)
-            lg.start()
+            lg.data_received_cb.add_callback(
+                            self.helper.bridge.latest(self._imu_data_received))
+            lg.error_cb.add_callback(
+                            self.helper.bridge.queued(self._logging_error))
+            configs.append(lg)
         else:
             logger.warning("Could not setup logconfiguration after "
                            "connection!")
@@ -254,12 +237,16 @@ class FlightTab(Tab, flight_tab_class):
 
         self.helper.cf.log.add_config(lg)
         if lg.valid:
-            lg.data_received_cb.add_callback(self._motor_data_signal.emit)
-            lg.error_cb.add_callback(self._log_error_signal.emit)
-            lg.start()
+            lg.data_received_cb.add_callback(
+                        self.helper.bridge.latest(self._motor_data_received))
+            lg.error_cb.add_callback(
+                            self.helper.bridge.queued(self._logging_error))
+            configs.append(lg)
         else:
             logger.warning("Could not setup logconfiguration after "
                            "connection!")
+
+        self.helper.cf.log.start_configs(configs)
             
     def _set_available_sensors(self, name, available):
         logger.info("[%s]: %s", name, available)
@@ -273,16 +260,18 @@ class FlightTab(Tab, flight_tab_class):
                 self.helper.inputDeviceReader.setAltHoldAvailable(available)
                 if (not self.logBaro and not self.logAltHold):
                     # The sensor is available, set up the logging
+                    configs = []
                     self.logBaro = LogConfig("Baro", 200)
                     self.logBaro.add_variable("baro.aslLong", "float")
 
                     self.helper.cf.log.add_config(self.logBaro)
                     if self.logBaro.valid:
                         self.logBaro.data_received_cb.add_callback(
-                            self._baro_data_signal.emit)
+                            self.helper.bridge.latest(
+                                self._baro_data_received))
                         self.logBaro.error_cb.add_callback(
-                            self._log_error_signal.emit)
-                        self.logBaro.start()
+                            self.helper.bridge.queued(self._logging_error))
+                        configs.append(self.logBaro)
                     else:
                         logger.warning("Could not setup logconfiguration after "
                                        "connection!")            
@@ -292,13 +281,15 @@ class FlightTab(Tab, flight_tab_class):
                     self.helper.cf.log.add_config(self.logAltHold)
                     if self.logAltHold.valid:
                         self.logAltHold.data_received_cb.add_callback(
-                            self._althold_data_signal.emit)
+                            self.helper.bridge.latest(
+                                self._althold_data_received))
                         self.logAltHold.error_cb.add_callback(
-                            self._log_error_signal.emit)
-                        self.logAltHold.start()
+                            self.helper.bridge.queued(self._logging_error))
+                        configs.append(self.logAltHold)
                     else:
                         logger.warning("Could not setup logconfiguration after "
-                                       "connection!")                        
+                                       "connection!")
+                    self.helper.cf.log.start_configs(configs)
 
     def disconnected(self, linkURI):
         self.ai.setRollPitch(0, 0)
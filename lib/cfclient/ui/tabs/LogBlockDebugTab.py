@@ -40,8 +40,9 @@ from PyQt4 import QtCore, QtGui, uic
 from PyQt4.QtCore import Qt, pyqtSlot, pyqtSignal, QThread, SIGNAL
 
 from cfclient.ui.tab import Tab
+from cfclient.utils.uiloader import load_ui_type
 
-logblock_tab_class = uic.loadUiType(sys.path[0] +
+logblock_tab_class = load_ui_type(sys.path[0] +
                                  "/cfclient/ui/tabs/logBlockDebugTab.ui")[0]
 
 class LogBlockDebugTab(Tab, logblock_tab_class):
@@ -49,9 +50,6 @@ class LogBlockDebugTab(Tab, logblock_tab_class):
     Used to show debug-information about log status.
     """
 
-    _blocks_updated_signal = pyqtSignal(bool)
-    _disconnected_signal = pyqtSignal(str)
-
     def __init__(self, tabWidget, helper, *args):
         super(LogBlockDebugTab, self).__init__(*args)
         self.setupUi(self)
@@ -63,17 +61,20 @@ class LogBlockDebugTab(Tab, logblock_tab_class):
         self.tabWidget = tabWidget
 
         self._helper.cf.log.block_added_cb.add_callback(self._block_added)
-        self._disconnected_signal.connect(self._disconnected)
-        self._helper.cf.disconnected.add_callback(self._disconnected_signal.emit)
-        self._blocks_updated_signal.connect(self._update_tree)
+        self._helper.cf.disconnected.add_callback(
+                                    helper.bridge.queued(self._disconnected))
+        # The tree is rebuilt at most once per frame however many blocks
+        # changed state
+        self._blocks_updated = helper.bridge.latest(
+                                    lambda state: self._update_tree())
 
         self._block_tree.setHeaderLabels(['Id', 'Name', 'Period (ms)', 'Added', 'Started', 'Error', 'Contents'])
         self._block_tree.sortItems(0, QtCore.Qt.AscendingOrder)
 
     def _block_added(self, block):
         """Callback when a new logblock has been created"""
-        block.added_cb.add_callback(self._blocks_updated_signal.emit)
-        block.started_cb.add_callback(self._blocks_updated_signal.emit)
+        block.added_cb.add_callback(self._blocks_updated)
+        block.started_cb.add_callback(self._blocks_updated)
 
     def _update_tree(self):
         """Update the block tree"""
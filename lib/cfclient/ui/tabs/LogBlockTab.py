@@ -41,8 +41,9 @@ from PyQt4 import QtCore, QtGui, uic
 from PyQt4.QtCore import Qt, pyqtSlot, pyqtSignal, QThread, SIGNAL
 
 from cfclient.ui.tab import Tab
+from cfclient.utils.uiloader import load_ui_type
 
-logblock_tab_class = uic.loadUiType(sys.path[0] +
+logblock_tab_class = load_ui_type(sys.path[0] +
                                  "/cfclient/ui/tabs/logBlockTab.ui")[0]
 
 import logging
@@ -86,9 +87,11 @@ class LogBlockItem(object):
         self._model = model
         self._log_file_writer = LogWriter(block)
 
-        self._block.started_cb.add_callback(self._set_started)
-        self._block.added_cb.add_callback(self._set_added)
-        self._block.error_cb.add_callback(self._log_error)
+        # The state of the block is only changed in the GUI thread
+        self._block.started_cb.add_callback(
+                                     model.bridge.queued(self._set_started))
+        self._block.added_cb.add_callback(model.bridge.queued(self._set_added))
+        self._block.error_cb.add_callback(model.bridge.queued(self._log_error))
 
         self._var_list = ""
 
@@ -164,8 +167,9 @@ class LogBlockItem(object):
 
 
 class LogBlockModel(QAbstractItemModel):
-    def __init__(self, view, parent=None):
+    def __init__(self, view, bridge, parent=None):
         super(LogBlockModel, self).__init__(parent)
+        self.bridge = bridge
         self._nodes = []
         self._column_headers = ['Id', 'Name', 'Period (ms)', 'Start',
                                 'Write to file', 'Contents']
@@ -307,9 +311,6 @@ class LogBlockTab(Tab, logblock_tab_class):
     Used to show debug-information about logblock status.
     """
 
-    _blocks_updated_signal = pyqtSignal(bool)
-    _disconnected_signal = pyqtSignal(str)
-
     def __init__(self, tabWidget, helper, *args):
         """Initialize the tab"""
         super(LogBlockTab, self).__init__(*args)
@@ -321,12 +322,12 @@ class LogBlockTab(Tab, logblock_tab_class):
         self._helper = helper
         self.tabWidget = tabWidget
 
-        self._helper.cf.log.block_added_cb.add_callback(self._block_added)
-        self._disconnected_signal.connect(self._disconnected)
+        self._helper.cf.log.block_added_cb.add_callback(
+            helper.bridge.queued(self._block_added))
         self._helper.cf.disconnected.add_callback(
-            self._disconnected_signal.emit)
+            helper.bridge.queued(self._disconnected))
 
-        self._model = LogBlockModel(self._block_tree)
+        self._model = LogBlockModel(self._block_tree, helper.bridge)
         self._block_tree.setModel(self._model)
         self._block_tree.clicked.connect(self._model.clicked)
         self._block_tree.setItemDelegate(CheckboxDelegate())
@@ -41,15 +41,13 @@ from PyQt4.QtCore import Qt, pyqtSlot, pyqtSignal, QThread, SIGNAL
 from cflib.crazyflie import Crazyflie
 
 from cfclient.ui.tab import Tab
+from cfclient.utils.uiloader import load_ui_type
 
-param_tab_class = uic.loadUiType(sys.path[0] +
-                                 "/cfclient/ui/tabs/logTab.ui")[0]
+param_tab_class = load_ui_type(sys.path[0] +
+                               "/cfclient/ui/tabs/logTab.ui")[0]
 
 
 class LogTab(Tab, param_tab_class):
-    connectedSignal = pyqtSignal(str)
-    disconnectedSignal = pyqtSignal(str)
-
     def __init__(self, tabWidget, helper, *args):
         super(LogTab, self).__init__(*args)
         self.setupUi(self)
@@ -65,12 +63,12 @@ class LogTab(Tab, param_tab_class):
         # Init the tree widget
         self.logTree.setHeaderLabels(['Name', 'ID', 'Unpack', 'Storage'])
 
-        self.cf.connectSetupFinished.add_callback(self.connectedSignal.emit)
-        self.connectedSignal.connect(self.connected)
+        self.cf.connectSetupFinished.add_callback(
+                                      helper.bridge.queued(self.connected))
 
         # Clear the log TOC list when the Crazyflie is disconnected
-        self.cf.disconnected.add_callback(self.disconnectedSignal.emit)
-        self.disconnectedSignal.connect(self.disconnected)
+        self.cf.disconnected.add_callback(
+                                      helper.bridge.queued(self.disconnected))
 
     @pyqtSlot('QString')
     def disconnected(self, linkname):
@@ -41,9 +41,10 @@ from PyQt4.QtGui import QApplication, QStyledItemDelegate, QAbstractItemView, QB
 from PyQt4.QtGui import QSortFilterProxyModel
 
 from cfclient.ui.tab import Tab
+from cfclient.utils.uiloader import load_ui_type
 
-param_tab_class = uic.loadUiType(sys.path[0] +
-                                 "/cfclient/ui/tabs/paramTab.ui")[0]
+param_tab_class = load_ui_type(sys.path[0] +
+                               "/cfclient/ui/tabs/paramTab.ui")[0]
 
 import logging
 logger = logging.getLogger(__name__)
@@ -95,9 +96,12 @@ class ParamGroupItem(object):
 
 class ParamBlockModel(QAbstractItemModel):
     """Model for handling the parameters in the tree-view"""
-    def __init__(self, parent):
+    def __init__(self, parent, bridge):
         """Create the empty model"""
         super(ParamBlockModel, self).__init__(parent)
+        self._bridge = bridge
+        # The view is refreshed at most once per frame
+        self._refresh = bridge.latest(self.layoutChanged.emit, key=self)
         self._nodes = []
         self._column_headers = ['Name', 'Type', 'Access', 'Value']
         self._red_brush = QBrush(QColor("red"))
@@ -112,8 +116,11 @@ class ParamBlockModel(QAbstractItemModel):
                 new_param = ParamChildItem(new_group, param, crazyflie)
                 new_param.ctype = toc[group][param].ctype
                 new_param.access = toc[group][param].get_readable_access()
+                # The values are updated in the GUI thread
                 crazyflie.param.add_update_callback(
-                    group=group, name=param, cb=new_param.updated)
+                    group=group, name=param,
+                    cb=self._bridge.latest(new_param.updated,
+                                           key=(self, group, param)))
                 new_group.children.append(new_param)
             self._nodes.append(new_group)
 
@@ -127,7 +134,7 @@ class ParamBlockModel(QAbstractItemModel):
 
     def refresh(self):
         """Force a refresh of the view though the model"""
-        self.layoutChanged.emit()
+        self._refresh()
 
     def parent(self, index):
         """Re-implemented method to get the parent of the given index"""
@@ -229,8 +236,6 @@ class ParamTab(Tab, param_tab_class):
     them
     """
     _expand_all_signal = pyqtSignal()
-    _connected_signal = pyqtSignal(str)
-    _disconnected_signal = pyqtSignal(str)
 
     def __init__(self, tabWidget, helper, *args):
         """Create the parameter tab"""
@@ -244,12 +249,12 @@ class ParamTab(Tab, param_tab_class):
         self.tabWidget = tabWidget
         self.cf = helper.cf
 
-        self.cf.connectSetupFinished.add_callback(self._connected_signal.emit)
-        self._connected_signal.connect(self._connected)
-        self.cf.disconnected.add_callback(self._disconnected_signal.emit)
-        self._disconnected_signal.connect(self._disconnected)
+        self.cf.connectSetupFinished.add_callback(
+                                      helper.bridge.queued(self._connected))
+        self.cf.disconnected.add_callback(
+                                      helper.bridge.queued(self._disconnected))
 
-        self._model = ParamBlockModel(None)
+        self._model = ParamBlockModel(None, helper.bridge)
         self.paramTree.setModel(self._model)
 
     def _connected(self, link_uri):
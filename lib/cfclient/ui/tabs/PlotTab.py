@@ -55,9 +55,11 @@ from cfclient.ui.widgets.plotwidget import PlotWidget
 from cflib.crazyflie.log import Log
 
 from cfclient.ui.tab import Tab
+from cfclient.utils.guiconfig import GuiConfig
+from cfclient.utils.uiloader import load_ui_type
 
-plot_tab_class = uic.loadUiType(sys.path[0] +
-                                "/cfclient/ui/tabs/plotTab.ui")[0]
+plot_tab_class = load_ui_type(sys.path[0] +
+                              "/cfclient/ui/tabs/plotTab.ui")[0]
 
 class LogConfigModel(QAbstractItemModel):
     """Model for log configurations in the ComboBox"""
@@ -122,9 +124,8 @@ class LogConfigModel(QAbstractItemModel):
 class PlotTab(Tab, plot_tab_class):
     """Tab for plotting logging data"""
 
+    # Every sample is plotted so the data is not coalesced by the bridge
     _log_data_signal = pyqtSignal(int, object, object)
-    _log_error_signal = pyqtSignal(object, str)
-    _disconnected_signal = pyqtSignal(str)
 
     colors = ['g', 'b', 'm', 'r', 'y', 'c']
 
@@ -135,9 +136,7 @@ class PlotTab(Tab, plot_tab_class):
         self.tabName = "Plotter"
         self.menuName = "Plotter"
 
-        self._log_error_signal.connect(self._logging_error)
-
-        self._plot = PlotWidget(fps=30)
+        self._plot = PlotWidget(fps=GuiConfig().get("plot_fps"))
         # Check if we could find the PyQtImport. If not, then
         # set this tab as disabled
         self.enabled = self._plot.can_enable
@@ -147,15 +146,16 @@ class PlotTab(Tab, plot_tab_class):
         self._log_data_signal.connect(self._log_data_received)
         self.tabWidget = tabWidget
         self.helper = helper
+        self._log_error = helper.bridge.queued(self._logging_error)
         self.plotLayout.addWidget(self._plot)
 
         # Connect external signals if we can use the tab
         if self.enabled:
-            self._disconnected_signal.connect(self._disconnected)
             self.helper.cf.disconnected.add_callback(
-                self._disconnected_signal.emit)
+                helper.bridge.queued(self._disconnected))
 
-            self.helper.cf.log.block_added_cb.add_callback(self._config_added)
+            self.helper.cf.log.block_added_cb.add_callback(
+                helper.bridge.queued(self._config_added))
             self.dataSelector.currentIndexChanged.connect(
                 self._selection_changed)
 
@@ -179,14 +179,6 @@ class PlotTab(Tab, plot_tab_class):
         # removed as callbacks.
         self._log_data_signal.emit(ts, data, logconf)
 
-    def _log_error_signal_wrapper(self, config, msg):
-        """Wrapper for signal"""
-
-        # For some reason the *.emit functions are not
-        # the same over time (?!) so they cannot be registered and then
-        # removed as callbacks.
-        self._log_error_signal.emit(config, msg)
-
     def _selection_changed(self, i):
         """Callback from ComboBox when a new item has been selected"""
 
@@ -203,8 +195,7 @@ class PlotTab(Tab, plot_tab_class):
         if self._previous_config:
             self._previous_config.data_received_cb.remove_callback(
                 self._log_data_signal_wrapper)
-            self._previous_config.error_cb.remove_callback(
-                self._log_error_signal_wrapper)
+            self._previous_config.error_cb.remove_callback(self._log_error)
 
         lg = self._model.get_config(i)
         if not lg.started:
@@ -222,8 +213,10 @@ class PlotTab(Tab, plot_tab_class):
             self._plot.add_curve(d.name,
                                 self.colors[color_selector % len(self.colors)])
             color_selector += 1
+        # The samples are only buffered when received, the plot widget
+        # redraws them at its own frame rate
         lg.data_received_cb.add_callback(self._log_data_signal_wrapper)
-        lg.error_cb.add_callback(self._log_error_signal_wrapper)
+        lg.error_cb.add_callback(self._log_error)
 
         self._previous_config = lg
 
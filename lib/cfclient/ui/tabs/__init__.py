@@ -28,19 +28,22 @@
 """
 Find all the available tabs so they can be loaded.
 
-Dropping a new .py file into this directory will automatically list and load
-it into the UI when it is started.
+Dropping a new .py file into this directory will automatically list it in the
+UI when it is started. The tab is only loaded when it's opened.
 """
 
 __author__ = 'Bitcraze AB'
 __all__ = []
 
 import os
+import sys
 import glob
 import logging
 
 logger = logging.getLogger(__name__)
 
+from cfclient.ui.plugindescriptor import PluginDescriptor
+
 found_tabs = [os.path.splitext(os.path.basename(f))[0] for
              f in glob.glob(os.path.dirname(__file__) + "/[A-Za-z]*Tab.py")]
 if len(found_tabs) == 0:
@@ -50,8 +53,10 @@ if len(found_tabs) == 0:
 
 logger.debug("Found tabs: %s", found_tabs)
 
-available = []
 
-for tab in found_tabs:
-    tabModule = __import__(tab, globals(), locals(), [tab], -1)
-    available.append(getattr(tabModule, tab))
+class TabDescriptor(PluginDescriptor):
+    """Describe a tab without importing it"""
+    NAME_PATTERNS = {"tabName": r'self\.tabName\s*=\s*["\']([^"\']*)["\']',
+                     "menuName": r'self\.menuName\s*=\s*["\']([^"\']*)["\']'}
+
+available = [TabDescriptor(sys.modules[__name__], tab) for tab in found_tabs]
@@ -36,29 +36,28 @@ import sys, time
 
 from PyQt4 import QtCore, QtGui, uic
 from PyQt4.QtCore import Qt, pyqtSlot, pyqtSignal
+from cfclient.utils.uiloader import load_ui_type
   
-console_class = uic.loadUiType(sys.path[0] + "/cfclient/ui/toolboxes/consoleToolbox.ui")[0]
+console_class = load_ui_type(sys.path[0] + "/cfclient/ui/toolboxes/consoleToolbox.ui")[0]
 
 class ConsoleToolbox(QtGui.QWidget, console_class):
     """Console toolbox for showing printouts from the Crazyflie"""
-    update = pyqtSignal(str)
 
     def __init__(self, helper, *args):
         super(ConsoleToolbox, self).__init__(*args)
         self.setupUi(self)
         
-        self.update.connect(self.console.insertPlainText)
-        
         self.helper = helper
+        self._update = helper.bridge.queued(self.console.insertPlainText)
 
     def getName(self):
         return 'Console'
     
     def enable(self):
-        self.helper.cf.console.receivedChar.add_callback(self.update.emit)
+        self.helper.cf.console.receivedChar.add_callback(self._update)
     
     def disable(self):
-        self.helper.cf.console.receivedChar.remove_callback(self.update.emit)
+        self.helper.cf.console.receivedChar.remove_callback(self._update)
     
     def preferedDockArea(self):
         return Qt.BottomDockWidgetArea
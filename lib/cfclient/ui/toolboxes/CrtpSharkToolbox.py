@@ -36,8 +36,9 @@ import sys, time
 
 from PyQt4 import QtCore, QtGui, uic
 from PyQt4.QtCore import Qt, pyqtSlot, pyqtSignal, QThread, SIGNAL
+from cfclient.utils.uiloader import load_ui_type
 
-param_tab_class = uic.loadUiType(sys.path[0] + "/cfclient/ui/toolboxes/crtpSharkToolbox.ui")[0]
+param_tab_class = load_ui_type(sys.path[0] + "/cfclient/ui/toolboxes/crtpSharkToolbox.ui")[0]
 
 class CrtpSharkToolbox(QtGui.QWidget, param_tab_class):
     """Show packets that is sent vie the communication link"""
@@ -48,7 +49,9 @@ class CrtpSharkToolbox(QtGui.QWidget, param_tab_class):
         self.setupUi(self)
 
         self.helper = helper
-        
+        # The packets are added to the tree in the GUI thread
+        self._packet_incoming = helper.bridge.queued(self.packetIncoming)
+
         #Init the tree widget
         self.logTree.setHeaderLabels(['Port', 'Data'])
         
@@ -76,10 +79,10 @@ class CrtpSharkToolbox(QtGui.QWidget, param_tab_class):
         return 'Crtp sniffer'
     
     def enable(self):
-        self.helper.cf.receivedPacket.add_callback(self.packetIncoming)
+        self.helper.cf.receivedPacket.add_callback(self._packet_incoming)
     
     def disable(self):
-        self.helper.cf.receivedPacket.remove_callback(self.packetIncoming)
+        self.helper.cf.receivedPacket.remove_callback(self._packet_incoming)
     
     def preferedDockArea(self):
         return Qt.RightDockWidgetArea
@@ -41,17 +41,15 @@ from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
 
 from PyQt4 import QtCore, QtGui, uic
 from PyQt4.QtCore import Qt, pyqtSlot, pyqtSignal, QThread, SIGNAL
+from cfclient.utils.uiloader import load_ui_type
 
-debugdriver_tab_class = uic.loadUiType(
+debugdriver_tab_class = load_ui_type(
                            sys.path[0] +
                            "/cfclient/ui/toolboxes/debugDriverToolbox.ui")[0]
 
 
 class DebugDriverToolbox(QtGui.QWidget, debugdriver_tab_class):
     """Used to interact with the DebugDriver toolbox"""
-    connectionDoneSignal = pyqtSignal(str)
-    disconnectedSignal = pyqtSignal(str)
-
     def __init__(self, helper, *args):
         super(DebugDriverToolbox, self).__init__(*args)
         self.setupUi(self)
@@ -60,10 +58,9 @@ class DebugDriverToolbox(QtGui.QWidget, debugdriver_tab_class):
 
         # Connected / disconnected signals
         self.helper.cf.connectSetupFinished.add_callback(
-                                             self.connectionDoneSignal.emit)
-        self.connectionDoneSignal.connect(self.connectionDone)
-        self.helper.cf.disconnected.add_callback(self.disconnectedSignal.emit)
-        self.disconnectedSignal.connect(self.disconnected)
+                                    helper.bridge.queued(self.connectionDone))
+        self.helper.cf.disconnected.add_callback(
+                                    helper.bridge.queued(self.disconnected))
 
         self.linkQuality.valueChanged.connect(self.linkQualityChanged)
         self.forceDisconnect.pressed.connect(self.forceDisconnecPressed)
@@ -28,19 +28,22 @@
 """
 List all the available toolboxes so they can be used by the UI.
 
-Dropping a new .py file into this directory will automatically list and load
-it into the UI when it is started.
+Dropping a new .py file into this directory will automatically list it in the
+UI when it is started. The toolbox is only loaded when it's opened.
 """
 
 __author__ = 'Bitcraze AB'
 __all__ = []
 
 import os
+import sys
 import glob
 import logging
 
 logger = logging.getLogger(__name__)
 
+from cfclient.ui.plugindescriptor import PluginDescriptor
+
 foundToolboxes = [os.path.splitext(os.path.basename(f))[0] for f in
                   glob.glob(os.path.dirname(__file__) +
                             "/[A-Za-z]*Toolbox.py")]
@@ -52,8 +55,10 @@ if len(foundToolboxes) == 0:
 
 logger.debug("Found toolboxes: %s", foundToolboxes)
 
-toolboxes = []
 
-for tb in foundToolboxes:
-    tbModule = __import__(tb, globals(), locals(), [tb], -1)
-    toolboxes.append(getattr(tbModule, tb))
+class ToolboxDescriptor(PluginDescriptor):
+    """Describe a toolbox without importing it"""
+    NAME_PATTERNS = {"name": r'def getName\(self\):\s*return\s*["\']([^"\']*)["\']'}
+
+toolboxes = [ToolboxDescriptor(sys.modules[__name__], tb)
+             for tb in foundToolboxes]
@@ -27,14 +27,24 @@
 
 """
 Attitude indicator widget.
+
+The horizon with its pitch ladder only changes with the size of the widget,
+so it is rendered once into a pixmap that each frame rotates and draws. The
+repaints are limited to MAX_FPS however often the attitude is set.
 """
 
 __author__ = 'Bitcraze AB'
 __all__ = ['AttitudeIndicator']
 
 import sys
+import math
 from PyQt4 import QtGui, QtCore
 
+# Max number of repaints per second
+MAX_FPS = 60
+# The horizon is cached for pitches up to this angle, beyond it is drawn
+CACHED_PITCH = 90
+
 
 class AttitudeIndicator(QtGui.QWidget):
     """Widget for showing attitude"""
@@ -50,27 +60,44 @@ class AttitudeIndicator(QtGui.QWidget):
         self.setMinimumSize(30, 30)
         # self.setMaximumSize(240,240)
 
+        # The rendered horizon as (pixmap, x, y), x and y being the position
+        # of the pixmap in the horizon coordinates
+        self._horizon = None
+        self._update_timer = QtCore.QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.setInterval(1000 / MAX_FPS)
+        self._update_timer.timeout.connect(self.update)
+
+    def _schedule_update(self):
+        """Repaint at the next frame, the updates until then are merged"""
+        if not self._update_timer.isActive():
+            self._update_timer.start()
+
     def setRoll(self, roll):
         self.roll = roll
-        self.repaint()
+        self._schedule_update()
 
     def setPitch(self, pitch):
         self.pitch = pitch
-        self.repaint()
+        self._schedule_update()
         
     def setHover(self, target):        
         self.hoverTargetASL = target
         self.hover = target>0
-        self.repaint()
+        self._schedule_update()
         
     def setBaro(self, asl):
         self.hoverASL = asl;
-        self.repaint()
+        self._schedule_update()
 
     def setRollPitch(self, roll, pitch):
         self.roll = roll
         self.pitch = pitch
-        self.repaint()
+        self._schedule_update()
+
+    def resizeEvent(self, e):
+        self._horizon = None
+        super(AttitudeIndicator, self).resizeEvent(e)
 
     def paintEvent(self, e):
         qp = QtGui.QPainter()
@@ -78,17 +105,30 @@ class AttitudeIndicator(QtGui.QWidget):
         self.drawWidget(qp)
         qp.end()
 
-    def drawWidget(self, qp):
-        size = self.size()
-        w = size.width()
-        h = size.height()
-
-        qp.translate(w / 2, h / 2)
-        qp.rotate(self.roll)
-        qp.translate(0, (self.pitch * h) / 50)
-        qp.translate(-w / 2, -h / 2)
-        qp.setRenderHint(qp.Antialiasing)
-
+    def _cached_horizon(self, w, h):
+        """
+        Return the horizon rendered for the widget size as (pixmap, x, y).
+        It covers the circle seen through the widget whatever the roll, for
+        all the pitches up to CACHED_PITCH.
+        """
+        if self._horizon is None:
+            radius = int(math.ceil(math.hypot(w, h) / 2)) + 1
+            shift = CACHED_PITCH * h / 50.0
+            x = w / 2 - radius
+            y = int(math.floor(h / 2 - shift - radius))
+            pixmap = QtGui.QPixmap(2 * radius,
+                                   int(math.ceil(2 * (shift + radius))) + 1)
+            pixmap.fill(QtCore.Qt.transparent)
+            qp = QtGui.QPainter(pixmap)
+            qp.translate(-x, -y)
+            qp.setRenderHint(qp.Antialiasing)
+            self._draw_horizon(qp, w, h)
+            qp.end()
+            self._horizon = (pixmap, x, y)
+        return self._horizon
+
+    def _draw_horizon(self, qp, w, h):
+        """Draw the sky, the ground and the pitch ladder"""
         font = QtGui.QFont('Serif', 7, QtGui.QFont.Light)
         qp.setFont(font)
 
@@ -132,6 +172,24 @@ class AttitudeIndicator(QtGui.QWidget):
                 qp.drawLine((w / 2) - (length / 2), pos,
                             (w / 2) + (length / 2), pos)
 
+    def drawWidget(self, qp):
+        size = self.size()
+        w = size.width()
+        h = size.height()
+
+        qp.translate(w / 2, h / 2)
+        qp.rotate(self.roll)
+        qp.translate(0, (self.pitch * h) / 50)
+        qp.translate(-w / 2, -h / 2)
+        qp.setRenderHint(qp.Antialiasing)
+
+        if abs(self.pitch) <= CACHED_PITCH:
+            (pixmap, x, y) = self._cached_horizon(w, h)
+            qp.setRenderHint(qp.SmoothPixmapTransform)
+            qp.drawPixmap(x, y, pixmap)
+        else:
+            self._draw_horizon(qp, w, h)
+
         qp.setWorldMatrixEnabled(False)
 
         pen = QtGui.QPen(QtGui.QColor(0, 0, 0), 2,
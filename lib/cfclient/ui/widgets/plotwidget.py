@@ -53,29 +53,49 @@ from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from PyQt4.Qt import *
 from time import time
+from cfclient.utils.uiloader import load_ui_type
 
 (plot_widget_class,
-connect_widget_base_class) = (uic.loadUiType(
+connect_widget_base_class) = (load_ui_type(
                              sys.path[0] + '/cfclient/ui/widgets/plotter.ui'))
 
-# Try the imports for PyQtGraph to see if it is installed
-try:
-    import pyqtgraph as pg
-    from pyqtgraph import ViewBox
-    from pyqtgraph.Qt import QtCore, QtGui
-    import pyqtgraph.console
-    import numpy as np
-    _pyqtgraph_found = True
-except Exception:
-    _pyqtgraph_found = False
+# PyQtGraph is slow to import so it's not imported until the first plot is
+# created, see _import_pyqtgraph
+pg = None
+ViewBox = None
+np = None
+_pyqtgraph_found = None
+
+
+def _import_pyqtgraph():
+    """Try the imports for PyQtGraph to see if it is installed"""
+    global pg, ViewBox, np, _pyqtgraph_found
+    if _pyqtgraph_found is None:
+        try:
+            import pyqtgraph as pg
+            from pyqtgraph import ViewBox
+            import numpy as np
+            _pyqtgraph_found = True
+        except Exception:
+            _pyqtgraph_found = False
+    return _pyqtgraph_found
 
 class PlotItemWrapper:
-    """Wrapper for PlotDataItem to handle what data is shown"""
-    def __init__(self, curve):
+    """Wrapper for PlotDataItem to handle what data is shown. The samples are
+    kept in a fixed size ring buffer so memory and redraw cost does not grow
+    with the length of the logging session."""
+
+    # Number of samples kept for each curve
+    CAPACITY = 10000
+
+    def __init__(self, curve, capacity=CAPACITY):
         """Initialize"""
-        self.data = []
-        self.ts = []
         self.curve = curve
+        self._capacity = capacity
+        self._data = np.zeros(capacity)
+        self._ts = np.zeros(capacity)
+        # Total number of points added, the newest is at (_count - 1)
+        self._count = 0
 
     def add_point(self, p, ts):
         """
@@ -84,15 +104,58 @@ class PlotItemWrapper:
         p - point
         ts - timestamp in ms
         """
-        self.data.append(p)
-        self.ts.append(ts)
-
-    def show_data(self, start, stop):
-        """Set what data should be shown from the curve. This is done to keep performance when many
-        points have been added."""
-        limit = min(stop, len(self.data))
-        self.curve.setData(y=self.data[start:limit], x=self.ts[start:limit])
-        return [self.ts[start], self.ts[limit-1]]
+        i = self._count % self._capacity
+        self._data[i] = p
+        self._ts[i] = ts
+        self._count += 1
+
+    def _window(self, start, stop):
+        """Return the timestamps and data of the points with index start to
+        stop in the order they were added. Points that have been overwritten
+        in the ring buffer are skipped."""
+        start = max(start, self._count - self._capacity)
+        if stop <= start:
+            return (self._ts[0:0], self._data[0:0])
+        first = start % self._capacity
+        last = first + (stop - start)
+        if last <= self._capacity:
+            return (self._ts[first:last], self._data[first:last])
+        last -= self._capacity
+        return (np.concatenate((self._ts[first:], self._ts[:last])),
+                np.concatenate((self._data[first:], self._data[:last])))
+
+    @staticmethod
+    def _decimate(ts, data, buckets):
+        """Reduce the points to the min and max of each of the buckets, there
+        is no point in drawing more than a couple of points per pixel. The
+        oldest points that does not fill up a bucket are kept as is."""
+        per_bucket = len(data) // buckets
+        rest = len(data) - per_bucket * buckets
+        t = ts[rest:].reshape(buckets, per_bucket)
+        d = data[rest:].reshape(buckets, per_bucket)
+
+        dec_ts = np.empty(2 * buckets)
+        dec_ts[0::2] = t[:, 0]
+        dec_ts[1::2] = t[:, -1]
+        dec_data = np.empty(2 * buckets)
+        dec_data[0::2] = d.min(axis=1)
+        dec_data[1::2] = d.max(axis=1)
+
+        return (np.concatenate((ts[:rest], dec_ts)),
+                np.concatenate((data[:rest], dec_data)))
+
+    def show_data(self, start, stop, width=0):
+        """Set what data should be shown from the curve. This is done to keep
+        performance when many points have been added. If width (in pixels) is
+        given the data is decimated to fit it."""
+        limit = min(stop, self._count)
+        (ts, data) = self._window(start, limit)
+        if len(ts) == 0:
+            return None
+        if width > 0 and len(data) > 2 * width:
+            (ts, data) = self._decimate(ts, data, width)
+        self.curve.setData(y=data, x=ts)
+        return [ts[0], ts[-1]]
 
 class PlotWidget(QtGui.QWidget, plot_widget_class):
     """Wrapper widget for PyQtGraph adding some extra buttons"""
@@ -101,12 +164,8 @@ class PlotWidget(QtGui.QWidget, plot_widget_class):
         super(PlotWidget, self).__init__(*args)
         self.setupUi(self)
 
-        # Limit the plot update to 10Hz
-        self._ts = time()
-        self._delay = 0.1
-
         # Check if we could import PyQtGraph, if not then stop here
-        if not _pyqtgraph_found:
+        if not _import_pyqtgraph():
             self.can_enable = False
             return
         else:
@@ -167,6 +226,18 @@ class PlotWidget(QtGui.QWidget, plot_widget_class):
         self._draw_graph = True
         self._auto_redraw.stateChanged.connect(self._auto_redraw_change)
 
+        # Samples are only buffered when added, the plot is redrawn from this
+        # timer if new samples has arrived since the last frame
+        self._dirty = False
+        self._redraw_timer = QtCore.QTimer()
+        self._redraw_timer.timeout.connect(self._redraw)
+        self.set_fps(fps)
+        self._redraw_timer.start()
+
+    def set_fps(self, fps):
+        """Set the maximum number of redraws per second"""
+        self._redraw_timer.setInterval(int(1000 / max(1, fps)))
+
     def _auto_redraw_change(self, state):
         """Callback from the auto redraw checkbox"""
         if state == 0:
@@ -234,34 +305,49 @@ class PlotWidget(QtGui.QWidget, plot_widget_class):
 
     def add_data(self, data, ts):
         """
-        Add new data to the plot.
+        Add new data to the plot. The data is only buffered here, it will be
+        shown on the next frame.
 
         data - dictionary sent from logging layer containing variable/value pairs
         ts - timestamp of the data in ms
         """
         if not self._last_ts:
             self._last_ts = ts
-        elif not self._last_ts:
+        elif not self._dtime:
             self._dtime = ts - self._last_ts
             self._last_ts = ts
 
+        for name in self._items:
+            self._items[name].add_point(data[name], ts)
+
+        self._last_item = self._last_item + 1
+        self._dirty = True
+
+    def _redraw(self):
+        """Called by the redraw timer, show the buffered data with one
+        setData per curve and one range update"""
+        if not self._dirty or not self._draw_graph:
+            return
+        self._dirty = False
+
         x_min_limit = 0
         x_max_limit = 0
-        # We are adding new datasets, calculate what we should show.
-        if self._enable_samples_x.isChecked():
+        # Calculate what we should show
+        samples_mode = self._enable_samples_x.isChecked()
+        if samples_mode:
             x_min_limit = max(0, self._last_item-self._nbr_samples)
             x_max_limit = max(self._last_item, self._nbr_samples)
 
+        width = self._plot_widget.width()
         for name in self._items:
-            self._items[name].add_point(data[name], ts)
-            if self._draw_graph and time() > self._ts + self._delay:
-                [self._x_min, self._x_max] = self._items[name].show_data(x_min_limit, x_max_limit)
-        if time() > self._ts + self._delay:
-            self._ts = time()
-        if self._enable_samples_x.isChecked() and self._dtime and self._last_item < self._nbr_samples:
+            x_range = self._items[name].show_data(x_min_limit, x_max_limit,
+                                                  width)
+            if x_range:
+                [self._x_min, self._x_max] = x_range
+        if (samples_mode and self._dtime and
+                self._last_item < self._nbr_samples):
             self._x_max = self._x_min + self._nbr_samples * self._dtime
 
-        self._last_item = self._last_item + 1
         self._plot_widget.getViewBox().setRange(xRange=(self._x_min, self._x_max))
 
     def removeAllDatasets(self):
@@ -273,5 +359,6 @@ class PlotWidget(QtGui.QWidget, plot_widget_class):
         self._last_item = 0
         self._last_ts = None
         self._dtime = None
+        self._dirty = False
         self._plot_widget.clear()
 
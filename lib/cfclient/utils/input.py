@@ -31,9 +31,9 @@ Module to read input devices and send controls to the Crazyflie.
 This module reads input from joysticks or other input devices and sends control
 set-points to the Crazyflie. It can be configured in the UI.
 
-Various drivers can be used to read input device data. Currently is uses the
-PyGame driver, but in the future native support will be provided for Linux and
-Windows drivers.
+Various drivers can be used to read input device data. On Linux the event
+driven jsdev driver is used, elsewhere the PyGame driver is polled. The driver
+can be forced with the input_backend config parameter.
 
 The input device's axes and buttons are mapped to software inputs using a
 configuration file.
@@ -49,18 +49,36 @@ import glob
 import traceback
 import logging
 import shutil
+import time
 
 logger = logging.getLogger(__name__)
 
-from cfclient.utils.pygamereader import PyGameReader
 from cfclient.utils.config import Config
 from cfclient.utils.config_manager import ConfigManager
 
 from cfclient.utils.periodictimer import PeriodicTimer
 from cflib.utils.callbacks import Caller
+from cflib.utils import latency
 
 MAX_THRUST = 65000
 
+# The thrust slew rate is given in thrust per read at this period
+SLEW_PERIOD = 0.01
+
+
+def _create_input_device():
+    """Create the input driver selected by the input_backend config"""
+    backend = Config().get("input_backend")
+    if backend in ("auto", "linuxjsdev"):
+        try:
+            from cfclient.utils.linuxjsreader import LinuxJsReader
+            return LinuxJsReader(Config().get("input_max_rate"))
+        except ImportError:
+            if backend == "linuxjsdev":
+                raise
+    from cfclient.utils.pygamereader import PyGameReader
+    return PyGameReader()
+
 class JoystickReader:
     """
     Thread that will read input from devices/joysticks and send control-set
@@ -69,8 +87,9 @@ class JoystickReader:
     inputConfig = []
 
     def __init__(self, do_device_discovery=True):
-        # TODO: Should be OS dependant
-        self.inputdevice = PyGameReader()
+        self.inputdevice = _create_input_device()
+        logger.info("Using input driver %s",
+                    self.inputdevice.__class__.__name__)
         
         self._min_thrust = 0
         self._max_thrust = 0
@@ -82,6 +101,7 @@ class JoystickReader:
 
         self._old_thrust = 0
         self._old_alt_hold = False
+        self._last_read = None
 
         self._trim_roll = Config().get("trim_roll")
         self._trim_pitch = Config().get("trim_pitch")
@@ -114,11 +134,11 @@ class JoystickReader:
 
 
         # TODO: The polling interval should be set from config file
-        self._read_timer = PeriodicTimer(0.01, self.read_input)
+        self._read_timer = PeriodicTimer(0.01, self.read_input, "input")
 
         if do_device_discovery:
-            self._discovery_timer = PeriodicTimer(1.0, 
-                            self._do_device_discovery)
+            self._discovery_timer = PeriodicTimer(1.0,
+                            self._do_device_discovery, "discovery")
             self._discovery_timer.start()
 
         self._available_devices = {}
@@ -192,10 +212,15 @@ class JoystickReader:
         """
         try:
             device_id = self._available_devices[device_name]
+            self._stop_reading()
             self.inputdevice.start_input(
                                     device_id,
                                     ConfigManager().get_config(config_name))
-            self._read_timer.start()
+            self._last_read = None
+            if getattr(self.inputdevice, "event_driven", False):
+                self.inputdevice.start_events(self.read_input)
+            else:
+                self._read_timer.start()
         except Exception:
             self.device_error.call(
                      "Error while opening/initializing  input device\n\n%s" %
@@ -203,7 +228,13 @@ class JoystickReader:
 
     def stop_input(self):
         """Stop reading from the input device."""
+        self._stop_reading()
+
+    def _stop_reading(self):
+        """Stop the read timer or the event thread of the input driver"""
         self._read_timer.stop()
+        if getattr(self.inputdevice, "event_driven", False):
+            self.inputdevice.stop_events()
 
     def set_yaw_limit(self, max_yaw_rate):
         """Set a new max yaw rate value."""
@@ -239,6 +270,14 @@ class JoystickReader:
     def read_input(self):
         """Read input data from the selected device"""
         try:
+            now = time.time()
+            if self._last_read is None:
+                slew_steps = 1.0
+            else:
+                slew_steps = min((now - self._last_read) / SLEW_PERIOD, 10.0)
+            self._last_read = now
+
+            trace = latency.start()
             data = self.inputdevice.read_input()
             roll = data["roll"] * self._max_rp_angle
             pitch = data["pitch"] * self._max_rp_angle
@@ -273,8 +312,9 @@ class JoystickReader:
                     emergency_stop):
                     if self._old_thrust > self._thrust_slew_limit:
                         self._old_thrust = self._thrust_slew_limit
-                    if thrust < (self._old_thrust - (self._thrust_slew_rate / 100)):
-                        thrust = self._old_thrust - self._thrust_slew_rate / 100
+                    slew = self._thrust_slew_rate / 100 * slew_steps
+                    if thrust < (self._old_thrust - slew):
+                        thrust = self._old_thrust - slew
                     if raw_thrust < 0 or thrust < self._min_thrust:
                         thrust = 0
 
@@ -290,13 +330,17 @@ class JoystickReader:
 
             trimmed_roll = roll + self._trim_roll
             trimmed_pitch = pitch + self._trim_pitch
+            latency.mark(trace, "input_updated")
             self.input_updated.call(trimmed_roll, trimmed_pitch, yaw, thrust)
         except Exception:
             logger.warning("Exception while reading inputdevice: %s",
                            traceback.format_exc())
             self.device_error.call("Error reading from input device\n\n%s" %
                                      traceback.format_exc())
-            self._read_timer.stop()
+            self._stop_reading()
+        finally:
+            # Only the set-points sent from the callbacks belong to the trace
+            latency.clear()
 
     @staticmethod
     def p2t(percentage):
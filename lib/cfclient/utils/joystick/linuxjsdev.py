@@ -33,6 +33,7 @@ This module is very linux specific but should work on any CPU platform
 import struct
 import glob
 import os
+import errno
 import platform
 import ctypes
 import fcntl
@@ -97,7 +98,7 @@ class Joystick():
 
         self.device_id = device_id
 
-        self.jsfile = open("/dev/input/js{}".format(self.device_id), "r")
+        self.jsfile = open("/dev/input/js{}".format(self.device_id), "rb", 0)
         fcntl.fcntl(self.jsfile.fileno(), fcntl.F_SETFL, os.O_NONBLOCK)
 
         #Get number of axis and button
@@ -124,10 +125,18 @@ class Joystick():
         self.jsfile.close()
         self.opened = False
 
+    def fileno(self):
+        """Return the file descriptor of the device, used with select"""
+        return self.jsfile.fileno()
+
     def __initvalues(self):
         """Read the buttons and axes initial values from the js device"""
         for _ in range(len(self.axes) + len(self.buttons)):
-            data = self.jsfile.read(struct.calcsize(JS_EVENT_FMT))
+            try:
+                data = os.read(self.jsfile.fileno(),
+                               struct.calcsize(JS_EVENT_FMT))
+            except OSError:  # Not all the initial values are reported
+                break
             jsdata = struct.unpack(JS_EVENT_FMT, data)
             self.__updatestate(jsdata)
 
@@ -142,13 +151,13 @@ class Joystick():
         """ Decode a jsdev event into a dict """
         #TODO: Add timestamp?
         if jsdata[JE_TYPE] & JS_EVENT_AXIS != 0:
-            return JEvent(type=TYPE_AXIS,
+            return JEvent(evt_type=TYPE_AXIS,
                           number=jsdata[JE_NUMBER],
                           value=jsdata[JE_VALUE] / 32768.0)
         if jsdata[JE_TYPE] & JS_EVENT_BUTTON != 0:
-            return JEvent(type=TYPE_BUTTON,
+            return JEvent(evt_type=TYPE_BUTTON,
                           number=jsdata[JE_NUMBER],
-                          value=jsdata[JE_VALUE] / 32768.0)
+                          value=jsdata[JE_VALUE])
 
     def get_events(self):
         """ Returns a list of all joystick event since the last call """
@@ -159,9 +168,18 @@ class Joystick():
 
         while True:
             try:
-                data = self.jsfile.read(struct.calcsize(JS_EVENT_FMT))
-            except IOError:  # Raised when there are nothing to read
-                break
+                data = os.read(self.jsfile.fileno(),
+                               struct.calcsize(JS_EVENT_FMT))
+            except OSError as e:
+                if e.errno == errno.EAGAIN:  # Nothing more to read
+                    break
+                # The device is gone (ENODEV when unplugged)
+                self.close()
+                raise Exception("Failed to read joystick device: %s" %
+                                e.strerror)
+            if len(data) != struct.calcsize(JS_EVENT_FMT):
+                self.close()
+                raise Exception("Joystick device closed")
             jsdata = struct.unpack(JS_EVENT_FMT, data)
             self.__updatestate(jsdata)
             events.append(self.__decode_event(jsdata))
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Event driven driver for reading input devices through the Linux joystick
+(jsdev) API. Used from input.py instead of the PyGame driver on Linux.
+
+Instead of being polled the driver runs a thread blocking on the device with
+select() and calls back as soon as an event has been applied, so a new
+set-point can be sent without waiting for the next poll. The callbacks are
+limited to a maximum rate and repeated at the keepalive period when the
+sticks do not move, since the Crazyflie expects a steady set-point stream.
+
+If the device fails (e.g. is unplugged) the thread stops and calls back a
+last time, read_input() then raises so the error is reported like for the
+polled drivers and no more set-points are sent.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['LinuxJsReader']
+
+import time
+import select
+import logging
+import threading
+
+from .joystick.linuxjsdev import Joystick
+from .joystick.constants import TYPE_BUTTON, TYPE_AXIS
+
+logger = logging.getLogger(__name__)
+
+# Time between two callbacks when no event is received
+KEEPALIVE_PERIOD = 0.01
+
+
+class LinuxJsReader():
+    """Used for reading data from input devices using the jsdev API."""
+
+    # The reader calls back on its own instead of being polled
+    event_driven = True
+
+    def __init__(self, max_rate=500):
+        self.inputMap = None
+        self.j = Joystick()
+        self.data = None
+        self._axes = []
+        self._buttons = []
+        self._min_interval = 1.0 / max_rate
+        self._thread = None
+        self._stop = False
+        self._error = None
+
+    def set_max_rate(self, max_rate):
+        """Set the maximum number of callbacks per second"""
+        self._min_interval = 1.0 / max_rate
+
+    def _compile_map(self, inputMap):
+        """
+        Compile the mapping into two lists indexed by axis and button number,
+        holding (key, scale) or None when not mapped.
+        """
+        self._axes = []
+        self._buttons = []
+        for m in inputMap.values():
+            if m["type"] == "Input.AXIS":
+                table = self._axes
+            elif m["type"] == "Input.BUTTON":
+                table = self._buttons
+            else:
+                continue
+            if m["id"] >= len(table):
+                table.extend([None] * (m["id"] + 1 - len(table)))
+            table[m["id"]] = (m["key"], m["scale"])
+
+    def start_input(self, deviceId, inputMap):
+        """Initalize the reading and open the device with deviceId and set the
+        mapping for axis/buttons using the inputMap"""
+        self.data = {"roll": 0.0, "pitch": 0.0, "yaw": 0.0, "thrust": 0.0,
+                     "pitchcal": 0.0, "rollcal": 0.0, "estop": False,
+                     "exit": False, "althold": False}
+        self.inputMap = inputMap
+        self._compile_map(inputMap)
+        self.j.close()
+        self.j.open(deviceId)
+
+    def start_events(self, callback):
+        """Start the thread calling callback when new input is available"""
+        self.stop_events()
+        self._stop = False
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(callback,),
+                                        name="LinuxJsReader")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop_events(self):
+        """Stop the event thread, can be called from the callback"""
+        self._stop = True
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _apply(self, e):
+        """Update the data from one event using the compiled mapping"""
+        if e.type == TYPE_AXIS:
+            if e.number < len(self._axes) and self._axes[e.number]:
+                (key, scale) = self._axes[e.number]
+                self.data[key] = e.value * scale
+        elif e.type == TYPE_BUTTON:
+            if e.number < len(self._buttons) and self._buttons[e.number]:
+                (key, scale) = self._buttons[e.number]
+                if e.value:
+                    if key == "estop":
+                        self.data["estop"] = not self.data["estop"]
+                    elif key == "exit":
+                        self.data["exit"] = True
+                    elif key == "althold":
+                        self.data["althold"] = not self.data["althold"]
+                    else:  # Generic cal for pitch/roll
+                        self.data[key] = scale
+                elif key == "althold":
+                    self.data["althold"] = False
+
+    def _run(self, callback):
+        """Block on the device and call back on new events"""
+        last = 0.0
+        pending = False
+        while not self._stop:
+            now = time.time()
+            if pending:
+                timeout = max(last + self._min_interval - now, 0.0)
+            else:
+                timeout = max(last + KEEPALIVE_PERIOD - now, 0.0)
+            try:
+                (readable, _, _) = select.select([self.j], [], [], timeout)
+                if self._stop:
+                    break
+                events = self.j.get_events() if readable else []
+            except Exception as e:
+                if not self._stop:
+                    logger.warning("Input device failed: %s", e)
+                    self._error = "Input device failed: %s" % e
+                    # Let the reader find out from read_input()
+                    callback()
+                break
+            if readable:
+                for e in events:
+                    if e:
+                        self._apply(e)
+                pending = True
+            now = time.time()
+            if now - last >= self._min_interval and (
+                    pending or now - last >= KEEPALIVE_PERIOD):
+                last = now
+                pending = False
+                callback()
+
+    def read_input(self):
+        """Return the input data, the pitch/roll cal are "oneshot" and are
+        reset once read."""
+        if self._error:
+            raise Exception(self._error)
+        data = dict(self.data)
+        self.data["pitchcal"] = 0.0
+        self.data["rollcal"] = 0.0
+        return data
+
+    def enableRawReading(self, deviceId):
+        """Enable reading of raw values (without mapping)"""
+        self.j.close()
+        self.j.open(deviceId)
+
+    def disableRawReading(self):
+        """Disable raw reading"""
+        self.j.close()
+
+    def readRawValues(self):
+        """Read out the raw values from the device"""
+        rawaxis = {}
+        rawbutton = {}
+
+        for e in self.j.get_events():
+            if e and e.type == TYPE_BUTTON:
+                rawbutton[e.number] = e.value
+            elif e and e.type == TYPE_AXIS:
+                rawaxis[e.number] = e.value
+
+        return [rawaxis, rawbutton]
+
+    def getAvailableDevices(self):
+        """List all the available devices."""
+        devices = self.j.available_devices()
+        return [{"id": i, "name": devices[i]} for i in sorted(devices)]
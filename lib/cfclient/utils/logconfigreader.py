@@ -47,17 +47,29 @@ import sys
 
 logger = logging.getLogger(__name__)
 
-from PyQt4 import QtCore, QtGui, uic
-from PyQt4.QtCore import pyqtSlot, pyqtSignal
-
 from cflib.crazyflie.log import LogVariable, LogConfig
 
+# Number of (configuration files, TOC CRC) combinations to keep plans for
+MAX_CACHED_PLANS = 8
+
 
 class LogConfigReader():
-    """Reads logging configurations from file"""
+    """
+    Reads logging configurations from file. The parsed files are cached and
+    only parsed again when their modification time or size changes. The
+    LogBlockPlans of the configurations are cached by files and TOC CRC, so
+    that connecting again to a known firmware does not validate them again.
+    """
 
     def __init__(self, crazyflie):
         self.dsList = []
+        # The parsed files by path as (mtime, size, spec), spec being None
+        # if the file could not be parsed
+        self._files = {}
+        self._dir_mtime = None
+        self._paths = []
+        # The plans as lists following the specs, by (files, TOC CRC)
+        self._plans = {}
         # Check if user config exists, otherwise copy files
         if (not os.path.isdir(sys.path[1] + "/log")):
             logger.info("No user config found, copying dist files")
@@ -68,44 +80,90 @@ class LogConfigReader():
         self._cf = crazyflie
         self._cf.connectSetupFinished.add_callback(self._connected)
 
+    def _parse_config_file(self, path):
+        """Parse a log configuration file into a spec, see _new_config()"""
+        logger.info("Parsing [%s]", os.path.basename(path))
+        json_data = open(path)
+        try:
+            data = json.load(json_data)
+        finally:
+            json_data.close()
+        infoNode = data["logconfig"]["logblock"]
+        variables = []
+        for v in infoNode["variables"]:
+            if v["type"] == "TOC":
+                variables.append((str(v["name"]), v["fetch_as"]))
+            else:
+                variables.append(("Mem", v["fetch_as"], v["stored_as"],
+                                  int(v["address"], 16)))
+        return (infoNode["name"], int(infoNode["period"]), variables)
+
+    def _new_config(self, spec):
+        """Create a LogConfig from a parsed file"""
+        (name, period, variables) = spec
+        logConf = LogConfig(name, period)
+        for v in variables:
+            if len(v) == 2:
+                logConf.add_variable(*v)
+            else:
+                logConf.add_memory(*v)
+        return logConf
+
     def _read_config_files(self):
-        """Read and parse log configurations"""
-        configsfound = [os.path.basename(f) for f in
-                        glob.glob(sys.path[1] + "/log/[A-Za-z_-]*.json")]
-        new_dsList = []
-        for conf in configsfound:
+        """
+        Return the files as a tuple of (path, mtime, size) and the specs of
+        the ones that could be parsed
+        """
+        directory = sys.path[1] + "/log"
+        dir_mtime = os.stat(directory).st_mtime
+        if dir_mtime != self._dir_mtime:
+            # Files were added or removed
+            self._paths = sorted(glob.glob(directory + "/[A-Za-z_-]*.json"))
+            self._dir_mtime = dir_mtime
+        files = []
+        specs = []
+        for path in self._paths:
             try:
-                logger.info("Parsing [%s]", conf)
-                json_data = open(sys.path[1] + "/log/%s" % conf)
-                self.data = json.load(json_data)
-                infoNode = self.data["logconfig"]["logblock"]
-
-                logConf = LogConfig(infoNode["name"],
-                                    int(infoNode["period"]))
-                for v in self.data["logconfig"]["logblock"]["variables"]:
-                    if v["type"] == "TOC":
-                        logConf.add_variable(str(v["name"]), v["fetch_as"])
-                    else:
-                        logConf.add_variable("Mem", v["fetch_as"],
-                                             v["stored_as"],
-                                             int(v["address"], 16))
-                new_dsList.append(logConf)
-                json_data.close()
-            except Exception as e:
-                logger.warning("Exception while parsing logconfig file: %s", e)
-        self.dsList = new_dsList
+                st = os.stat(path)
+            except OSError:
+                continue
+            cached = self._files.get(path)
+            if cached and cached[:2] == (st.st_mtime, st.st_size):
+                spec = cached[2]
+            else:
+                try:
+                    spec = self._parse_config_file(path)
+                except Exception as e:
+                    logger.warning("Exception while parsing logconfig file:"
+                                   " %s", e)
+                    spec = None
+                self._files[path] = (st.st_mtime, st.st_size, spec)
+            files.append((path, st.st_mtime, st.st_size))
+            if spec is not None:
+                specs.append(spec)
+        for path in set(self._files) - set(self._paths):
+            del self._files[path]
+        return (tuple(files), specs)
 
     def _connected(self, link_uri):
         """Callback that is called once Crazyflie is connected"""
 
-        self._read_config_files()
+        (files, specs) = self._read_config_files()
+        key = (files, self._cf.log.toc.crc)
+        plans = self._plans.get(key, [None] * len(specs))
+        self.dsList = [self._new_config(spec) for spec in specs]
         # Just add all the configurations. Via callbacks other parts of the
         # application will pick up these configurations and use them
-        for d in self.dsList:
-            self._cf.log.add_config(d)
+        for (d, plan) in zip(self.dsList, plans):
+            self._cf.log.add_config(d, plan)
             if not d.valid:
                 logger.warning("Could not add log configuration [%s]",
                                d.name)
+        if key[1] is not None and key not in self._plans:
+            if len(self._plans) >= MAX_CACHED_PLANS:
+                self._plans.clear()
+            self._plans[key] = [d.plan if d.valid else None
+                                for d in self.dsList]
 
     def getLogConfigs(self):
         """Return the log configurations"""
@@ -41,6 +41,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 from cflib.crazyflie.log import LogConfig
+from cflib.utils.callbacks import BLOCK
 
 import traceback
 
@@ -90,9 +91,10 @@ class LogWriter():
     def stop(self):
         """Stop the logging to file"""
         if self._file:
+            # Waits for the queued data to be written
+            self._block.data_received_cb.remove_callback(self._new_data)
             self._file.close()
             self._file = None
-            self._block.data_received_cb.remove_callback(self._new_data)
             logger.info("Stopped logging of block [%s] to file [%s]",
                         self._block.name, self._filename)
             self._header_values = []
@@ -102,6 +104,10 @@ class LogWriter():
         if not self._file:
             self._file = open(self._filename, 'w')
             self._write_header()
-            self._block.data_received_cb.add_callback(self._new_data)
+            # Written from a dedicated thread so the file access does not
+            # stall the reception, no data is dropped
+            self._block.data_received_cb.add_callback(self._new_data,
+                                                      queue_size=1000,
+                                                      policy=BLOCK)
             logger.info("Started logging of block [%s] to file [%s]",
                         self._block.name, self._filename)
\ No newline at end of file
@@ -28,42 +28,220 @@
 """
 Implementation of a periodic timer that will call a callback every time
 the timer expires once started.
+
+All the periodic timers are run from one shared thread (TimerService). The
+expiries are scheduled on absolute deadlines from a monotonic clock, so the
+period does not drift with the time spent in the callbacks. When a callback
+makes a timer miss one or more deadlines the missed periods are skipped and
+counted as overruns instead of being fired back to back.
 """
 
 __author__ = 'Bitcraze AB'
-__all__ = ['PeriodicTimer']
+__all__ = ['PeriodicTimer', 'TimerService']
 
+import os
+import time
+import heapq
+import ctypes
+import ctypes.util
 import logging
-from threading import Timer
+import threading
 from cflib.utils.callbacks import Caller
+from cfclient.utils.singleton import Singleton
 
 logger = logging.getLogger(__name__)
 
+
+def _make_monotonic():
+    """Return a monotonic clock in seconds, time.time() if there is none"""
+    if os.name == "posix":
+        try:
+            class _Timespec(ctypes.Structure):
+                _fields_ = [("tv_sec", ctypes.c_long),
+                            ("tv_nsec", ctypes.c_long)]
+            librt = ctypes.CDLL(ctypes.util.find_library("rt") or
+                                ctypes.util.find_library("c"), use_errno=True)
+            clock_gettime = librt.clock_gettime
+            clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_Timespec)]
+            # CLOCK_MONOTONIC is 1 on Linux, 6 on OSX
+            clock_id = 6 if os.uname()[0] == "Darwin" else 1
+            t = _Timespec()
+            if clock_gettime(clock_id, ctypes.byref(t)) == 0:
+                def monotonic():
+                    clock_gettime(clock_id, ctypes.byref(t))
+                    return t.tv_sec + t.tv_nsec * 1e-9
+                return monotonic
+        except Exception:
+            pass
+    logger.info("No monotonic clock available, using the wall clock")
+    return time.time
+
+monotonic = _make_monotonic()
+
+
+class _TimerStats():
+    """Jitter statistics of one periodic timer"""
+    def __init__(self, period):
+        self.period = period
+        self.reset()
+
+    def reset(self):
+        self.expiries = 0
+        self.overruns = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+        self.max_run_time = 0.0
+        self._last = None
+        self._intervals = 0
+        self._sum_interval = 0.0
+        self._sum_interval_sq = 0.0
+        self.min_interval = None
+        self.max_interval = None
+
+    def add(self, deadline, fired, run_time):
+        self.expiries += 1
+        lateness = fired - deadline
+        self.total_lateness += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        self.max_run_time = max(self.max_run_time, run_time)
+        if self._last is not None:
+            interval = fired - self._last
+            self._intervals += 1
+            self._sum_interval += interval
+            self._sum_interval_sq += interval * interval
+            self.min_interval = min(self.min_interval, interval) \
+                if self.min_interval is not None else interval
+            self.max_interval = max(self.max_interval, interval)
+        self._last = fired
+
+    def get(self):
+        mean = 0.0
+        jitter = 0.0
+        if self._intervals:
+            mean = self._sum_interval / self._intervals
+            variance = self._sum_interval_sq / self._intervals - mean * mean
+            jitter = max(variance, 0.0) ** 0.5
+        return {"period": self.period,
+                "expiries": self.expiries,
+                "overruns": self.overruns,
+                "mean_lateness": (self.total_lateness / self.expiries
+                                  if self.expiries else 0.0),
+                "max_lateness": self.max_lateness,
+                "max_run_time": self.max_run_time,
+                "mean_interval": mean,
+                "min_interval": self.min_interval or 0.0,
+                "max_interval": self.max_interval or 0.0,
+                "rate": 1.0 / mean if mean else 0.0,
+                "jitter": jitter}
+
+
+class TimerService():
+    """Thread running the callbacks of all the started periodic timers"""
+    __metaclass__ = Singleton
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        # Heap of (deadline, sequence, generation, timer)
+        self._heap = []
+        self._sequence = 0
+        self._timers = set()
+        self._thread = None
+
+    def add(self, timer):
+        """Schedule the timer, the first expiry is one period from now"""
+        with self._cond:
+            self._timers.add(timer)
+            self._schedule(timer, monotonic() + timer.period)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name="TimerService")
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+    def remove(self, timer):
+        """Unschedule the timer, it will not expire again"""
+        with self._cond:
+            self._timers.discard(timer)
+            timer.generation += 1
+
+    def get_stats(self):
+        """Return the jitter statistics of the started timers by name"""
+        with self._cond:
+            return dict((t.name, t.stats.get()) for t in self._timers)
+
+    def _schedule(self, timer, deadline):
+        self._sequence += 1
+        heapq.heappush(self._heap, (deadline, self._sequence,
+                                    timer.generation, timer))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    (deadline, seq, generation, timer) = self._heap[0]
+                    if generation != timer.generation:
+                        # Stopped or restarted since it was scheduled
+                        heapq.heappop(self._heap)
+                        continue
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        heapq.heappop(self._heap)
+                        break
+                    self._cond.wait(remaining)
+
+            fired = monotonic()
+            try:
+                timer.expired()
+            except Exception:
+                logger.exception("Exception in periodic timer %s",
+                                 timer.name)
+            done = monotonic()
+            timer.stats.add(deadline, fired, done - fired)
+
+            with self._cond:
+                if generation != timer.generation:
+                    continue
+                next_deadline = deadline + timer.period
+                if next_deadline <= done:
+                    # Overrun, skip the periods that were missed
+                    missed = int((done - next_deadline) / timer.period) + 1
+                    timer.stats.overruns += missed
+                    next_deadline += missed * timer.period
+                self._schedule(timer, next_deadline)
+
+
 class PeriodicTimer:
     """Create a periodic timer that will periodicall call a callback"""
-    def __init__(self, period, callback):
+    def __init__(self, period, callback, name=None):
         self._callbacks = Caller()
         self._callbacks.add_callback(callback)
         self._started = False
-        self._period = period
-        self._timer = Timer(period, self._expired)
-        self._timer.daemon = True
+        self.period = period
+        self.name = name or getattr(callback, "__name__", "timer")
+        self.generation = 0
+        self.stats = _TimerStats(period)
 
     def start(self):
         """Start the timer"""
-        self._timer = Timer(self._period, self._expired)
-        self._timer.daemon = True
-        self._timer.start()
+        if self._started:
+            return
         self._started = True
+        self.stats.reset()
+        TimerService().add(self)
 
     def stop(self):
         """Stop the timer"""
-        self._timer.cancel()
         self._started = False
+        TimerService().remove(self)
 
-    def _expired(self):
-        """Callback for the expired internal timer"""
-        self._callbacks.call()
-        if self._started:
-            self.start() 
+    def get_stats(self):
+        """Return the jitter statistics of the timer since it was started"""
+        return self.stats.get()
 
+    def expired(self):
+        """Called by the timer service when the timer expires"""
+        self._callbacks.call()
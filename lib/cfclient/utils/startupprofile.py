@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Measure how long the different parts of the client takes to import and
+create during startup. Enabled with the --profile-startup option.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['StartupProfile']
+
+import time
+from contextlib import contextmanager
+
+from cfclient.utils.singleton import Singleton
+
+
+class StartupProfile():
+    """Singleton collecting the time spent on each startup component"""
+    __metaclass__ = Singleton
+
+    def __init__(self):
+        self.enabled = False
+        self._start = time.time()
+        self._entries = []
+
+    def enable(self):
+        """Start profiling, the total time is counted from here"""
+        self.enabled = True
+        self._start = time.time()
+
+    @contextmanager
+    def measure(self, name):
+        """Context manager measuring the time of the enclosed block"""
+        if not self.enabled:
+            yield
+            return
+        start = time.time()
+        try:
+            yield
+        finally:
+            self._entries.append((name, time.time() - start))
+
+    def report(self):
+        """Print the measured components, slowest first"""
+        if not self.enabled:
+            return
+        print "Startup profile (%.0f ms in total):" % (
+            (time.time() - self._start) * 1000)
+        for (name, duration) in sorted(self._entries, key=lambda e: -e[1]):
+            print "  %8.1f ms  %s" % (duration * 1000, name)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Load the Qt Designer .ui files of the client. The .ui files are compiled to
+Python modules at install time (see compile_ui_files) since parsing them with
+uic at every startup is slow. If there is no up to date compiled module the
+.ui file is loaded with uic as before.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['load_ui_type', 'compile_ui_files']
+
+import os
+import imp
+import glob
+import xml.etree.ElementTree as ElementTree
+
+import logging
+logger = logging.getLogger(__name__)
+
+from PyQt4 import QtGui, uic
+
+from cfclient.utils.startupprofile import StartupProfile
+
+# Suffix of the Python module compiled from a .ui file
+COMPILED_SUFFIX = "_ui.py"
+
+
+def _compiled_name(ui_file):
+    return os.path.splitext(ui_file)[0] + COMPILED_SUFFIX
+
+
+def _load_compiled(ui_file):
+    """Return the (form class, base class) from the compiled module or None
+    if it's missing or older than the .ui file"""
+    compiled = _compiled_name(ui_file)
+    try:
+        if os.path.getmtime(compiled) < os.path.getmtime(ui_file):
+            logger.info("Compiled UI [%s] is outdated", compiled)
+            return None
+    except OSError:
+        return None
+
+    try:
+        module = imp.load_source(
+            os.path.basename(os.path.splitext(compiled)[0]), compiled)
+        form_class = [getattr(module, n) for n in dir(module)
+                      if n.startswith("Ui_")][0]
+        base_class = getattr(QtGui, module.ui_base_class)
+        return (form_class, base_class)
+    except Exception as e:
+        logger.warning("Could not load compiled UI [%s]: %s", compiled, e)
+    return None
+
+
+def load_ui_type(ui_file):
+    """Drop in replacement of uic.loadUiType using the compiled module of
+    the .ui file when available"""
+    with StartupProfile().measure("ui %s" % os.path.basename(ui_file)):
+        classes = _load_compiled(ui_file)
+        if classes is None:
+            classes = uic.loadUiType(ui_file)
+    return classes
+
+
+def compile_ui_files(root):
+    """Compile all the .ui files found under root to Python modules"""
+    for path, dirs, files in os.walk(root):
+        for ui_file in glob.glob(os.path.join(path, "*.ui")):
+            compiled = _compiled_name(ui_file)
+            base_class = ElementTree.parse(ui_file).find("widget").get("class")
+            py_file = open(compiled, "w")
+            uic.compileUi(ui_file, py_file)
+            py_file.write("\nui_base_class = \"%s\"\n" % base_class)
+            py_file.close()
+            logger.info("Compiled [%s] to [%s]", ui_file, compiled)
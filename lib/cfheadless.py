@@ -31,14 +31,21 @@ Headless client for the Crazyflie.
 
 import sys
 import os
+import atexit
 import logging
 import signal
 
 import cflib.crtp
 from cflib.crazyflie import Crazyflie
+from cflib.utils import latency
+from cflib.utils import callbacks
+from cflib.utils.telemetry import TelemetryServer
+from cflib.utils.logstream import LogStreamExporter
 import cfclient.utils
 from cfclient.utils.input import JoystickReader
 from cfclient.utils.config import Config
+from cfclient.utils.logconfigreader import LogConfigReader
+from cfclient.utils.periodictimer import PeriodicTimer
 
 if os.name == 'posix':
     print 'Disabling standard output for libraries!'
@@ -50,6 +57,9 @@ if os.name == 'posix':
 #   so it doesn't need a windowing system.
 os.environ["SDL_VIDEODRIVER"] = "dummy"
 
+# Seconds between two callback profiling reports
+PROFILE_REPORT_PERIOD = 10
+
 class HeadlessClient():
     """Crazyflie headless client"""
 
@@ -62,6 +72,8 @@ class HeadlessClient():
         self._cf = Crazyflie(ro_cache=sys.path[0]+"/cflib/cache",
                              rw_cache=sys.path[1]+"/cache")
 
+        self._log_config_reader = None
+
         signal.signal(signal.SIGINT, signal.SIG_DFL) 
 
     def setup_controller(self, input_config, input_device=0, xmode=False):
@@ -72,10 +84,16 @@ class HeadlessClient():
         if (xmode):
             self._cf.commander.set_client_xmode(xmode)
 
-        devs = self._jr.getAvailableDevices()
-        print "Will use [%s] for input" % devs[input_device]["name"]
-        self._jr.start_input(devs[input_device]["name"],
-                             input_config)
+        # The device is given by its id as listed by list_controllers, the
+        # ids can have gaps (jsN for the jsdev driver)
+        devs = [d for d in self._jr.getAvailableDevices()
+                if d["id"] == input_device]
+        if not devs:
+            print "No input device with id %d, see --controllers" % \
+                  input_device
+            sys.exit(-1)
+        print "Will use [%s] for input" % devs[0]["name"]
+        self._jr.start_input(devs[0]["name"], input_config)
 
     def list_controllers(self):
         """List the available controllers"""
@@ -105,6 +123,64 @@ class HeadlessClient():
         print "Error when reading device: {}".format(message)
         sys.exit(-1)
 
+    def _start_log_configs(self):
+        """
+        Read the log configurations from the config folder and start them all
+        once connected
+        """
+        if self._log_config_reader is None:
+            self._log_config_reader = LogConfigReader(self._cf)
+            self._cf.log.block_added_cb.add_callback(
+                lambda conf: conf.start())
+
+    def start_server(self, addresses):
+        """
+        Re-publish the telemetry to local clients. The log configurations are
+        read from the config folder and all started once connected.
+        """
+        self._start_log_configs()
+        self._server = TelemetryServer(self._cf, addresses)
+        self._server.start()
+        print "Telemetry server listening on %s" % ", ".join(addresses)
+
+    def start_export(self, prefix):
+        """
+        Export the log blocks to shared memory, see cflib.utils.logstream.
+        The log configurations are read from the config folder and all
+        started once connected.
+        """
+        self._start_log_configs()
+        self._exporter = LogStreamExporter(self._cf, prefix=prefix)
+        self._exporter.start()
+        print "Exporting the log blocks as %s-<block name>" % prefix
+
+    def start_latency_report(self, period):
+        """Trace the control path and print the latencies every period"""
+        latency.enable()
+        self._latency_timer = PeriodicTimer(period, self._print_latency,
+                                            "latency_report")
+        self._latency_timer.start()
+
+    def _print_latency(self):
+        """Print the latency report and start a new measurement"""
+        print latency.format_report()
+        latency.reset()
+
+    def start_callback_profiling(self, budget_ms, period):
+        """
+        Time the library callbacks, warn about the ones running longer than
+        budget_ms and print the report every period seconds and on exit
+        """
+        callbacks.enable_profiling(budget=budget_ms / 1000.0)
+        self._profile_timer = PeriodicTimer(period, self._print_profile,
+                                            "callback_profile")
+        self._profile_timer.start()
+        atexit.register(self._print_profile)
+
+    def _print_profile(self):
+        """Print the callback timing report"""
+        print callbacks.format_report()
+
 def main():
     """Main Crazyflie headless application"""
     import argparse
@@ -130,6 +206,32 @@ def main():
     parser.add_argument("-x", "--x-mode", action="store_true", 
                         dest="xmode", 
                         help="Enable client-side X-mode") 
+    parser.add_argument("--latency-report", action="store", nargs="?",
+                        dest="latency_report", type=float, const=5.0,
+                        metavar="SECONDS",
+                        help="Trace the latency from the input device to the"
+                             " Crazyradio and print a report every SECONDS,"
+                             " defaults to 5")
+    parser.add_argument("--profile-callbacks", action="store", nargs="?",
+                        dest="profile_callbacks", type=float, const=5.0,
+                        metavar="BUDGET_MS",
+                        help="Time the library callbacks, warn about the ones"
+                             " running longer than BUDGET_MS (defaults to 5)"
+                             " and print a report every %d seconds and on"
+                             " exit" % PROFILE_REPORT_PERIOD)
+    parser.add_argument("-s", "--server", action="append", dest="server",
+                        metavar="ADDRESS",
+                        help="Re-publish the telemetry to local clients on"
+                             " ADDRESS, tcp:<host>:<port> or unix:<path>."
+                             " Can be given several times")
+    parser.add_argument("--export-shm", action="store", nargs="?",
+                        dest="export_shm", type=str, const="cflog",
+                        metavar="PREFIX",
+                        help="Export the log blocks to shared memory as"
+                             " PREFIX-<block name>, defaults to cflog")
+    parser.add_argument("--no-input", action="store_true", dest="no_input",
+                        help="Do not use any input device, i.e. when only"
+                             " serving telemetry")
     (args, unused) = parser.parse_known_args()
 
     if args.debug:
@@ -138,12 +240,22 @@ def main():
         logging.basicConfig(level=logging.INFO)
 
     headless = HeadlessClient()
+    if args.profile_callbacks:
+        headless.start_callback_profiling(args.profile_callbacks,
+                                          PROFILE_REPORT_PERIOD)
 
     if (args.list_controllers):
         headless.list_controllers()
     else:
-        headless.setup_controller(input_config=args.input,
-                                  input_device=args.controller,
-                                  xmode=args.xmode)
+        if not args.no_input:
+            headless.setup_controller(input_config=args.input,
+                                      input_device=args.controller,
+                                      xmode=args.xmode)
+        if args.server:
+            headless.start_server(args.server)
+        if args.export_shm:
+            headless.start_export(args.export_shm)
         headless.connect_crazyflie(link_uri=args.uri)
+        if args.latency_report:
+            headless.start_latency_report(args.latency_report)
 
@@ -40,6 +40,7 @@ import time
 import struct
 import math
 import random
+import zlib
 
 import cflib.crtp
 from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
@@ -47,6 +48,18 @@ from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
 
 class Cloader:
     """Bootloader utility for the Crazyflie"""
+
+    # Flash verification modes
+    VERIFY_NONE = "none"
+    VERIFY_SAMPLED = "sampled"
+    VERIFY_FULL = "full"
+    VERIFY_MODES = [VERIFY_NONE, VERIFY_SAMPLED, VERIFY_FULL]
+
+    # Number of bytes returned by each read flash request
+    READ_CHUNK_SIZE = 25
+    # Number of chunks read back per page when doing sampled verification
+    VERIFY_SAMPLES = 4
+
     def __init__(self, link, clink_address="radio://0/110"):
         """Init the communication class by starting to comunicate with the
         link given. clink is the link address used after reseting to the
@@ -113,8 +126,7 @@ class Cloader:
                 break
 
         time.sleep(0.1)
-        self.link.close()
-        self.link = cflib.crtp.get_link_driver(self.clink_address)
+        self._reconnect()
         #time.sleep(0.1)
 
         return self._update_info()
@@ -151,17 +163,28 @@ class Cloader:
         """Try to get a connection with the bootloader by requesting info
         5 times. This let rougly 10 seconds to boot the copter ..."""
         for _ in range(0, 5):
-            self.link.close()
-            self.link = cflib.crtp.get_link_driver(self.clink_address)
+            self._reconnect()
             if self._update_info():
-                if self.protocol_version == 0:
-                    return True
-                # Set radio link to a random address
-                addr = [0xbc] + map(lambda x: random.randint(0, 255), range(4))
-                return self._set_address(addr)
+                return self.set_random_address()
 
         return False
 
+    def _reconnect(self):
+        """Reopen the link on the bootloader address. The driver of the
+        current link is reused so that several loaders can each work with
+        their own dongle."""
+        self.link.close()
+        self.link.connect(self.clink_address, None, None)
+
+    def set_random_address(self):
+        """Move the bootloader to a random radio address so that it does not
+        answer packets meant for other copters in bootloader mode. Only done
+        for bootloader protocol version 1 and later."""
+        if self.protocol_version == 0:
+            return True
+        addr = [0xbc] + map(lambda x: random.randint(0, 255), range(4))
+        return self._set_address(addr)
+
     def _set_address(self, new_address):
         """ Change copter radio address.
             This function workd only with crazyradio crtp link.
@@ -249,30 +272,109 @@ class Cloader:
 
         self.link.send_packet(pk)
 
+    def _read_flash_chunk(self, page, address):
+        """Read back one chunk of a flash page starting at address. Return
+        the data or None if the bootloader does not answer"""
+        pk = None
+        retry_counter = 5
+        while ((not pk or pk.header != 0xFF or
+                struct.unpack("<BB", pk.data[0:2]) != (0xFF, 0x1C))
+                and retry_counter >= 0):
+            pk = CRTPPacket()
+            pk.set_header(0xFF, 0xFF)
+            pk.data = struct.pack("<BBHH", 0xFF, 0x1C, page, address)
+            self.link.send_packet(pk)
+
+            pk = self.link.receive_packet(1)
+            retry_counter -= 1
+        if (retry_counter < 0):
+            return None
+
+        return pk.data[6:]
+
     def read_flash(self, page):
         """Read back a flash page from the Crazyflie and return it"""
         buff = ""
 
-        for i in range(0, int(math.ceil(self.page_size / 25.0))):
-            pk = None
-            retry_counter = 5
-            while ((not pk or pk.header != 0xFF or
-                    struct.unpack("<BB", pk.data[0:2]) != (0xFF, 0x1C))
-                    and retry_counter >= 0):
-                pk = CRTPPacket()
-                pk.set_header(0xFF, 0xFF)
-                pk.data = struct.pack("<BBHH", 0xFF, 0x1C, page, (i * 25))
-                self.link.send_packet(pk)
-
-                pk = self.link.receive_packet(1)
-                retry_counter -= 1
-            if (retry_counter < 0):
+        for i in range(0, int(math.ceil(self.page_size /
+                                        float(self.READ_CHUNK_SIZE)))):
+            chunk = self._read_flash_chunk(page, i * self.READ_CHUNK_SIZE)
+            if chunk is None:
                 return None
-            else:
-                buff += pk.data[6:]
+            buff += chunk
 
         return buff[0:1024]  # For some reason we get one byte extra here...
 
+    @staticmethod
+    def page_checksum(data):
+        """Return the CRC32 of the data of one flash page"""
+        return zlib.crc32(data) & 0xFFFFFFFF
+
+    def verify_page(self, page, data, mode=VERIFY_SAMPLED):
+        """Verify that the flash page contains data.
+
+        In full mode the complete page is read back and compared with data.
+        In sampled mode only a few chunks of the page are read back and
+        compared, the page is only read back completely if one of them does
+        not match.
+
+        Return True if the page content is correct"""
+        if mode == Cloader.VERIFY_NONE or len(data) == 0:
+            return True
+
+        if mode == Cloader.VERIFY_SAMPLED:
+            if self._verify_page_samples(page, data):
+                return True
+            logger.info("Sample mismatch on page %d, reading back the complete"
+                        " page", page)
+
+        return self._verify_page_full(page, data)
+
+    def _verify_page_full(self, page, data):
+        """Read back the complete page and compare it with data"""
+        readback = self.read_flash(page)
+        if readback is None:
+            logger.warning("Could not read back page %d", page)
+            return False
+
+        readback = readback[0:len(data)]
+        if readback != data:
+            offset = 0
+            while (offset < len(readback) and
+                   readback[offset] == data[offset]):
+                offset += 1
+            if offset < len(readback):
+                logger.warning("Verification of page %d failed at offset %d,"
+                               " expected 0x%02X but got 0x%02X", page,
+                               offset, ord(data[offset]),
+                               ord(readback[offset]))
+            else:
+                logger.warning("Verification of page %d failed, only %d of"
+                               " %d bytes read back", page, len(readback),
+                               len(data))
+            return False
+
+        return True
+
+    def _verify_page_samples(self, page, data):
+        """Read back the first, the last and a few random chunks of the page
+        and compare them with data"""
+        nbr_of_chunks = int(math.ceil(len(data) /
+                                      float(self.READ_CHUNK_SIZE)))
+        chunks = set([0, nbr_of_chunks - 1])
+        others = range(1, nbr_of_chunks - 1)
+        chunks.update(random.sample(others, min(len(others),
+                                                self.VERIFY_SAMPLES - 2)))
+
+        for chunk in sorted(chunks):
+            address = chunk * self.READ_CHUNK_SIZE
+            expected = data[address:address + self.READ_CHUNK_SIZE]
+            readback = self._read_flash_chunk(page, address)
+            if readback is None or readback[0:len(expected)] != expected:
+                return False
+
+        return True
+
     def write_flash(self, page_buffer, target_page, page_count):
         """Initate flashing of data in the buffer to flash."""
         #print "Write page", flashPage
@@ -298,6 +400,19 @@ class Cloader:
 
         return ord(pk.data[2]) == 1
 
+    def page_runs(self, pages):
+        """Split a sorted list of image page indexes into runs of consecutive
+        pages that fits in the buffer, so each run can be uploaded and
+        written with one write_flash"""
+        runs = []
+        for i in pages:
+            if (runs and runs[-1][-1] == i - 1 and
+                    len(runs[-1]) < self.buffer_pages):
+                runs[-1].append(i)
+            else:
+                runs.append([i])
+        return runs
+
     def decode_cpu_id(self, cpuid):
         """Decode the CPU id into a string"""
         ret = ()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Flash the same firmware image to a fleet of Crazyflies, using one
+bootloader per attached Crazyradio dongle in parallel.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['FleetLoader', 'FleetTarget']
+
+import time
+import Queue
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+from cflib.crtp.radiodriver import RadioDriver
+from cflib.utils.callbacks import Caller
+from .cloader import Cloader
+from .manifest import FlashManifest
+
+
+class FleetTarget():
+    """State of one copter handled by the fleet loader"""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, spec, default_link="2"):
+        """Create a target from a <cpu id>[@<channel>[/<datarate>]] spec,
+        the channel and datarate being the ones of the copter firmware"""
+        if "@" in spec:
+            self.cpu_id, self.link = spec.split("@", 1)
+        else:
+            self.cpu_id, self.link = spec, default_link
+        self.state = FleetTarget.PENDING
+        self.dongle = None
+        self.attempts = 0
+        self.progress = 0
+        self.pages = 0
+        self.bytes = 0
+        self.duration = 0.0
+        self.error = ""
+
+    def throughput(self):
+        """Flashed bytes per second for the successful attempt"""
+        if self.duration > 0:
+            return self.bytes / self.duration
+        return 0.0
+
+
+class FleetLoader():
+    """
+    Flash an image to a list of targets. One worker thread is started per
+    dongle and takes the next pending target from a shared queue, so the
+    total time is bounded by the number of dongles and not by the number of
+    copters. A failed target is put back in the queue until it has been
+    tried retries + 1 times.
+    """
+
+    def __init__(self, image, targets, dongles, verify=Cloader.VERIFY_NONE,
+                 retries=1, manifest_dir=None, delta=False):
+        self.image = image
+        self.targets = targets
+        self.dongles = dongles
+        self.verify = verify
+        self.retries = retries
+        self.delta = delta
+        self._manifest = FlashManifest(manifest_dir)
+        self._queue = Queue.Queue()
+        # All the bootloaders start on the same channel and address, only
+        # one copter at the time is reset and moved to a random address.
+        self._handshake_lock = threading.Lock()
+
+        # Called with a FleetTarget each time its state or progress change
+        self.target_updated = Caller()
+
+        self.duration = 0.0
+
+    def flash(self):
+        """Flash all the targets, blocks until done. Return the targets"""
+        for target in self.targets:
+            self._queue.put(target)
+
+        start = time.time()
+        workers = []
+        for dongle in self.dongles:
+            worker = threading.Thread(target=self._worker, args=(dongle,))
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+
+        for worker in workers:
+            # Join with a timeout to stay responsive to KeyboardInterrupt
+            while worker.is_alive():
+                worker.join(0.5)
+        self.duration = time.time() - start
+
+        return self.targets
+
+    def _update(self, target, state=None):
+        if state:
+            target.state = state
+        self.target_updated.call(target)
+
+    def _worker(self, dongle):
+        while True:
+            try:
+                target = self._queue.get(False)
+            except Queue.Empty:
+                return
+
+            target.attempts += 1
+            target.dongle = dongle
+            target.progress = 0
+            target.error = ""
+            self._update(target, FleetTarget.RUNNING)
+
+            start = time.time()
+            try:
+                success = self._flash_target(dongle, target)
+            except Exception as exp:
+                logger.warning("Flashing [%s] failed: %s", target.cpu_id,
+                               str(exp))
+                target.error = str(exp)
+                success = False
+            target.duration = time.time() - start
+
+            if success:
+                self._update(target, FleetTarget.DONE)
+            elif target.attempts <= self.retries:
+                self._update(target, FleetTarget.PENDING)
+                self._queue.put(target)
+            else:
+                self._update(target, FleetTarget.FAILED)
+
+    def _flash_target(self, dongle, target):
+        """Reset the target to its bootloader on the dongle, flash the image
+        and reset it back to firmware. Return True if successful"""
+        link = RadioDriver()
+        link.connect("radio://%d/%s" % (dongle, target.link), None, None)
+        cload = Cloader(link, "radio://%d/110" % dongle)
+        try:
+            cpu_id = cload.decode_cpu_id(target.cpu_id)
+            with self._handshake_lock:
+                if not cload.reset_to_bootloader(cpu_id):
+                    target.error = "Bootloader does not answer"
+                    return False
+                if not cload.set_random_address():
+                    target.error = "Could not move bootloader address"
+                    return False
+
+            if len(self.image) > ((cload.flash_pages - cload.start_page) *
+                                  cload.page_size):
+                target.error = "Not enough space to flash the image"
+                return False
+
+            if self.delta:
+                pages = self._manifest.delta_pages(cload, self.image)
+            else:
+                pages = range(0, int((len(self.image) - 1) /
+                                     cload.page_size) + 1)
+            target.pages = len(pages)
+            target.bytes = 0
+
+            self._manifest.invalidate(cload.cpuid)
+
+            done = 0
+            for run in cload.page_runs(pages):
+                for ctr, i in enumerate(run):
+                    data = self.image[i * cload.page_size:
+                                      (i + 1) * cload.page_size]
+                    cload.upload_buffer(ctr, 0, data)
+                    target.bytes += len(data)
+
+                if not cload.write_flash(0, cload.start_page + run[0],
+                                         len(run)):
+                    target.error = ("Error during flash operation (code %d)" %
+                                    cload.error_code)
+                    return False
+
+                for i in run:
+                    start = i * cload.page_size
+                    if not cload.verify_page(cload.start_page + i,
+                                             self.image[start:start +
+                                                        cload.page_size],
+                                             self.verify):
+                        target.error = "Verification of page %d failed" % i
+                        return False
+
+                done += len(run)
+                target.progress = int(100 * done / len(pages))
+                self._update(target)
+
+            self._manifest.insert(cload.cpuid, self.image, cload.page_size,
+                                  cload.start_page)
+            target.progress = 100
+            cload.reset_to_firmware(cpu_id)
+            return True
+        finally:
+            cload.close()
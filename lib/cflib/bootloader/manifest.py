@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Manifest of what was last flashed to each Crazyflie, used to only flash the
+pages that has changed between two firmware images.
+
+All the flashing tools share the manifests in DEFAULT_MANIFEST_DIR. Since a
+copter can still have been flashed from elsewhere, a few of the pages that the
+manifest allows to skip are read back before it is trusted.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['FlashManifest', 'DEFAULT_MANIFEST_DIR']
+
+import os
+import json
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .cloader import Cloader
+
+# Where the flashing tools store the manifests
+DEFAULT_MANIFEST_DIR = os.path.join(os.path.expanduser("~"), ".cfloader")
+
+# Number of skipped pages read back before trusting a manifest
+CHECKED_PAGES = 3
+
+
+class FlashManifest():
+    """
+    Keeps one JSON file per CPU id with the checksum of every page that was
+    flashed. If no directory is supplied nothing is stored and every page is
+    always reported as changed.
+    """
+    def __init__(self, rw_cache=None):
+        self._rw_cache = rw_cache
+        if rw_cache and not os.path.exists(rw_cache):
+            os.makedirs(rw_cache)
+
+    @staticmethod
+    def page_checksums(image, page_size):
+        """Return the checksum of each page of the image"""
+        return [Cloader.page_checksum(image[i:i + page_size])
+                for i in range(0, len(image), page_size)]
+
+    def _filename(self, cpuid):
+        return "%s/%s.json" % (self._rw_cache, cpuid.replace(":", ""))
+
+    def fetch(self, cpuid):
+        """Return the stored manifest for the CPU id or None"""
+        if not self._rw_cache:
+            return None
+        filename = self._filename(cpuid)
+        if not os.path.exists(filename):
+            return None
+        try:
+            manifest = open(filename)
+            data = json.load(manifest)
+            manifest.close()
+            return data
+        except Exception as exp:
+            logger.warning("Error while parsing manifest [%s]:%s",
+                           filename, str(exp))
+        return None
+
+    def changed_pages(self, cpuid, image, page_size, start_page):
+        """Return the index of the image pages that differ from what was last
+        flashed to the CPU id. All pages are returned if the manifest is
+        missing or was made with another flash layout."""
+        checksums = self.page_checksums(image, page_size)
+        data = self.fetch(cpuid)
+        if (not data or data.get("page_size") != page_size or
+                data.get("start_page") != start_page):
+            return range(len(checksums))
+
+        old = data.get("pages", [])
+        return [i for i in range(len(checksums))
+                if i >= len(old) or old[i] != checksums[i]]
+
+    def delta_pages(self, cload, image):
+        """Return the index of the image pages to flash with the bootloader
+        cload. The pages skipped thanks to the manifest are spot checked on
+        the copter and all the pages are returned if any of them differ."""
+        pages = self.changed_pages(cload.cpuid, image, cload.page_size,
+                                   cload.start_page)
+        changed = set(pages)
+        count = int((len(image) - 1) / cload.page_size) + 1
+        skipped = [i for i in range(count) if i not in changed]
+        if not skipped:
+            return pages
+
+        step = max(1, len(skipped) / CHECKED_PAGES)
+        for i in skipped[::step][:CHECKED_PAGES]:
+            data = image[i * cload.page_size:(i + 1) * cload.page_size]
+            if not cload.verify_page(cload.start_page + i, data,
+                                     Cloader.VERIFY_SAMPLED):
+                logger.warning("Page %d does not match the manifest of [%s],"
+                               " flashing all the pages", i, cload.cpuid)
+                return range(count)
+        return pages
+
+    def invalidate(self, cpuid):
+        """Forget what was flashed to the CPU id. Done before flashing so that
+        an interrupted flash is not mistaken for an up to date one."""
+        if self._rw_cache and os.path.exists(self._filename(cpuid)):
+            try:
+                os.remove(self._filename(cpuid))
+            except Exception as exp:
+                logger.warning("Could not remove manifest for [%s]: %s",
+                               cpuid, str(exp))
+
+    def insert(self, cpuid, image, page_size, start_page):
+        """Save the checksums of the image successfully flashed to the
+        CPU id"""
+        if not self._rw_cache:
+            return
+        filename = self._filename(cpuid)
+        try:
+            manifest = open(filename, 'w')
+            manifest.write(json.dumps({"cpuid": cpuid,
+                                       "page_size": page_size,
+                                       "start_page": start_page,
+                                       "pages": self.page_checksums(
+                                           image, page_size)},
+                                      indent=2))
+            manifest.close()
+            logger.info("Saved flash manifest to [%s]", filename)
+        except Exception as exp:
+            logger.warning("Could not save manifest to file [%s]: %s",
+                           filename, str(exp))
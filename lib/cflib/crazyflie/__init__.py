@@ -44,6 +44,7 @@ import time
 from threading import Thread
 
 from threading import Timer
+from threading import Event
 
 from .commander import Commander
 from .console import Console
@@ -53,7 +54,7 @@ from .toccache import TocCache
 
 import cflib.crtp
 
-from cflib.utils.callbacks import Caller
+from cflib.utils.callbacks import Caller, timed_call
 
 
 class State:
@@ -67,14 +68,15 @@ class State:
 class Crazyflie():
     """The Crazyflie class"""
     # Callback callers
-    disconnected = Caller()
-    connectionLost = Caller()
-    connected = Caller()
-    connectionInitiated = Caller()
-    connectSetupFinished = Caller()
-    connectionFailed = Caller()
-    receivedPacket = Caller()
-    linkQuality = Caller()
+    disconnected = Caller("Crazyflie.disconnected")
+    connectionLost = Caller("Crazyflie.connectionLost")
+    connected = Caller("Crazyflie.connected")
+    connectionInitiated = Caller("Crazyflie.connectionInitiated")
+    connectSetupFinished = Caller("Crazyflie.connectSetupFinished")
+    connectionFailed = Caller("Crazyflie.connectionFailed")
+    connectionResumed = Caller("Crazyflie.connectionResumed")
+    receivedPacket = Caller("Crazyflie.receivedPacket")
+    linkQuality = Caller("Crazyflie.linkQuality")
 
     state = State.DISCONNECTED
 
@@ -100,6 +102,12 @@ class Crazyflie():
 
         self.link_uri = ""
 
+        # Keep the session of a lost connection to resume it, see
+        # set_resume_enabled()
+        self._resume_enabled = False
+        self._interrupted_uri = None
+        self._resume_start = 0
+
         # Used for retry when no reply was sent back
         self.receivedPacket.add_callback(self._check_for_initial_packet_cb)
         self.receivedPacket.add_callback(self._check_for_answers)
@@ -122,6 +130,29 @@ class Crazyflie():
         self.connectSetupFinished.add_callback(
             lambda uri: logger.info("Callback->Connection setup finished [%s]",
                                     uri))
+        self.connectionResumed.add_callback(
+            lambda uri: logger.info("Callback->Connection resumed [%s]", uri))
+
+    def set_resume_enabled(self, enabled):
+        """
+        When enabled a connection lost after the setup is only interrupted:
+        connectionLost is called but not disconnected, and the log blocks,
+        TOCs and parameter values are kept. Opening the link to the same URI
+        resumes the connection, connectionResumed is called instead of
+        connectSetupFinished. Opening another URI, closing the link or
+        disabling the resume ends the interrupted connection and calls
+        disconnected.
+        """
+        self._resume_enabled = enabled
+        if not enabled:
+            self._end_interrupted()
+
+    def _end_interrupted(self):
+        """End the interrupted connection, if any"""
+        if self._interrupted_uri is not None:
+            uri = self._interrupted_uri
+            self._interrupted_uri = None
+            self.disconnected.call(uri)
 
     def _start_connection_setup(self):
         """Start the connection setup by refreshing the TOCs"""
@@ -132,8 +163,28 @@ class Crazyflie():
     def _param_toc_updated_cb(self):
         """Called when the param TOC has been fully updated"""
         logger.info("Param TOC finished updating")
+        self.state = State.SETUP_FINISHED
         self.connectSetupFinished.call(self.link_uri)
 
+    def _start_connection_resume(self):
+        """Resume the interrupted connection, checking the TOCs"""
+        logger.info("We are connected[%s], resume the connection",
+                    self.link_uri)
+        self._resume_start = time.time()
+        self.log.resume(self._log_toc_resumed_cb, self._toc_cache)
+
+    def _log_toc_resumed_cb(self):
+        """Called when the log TOC is checked and the blocks re-created"""
+        self.param.resume(self._param_toc_resumed_cb, self._toc_cache)
+
+    def _param_toc_resumed_cb(self):
+        """Called when the param TOC is checked and the values set again"""
+        logger.info("Connection resumed in %.3f s",
+                    time.time() - self._resume_start)
+        self._interrupted_uri = None
+        self.state = State.SETUP_FINISHED
+        self.connectionResumed.call(self.link_uri)
+
     def _log_toc_updated_cb(self):
         """Called when the log TOC has been fully updated"""
         logger.info("Log TOC finished updating")
@@ -150,7 +201,12 @@ class Crazyflie():
             self.connectionFailed.call(self.link_uri, errmsg)
         if (self.state == State.CONNECTED or
                 self.state == State.SETUP_FINISHED):
-            self.disconnected.call(self.link_uri)
+            if (self._resume_enabled and
+                    (self.state == State.SETUP_FINISHED or
+                     self._interrupted_uri is not None)):
+                self._interrupted_uri = self.link_uri
+            else:
+                self.disconnected.call(self.link_uri)
             self.connectionLost.call(self.link_uri, errmsg)
         self.state = State.DISCONNECTED
 
@@ -172,8 +228,11 @@ class Crazyflie():
     def open_link(self, link_uri):
         """
         Open the communication link to a copter at the given URI and setup the
-        connection (download log/parameter TOC).
+        connection (download log/parameter TOC). If the connection to this
+        URI was interrupted it is resumed instead, see set_resume_enabled().
         """
+        if self._interrupted_uri != link_uri:
+            self._end_interrupted()
         self.connectionInitiated.call(link_uri)
         self.state = State.INITIALIZED
         self.link_uri = link_uri
@@ -181,12 +240,16 @@ class Crazyflie():
             self.link = cflib.crtp.get_link_driver(link_uri,
                                                    self._link_quality_cb,
                                                    self._link_error_cb)
+            self.incoming.link_opened()
 
             # Add a callback so we can check that any data is comming
             # back from the copter
             self.receivedPacket.add_callback(self._check_for_initial_packet_cb)
 
-            self._start_connection_setup()
+            if self._interrupted_uri is not None:
+                self._start_connection_resume()
+            else:
+                self._start_connection_setup()
         except Exception as ex:  # pylint: disable=W0703
             # We want to catch every possible exception here and show
             # it in the user interface
@@ -208,6 +271,7 @@ class Crazyflie():
         if (self.link is not None):
             self.link.close()
             self.link = None
+        self._interrupted_uri = None
         self.disconnected.call(self.link_uri)
 
     def add_port_callback(self, port, cb):
@@ -276,10 +340,21 @@ class Crazyflie():
 
 class _IncomingPacketHandler(Thread):
     """Handles incoming packets and sends the data to the correct receivers"""
+
+    # Short enough to pick up a new link quickly when resuming, the timed
+    # wait of the queues polls at this period in Python 2 anyway
+    RECEIVE_TIMEOUT = 0.05
+
     def __init__(self, cf):
-        Thread.__init__(self)
+        Thread.__init__(self, name="IncomingPacketHandler")
         self.cf = cf
         self.cb = []
+        # Set when a link is opened, waited for while there is no link
+        self._link_opened = Event()
+
+    def link_opened(self):
+        """Wake up the handler waiting for a link"""
+        self._link_opened.set()
 
     def add_port_callback(self, port, cb):
         """Add a callback for data that comes on a specific port"""
@@ -300,14 +375,20 @@ class _IncomingPacketHandler(Thread):
         possibility to add a mask for channel and port for multiple
         hits for same callback.
         """
-        self.cb.append([port, port_mask, channel, channel_mask, cb])
+        self.cb.append([port, port_mask, channel, channel_mask, cb,
+                        "port %d/%d" % (port, channel)])
 
     def run(self):
         while(True):
-            if self.cf.link is None:
-                time.sleep(1)
+            link = self.cf.link
+            if link is None:
+                # Cleared before checking again so that a link opened in
+                # between is not missed
+                self._link_opened.clear()
+                if self.cf.link is None:
+                    self._link_opened.wait()
                 continue
-            pk = self.cf.link.receive_packet(1)
+            pk = link.receive_packet(self.RECEIVE_TIMEOUT)
 
             if pk is None:
                 continue
@@ -320,7 +401,7 @@ class _IncomingPacketHandler(Thread):
                 if (cb[0] == pk.port & cb[1] and
                         cb[2] == pk.channel & cb[3]):
                     try:
-                        cb[4](pk)
+                        timed_call(cb[5], cb[4], pk)
                     except Exception:  # pylint: disable=W0703
                         # Disregard pylint warning since we want to catch all
                         # exceptions and we can't know what will happen in
@@ -34,6 +34,7 @@ __author__ = 'Bitcraze AB'
 __all__ = ['Commander']
 
 from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
+from cflib.utils import latency
 import struct
 
 
@@ -71,4 +72,6 @@ class Commander():
         pk = CRTPPacket()
         pk.port = CRTPPort.COMMANDER
         pk.data = struct.pack('<fffH', roll, -pitch, yaw, thrust)
+        pk.trace = latency.current()
+        latency.mark(pk.trace, "send_setpoint")
         self._cf.send_packet(pk)
@@ -44,7 +44,7 @@ class Console:
     from the firmware.
     """
 
-    receivedChar = Caller()
+    receivedChar = Caller("Console.receivedChar")
 
     def __init__(self, crazyflie):
         """
@@ -64,10 +64,13 @@ States of a configuration:
 """
 
 __author__ = 'Bitcraze AB'
-__all__ = ['Log', 'LogTocElement']
+__all__ = ['Log', 'LogTocElement', 'LogSetup', 'LogBlockPlan']
 
+import os
+import time
 import struct
 import errno
+import threading
 from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
 from cflib.utils.callbacks import Caller
 from .toc import Toc, TocFetcher
@@ -97,6 +100,14 @@ GET_TOC_ELEMENT = "GET_TOC_ELEMENT"
 # The max size of a CRTP packet payload
 MAX_LOG_DATA_PACKET_SIZE = 30
 
+# The max size of the variables in a create or append block packet, after the
+# command and the block id
+MAX_SETUP_PAYLOAD = MAX_LOG_DATA_PACKET_SIZE - 2
+# Time to wait for the answers to the setup of a block before sending it
+# again, and number of times it is sent again before giving up
+SETUP_TIMEOUT = 0.2
+SETUP_RETRIES = 5
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -142,7 +153,7 @@ class LogConfig(object):
 
     def __init__(self, name, period_in_ms):
         """Initialize the entry"""
-        self.data_received_cb = Caller()
+        self.data_received_cb = Caller("LogConfig.data_received_cb")
         self.error_cb = Caller()
         self.started_cb = Caller()
         self.added_cb = Caller()
@@ -159,6 +170,8 @@ class LogConfig(object):
         self.variables = []
         self.default_fetch_as = []
         self.name = name
+        # The LogBlockPlan of the block, set when it is added
+        self.plan = None
 
     def add_variable(self, name, fetch_as=None):
         """Add a new variable to the configuration.
@@ -208,37 +221,12 @@ class LogConfig(object):
     started = property(_get_started, _set_started)
 
     def start(self):
-        """Start the logging for this entry"""
+        """
+        Start the logging for this entry, adding the block first if needed.
+        Return the LogSetup following it, see Log.start_configs().
+        """
         if (self.cf.link is not None):
-            if (self._added is False):
-                logger.debug("First time block is started, add block")
-                pk = CRTPPacket()
-                pk.set_header(5, CHAN_SETTINGS)
-                pk.data = (CMD_CREATE_BLOCK, self.id)
-                for var in self.variables:
-                    if (var.is_toc_variable() is False):  # Memory location
-                        logger.debug("Logging to raw memory %d, 0x%04X",
-                                     var.get_storage_and_fetch_byte(), var.address)
-                        pk.data += struct.pack('<B', var.get_storage_and_fetch_byte())
-                        pk.data += struct.pack('<I', var.address)
-                    else:  # Item in TOC
-                        logger.debug("Adding %s with id=%d and type=0x%02X",
-                                     var.name,
-                                     self.cf.log.toc.get_element_id(
-                                     var.name), var.get_storage_and_fetch_byte())
-                        pk.data += struct.pack('<B', var.get_storage_and_fetch_byte())
-                        pk.data += struct.pack('<B', self.cf.log.toc.
-                                               get_element_id(var.name))
-                logger.debug("Adding log block id {}".format(self.id))
-                self.cf.send_packet(pk)
-
-            else:
-                logger.debug("Block already registered, starting logging"
-                             " for %d", self.id)
-                pk = CRTPPacket()
-                pk.set_header(5, CHAN_SETTINGS)
-                pk.data = (CMD_START_LOGGING, self.id, self.period)
-                self.cf.send_packet(pk)
+            return self.cf.log.start_configs([self])
 
     def stop(self):
         """Stop the logging for this entry"""
@@ -268,6 +256,12 @@ class LogConfig(object):
     def unpack_log_data(self, log_data, timestamp):
         """Unpack received logging data so it represent real values according
         to the configuration in the entry"""
+        if self.plan is not None:
+            values = self.plan.layout.unpack_from(log_data)
+            self.data_received_cb.call(timestamp,
+                                       dict(zip(self.plan.names, values)),
+                                       self)
+            return
         ret_data = {}
         data_index = 0
         for var in self.variables:
@@ -345,6 +339,95 @@ class LogTocElement:
             self.access = ord(data[1]) & 0x10
 
 
+class LogBlockPlan():
+    """
+    A log configuration resolved against a TOC: the variables with their
+    types, the encoded variables of the create command and the struct layout
+    of the log data. It only depends on the variables and on the TOC, so it
+    can be reused with any configuration of the same variables as long as
+    the TOC has the same CRC.
+    """
+
+    def __init__(self, variables, toc):
+        self.variables = list(variables)
+        self.crc = toc.crc
+        self.names = [var.name for var in self.variables]
+        # The encoded variables of the create command
+        self.specs = []
+        for var in self.variables:
+            if var.is_toc_variable():
+                self.specs.append(struct.pack(
+                    '<BB', var.get_storage_and_fetch_byte(),
+                    toc.get_element_id(var.name)))
+            else:
+                self.specs.append(struct.pack(
+                    '<BI', var.get_storage_and_fetch_byte(), var.address))
+        self.layout = struct.Struct("<" + "".join(
+            LogTocElement.get_unpack_string_from_id(var.fetch_as)[1:]
+            for var in self.variables))
+
+    def is_valid_for(self, toc):
+        """Return True if the plan can be used with the TOC"""
+        return self.crc is not None and self.crc == toc.crc
+
+
+class LogSetup():
+    """
+    Setup of a set of log configurations started together, see
+    Log.start_configs(). finished is called with this object once all the
+    configurations are either started or failed.
+    """
+
+    def __init__(self, configs):
+        self.configs = list(configs)
+        # The started configurations and the failed ones as (config, message)
+        self.started = []
+        self.failed = []
+        self.finished = Caller("LogSetup.finished")
+        self.duration = None
+        self._start_time = time.time()
+        self._done = threading.Event()
+        if not self.configs:
+            self._finish()
+
+    def is_finished(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Wait until the setup is finished, return False on timeout"""
+        return self._done.wait(timeout)
+
+    def _config_done(self, config, error=None):
+        if error is None:
+            self.started.append(config)
+        else:
+            self.failed.append((config, error))
+        if len(self.started) + len(self.failed) == len(self.configs):
+            self._finish()
+
+    def _finish(self):
+        self.duration = time.time() - self._start_time
+        logger.info("Log setup of %d blocks finished in %.3f s, %d failed",
+                    len(self.configs), self.duration, len(self.failed))
+        self._done.set()
+        self.finished.call(self)
+
+
+class _BlockSetup():
+    """The setup of one block and the answers it still waits for"""
+
+    def __init__(self, block, start, setups):
+        self.block = block
+        self.start = start
+        # The LogSetups waiting for this block
+        self.setups = setups
+        # The block is created, not only started
+        self.create = not block.added
+        self.expected = []
+        self.attempts = 0
+        self.timer = None
+
+
 class Log():
     """Create log configuration"""
 
@@ -370,8 +453,13 @@ class Log():
         self.toc_updated = Caller()
         self.state = IDLE
         self.fake_toc_crc = 0xDEADBEEF
+        # The blocks being set up by id, and the setups interrupted by the
+        # loss of the link that resume() continues
+        self._setups = {}
+        self._suspended = []
+        self._setup_lock = threading.RLock()
 
-    def add_config(self, logconf):
+    def add_config(self, logconf, plan=None):
         """Add a log configuration to the logging framework.
 
         When doing this the contents of the log configuration will be validated
@@ -379,13 +467,22 @@ class Log():
         validating the configuration the variables are checked against the TOC
         to see that they actually exist. If they don't then the configuration
         cannot be used. Since a valid TOC is required, a Crazyflie has to be
-        connected when calling this method, otherwise it will fail."""
+        connected when calling this method, otherwise it will fail.
+
+        A LogBlockPlan made earlier for the same variables can be supplied,
+        it replaces the validation if it was made for the current TOC."""
 
         if not self.cf.link:
             logger.error("Cannot add configs without being connected to a "
                          "Crazyflie!")
             return
 
+        if plan is not None and plan.is_valid_for(self.toc):
+            logconf.variables = list(plan.variables)
+            logconf.default_fetch_as = []
+            self._add_valid_config(logconf, plan)
+            return
+
         # If the log configuration contains variables that we added without
         # type (i.e we want the stored as type for fetching as well) then
         # resolve this now and add them to the block again.
@@ -418,13 +515,18 @@ class Log():
 
         if (size <= MAX_LOG_DATA_PACKET_SIZE and
                 (logconf.period > 0 and logconf.period < 0xFF)):
-            logconf.valid = True
-            logconf.cf = self.cf
-            self.log_blocks.append(logconf)
-            self.block_added_cb.call(logconf)
+            self._add_valid_config(logconf,
+                                   LogBlockPlan(logconf.variables, self.toc))
         else:
             logconf.valid = False
 
+    def _add_valid_config(self, logconf, plan):
+        logconf.plan = plan
+        logconf.valid = True
+        logconf.cf = self.cf
+        self.log_blocks.append(logconf)
+        self.block_added_cb.call(logconf)
+
     def refresh_toc(self, refresh_done_callback, toc_cache):
         """Start refreshing the table of loggale variables"""
         pk = CRTPPacket()
@@ -432,6 +534,7 @@ class Log():
         pk.data = (CMD_RESET_LOGGING, )
         self.cf.send_packet(pk)
 
+        self._abort_setups("Logging reset")
         self.log_blocks = []
 
         self.toc = Toc()
@@ -439,6 +542,230 @@ class Log():
                                 self.toc, refresh_done_callback, toc_cache)
         toc_fetcher.start()
 
+    def resume(self, resume_done_callback, toc_cache):
+        """
+        Resume the logging after the connection was lost. The TOC is only
+        fetched again if its CRC changed and all the blocks that were added
+        are re-created at once, keeping their callbacks. The blocks that
+        were started are started again.
+        """
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.LOGGING, CHAN_SETTINGS)
+        pk.data = (CMD_RESET_LOGGING, )
+        self.cf.send_packet(pk)
+
+        if self.toc is None:
+            self.toc = Toc()
+        toc_fetcher = TocFetcher(self.cf, LogTocElement, CRTPPort.LOGGING,
+                                 self.toc,
+                                 lambda: self._resume_blocks(
+                                     resume_done_callback),
+                                 toc_cache)
+        toc_fetcher.start()
+
+    def _resume_blocks(self, resume_done_callback):
+        """Re-create the blocks that were added before the connection loss"""
+        with self._setup_lock:
+            suspended = dict((entry.block.id, entry)
+                             for entry in self._suspended)
+            self._suspended = []
+        pending = []
+        for block in self.log_blocks:
+            entry = suspended.get(block.id)
+            if not (block.added or block.started or entry):
+                continue
+            missing = [var.name for var in block.variables
+                       if var.is_toc_variable() and
+                       self.toc.get_element_by_complete_name(var.name) is None]
+            if missing:
+                logger.warning("Cannot resume block %d, %s not in TOC",
+                               block.id, ", ".join(missing))
+                block.valid = False
+                block.started = False
+                block.added = False
+                block.error_cb.call(block, "%s not in TOC" % missing[0])
+                if entry:
+                    for setup in entry.setups:
+                        setup._config_done(block, "%s not in TOC" % missing[0])
+                continue
+            if not block.plan.is_valid_for(self.toc):
+                # The ids might have changed with the TOC
+                block.plan = LogBlockPlan(block.variables, self.toc)
+            # Silently, the subscribers should only see a gap in the data
+            block._added = False
+            pending.append((block, block.started or (entry and entry.start),
+                            entry.setups if entry else []))
+        self._start_setups(pending)
+        resume_done_callback()
+
+    def start_configs(self, configs):
+        """
+        Start the added log configurations. The blocks are set up
+        concurrently, the create, append and start commands of each block
+        are sent at once and the setup is retried if an answer is missing.
+        Return a LogSetup reporting when all the configurations are started.
+        """
+        return self._start_setups([(block, True, []) for block in configs])
+
+    def _start_setups(self, plan):
+        """
+        Set up the blocks of the plan, as (block, start, setups) with setups
+        the LogSetups already waiting for the block
+        """
+        setup = LogSetup([block for (block, _, _) in plan])
+        with self._setup_lock:
+            for (block, start, setups) in plan:
+                old = self._setups.pop(block.id, None)
+                if old is not None:
+                    # Started again while being set up, take over the setup
+                    old.timer.cancel()
+                    setups = setups + old.setups
+                    start = start or old.start
+                entry = _BlockSetup(block, start, setups + [setup])
+                if not entry.create and not entry.start:
+                    self._setup_done(entry)
+                    continue
+                self._setups[block.id] = entry
+                self._send_setup(entry)
+        return setup
+
+    def _create_commands(self, block):
+        """Return the create and append commands of the block"""
+        commands = []
+        (cmd, chunk) = (CMD_CREATE_BLOCK, "")
+        for spec in block.plan.specs:
+            if len(chunk) + len(spec) > MAX_SETUP_PAYLOAD:
+                commands.append((cmd, chunk))
+                (cmd, chunk) = (CMD_APPEND_BLOCK, "")
+            chunk += spec
+        commands.append((cmd, chunk))
+        return commands
+
+    def _send_setup(self, entry):
+        """Send all the commands of the setup of a block at once"""
+        block = entry.block
+        commands = []
+        if entry.create:
+            if entry.attempts > 0:
+                # The block might have been created by the last attempt
+                commands.append((CMD_DELETE_BLOCK, ""))
+            commands += self._create_commands(block)
+        if entry.start:
+            commands.append((CMD_START_LOGGING, chr(block.period)))
+        logger.debug("Setting up block %d, attempt %d: %s", block.id,
+                     entry.attempts, [cmd for (cmd, _) in commands])
+        entry.expected = [cmd for (cmd, _) in commands]
+        for (cmd, data) in commands:
+            pk = CRTPPacket()
+            pk.set_header(CRTPPort.LOGGING, CHAN_SETTINGS)
+            pk.data = struct.pack('<BB', cmd, block.id) + data
+            self.cf.send_packet(pk)
+        entry.timer = threading.Timer(SETUP_TIMEOUT, self._setup_timeout,
+                                      [entry, entry.attempts])
+        entry.timer.daemon = True
+        entry.timer.start()
+
+    def _setup_timeout(self, entry, attempt):
+        """Called when the answers to an attempt are missing"""
+        with self._setup_lock:
+            if (self._setups.get(entry.block.id) is not entry or
+                    entry.attempts != attempt):
+                return
+            if self.cf.link is None:
+                # The connection is lost, resume() will continue the setup
+                del self._setups[entry.block.id]
+                self._suspended.append(entry)
+                return
+            entry.attempts += 1
+            if entry.attempts > SETUP_RETRIES:
+                self._setup_failed(entry, None, "No answer from the Crazyflie")
+                return
+            logger.info("No answer to the setup of block %d, retrying",
+                        entry.block.id)
+            self._send_setup(entry)
+
+    def _setup_failed(self, entry, cmd, msg):
+        block = entry.block
+        self._setups.pop(block.id, None)
+        entry.timer.cancel()
+        logger.warning("Setup of block %d failed: %s", block.id, msg)
+        if block.added:
+            # Free what was created of the block
+            pk = CRTPPacket()
+            pk.set_header(CRTPPort.LOGGING, CHAN_SETTINGS)
+            pk.data = (CMD_DELETE_BLOCK, block.id)
+            self.cf.send_packet(pk)
+            block._added = False
+        if cmd == CMD_START_LOGGING:
+            block.started_cb.call(False)
+        else:
+            block.added_cb.call(False)
+        block.error_cb.call(block, msg)
+        for setup in entry.setups:
+            setup._config_done(block, msg)
+
+    def _setup_done(self, entry):
+        self._setups.pop(entry.block.id, None)
+        if entry.timer:
+            entry.timer.cancel()
+        if entry.start:
+            entry.block.started = True
+        for setup in entry.setups:
+            setup._config_done(entry.block)
+
+    def _setup_answer(self, cmd, id, error_status):
+        """
+        Handle an answer to a setup command, return False if the block is
+        not being set up
+        """
+        with self._setup_lock:
+            entry = self._setups.get(id)
+            if entry is None:
+                return False
+            if not entry.expected or entry.expected[0] != cmd:
+                # Late answer to an earlier attempt
+                return True
+            entry.expected.pop(0)
+            block = entry.block
+            if cmd == CMD_DELETE_BLOCK:
+                # ENOENT if the last attempt did not create it
+                pass
+            elif error_status == errno.EEXIST and cmd == CMD_CREATE_BLOCK:
+                # Left on the Crazyflie by an earlier session, delete it and
+                # try again
+                logger.info("Block %d already exists, re-creating it", id)
+                entry.timer.cancel()
+                entry.attempts += 1
+                if entry.attempts > SETUP_RETRIES:
+                    self._setup_failed(entry, cmd, "Block already exists")
+                else:
+                    self._send_setup(entry)
+                return True
+            elif error_status != 0:
+                block.err_no = error_status
+                self._setup_failed(entry, cmd, self._err_codes.get(
+                    error_status, os.strerror(error_status)))
+                return True
+            elif cmd == CMD_CREATE_BLOCK:
+                logger.debug("Have successfully added id=%d", id)
+                block.added = True
+            if not entry.expected:
+                logger.info("Have successfully set up block=%d", id)
+                self._setup_done(entry)
+            return True
+
+    def _abort_setups(self, msg):
+        """Give up all the setups, without calling the block callbacks"""
+        with self._setup_lock:
+            entries = self._setups.values() + self._suspended
+            self._setups = {}
+            self._suspended = []
+        for entry in entries:
+            if entry.timer:
+                entry.timer.cancel()
+            for setup in entry.setups:
+                setup._config_done(entry.block, msg)
+
     def _find_block(self, id):
         for block in self.log_blocks:
             if block.id == id:
@@ -455,28 +782,10 @@ class Log():
             id = ord(payload[0])
             error_status = ord(payload[1])
             block = self._find_block(id)
-            if (cmd == CMD_CREATE_BLOCK):
-                if (block is not None):
-                    if (error_status == 0):  # No error
-                        logger.debug("Have successfully added id=%d",
-                                     id)
-
-                        pk = CRTPPacket()
-                        pk.set_header(5, CHAN_SETTINGS)
-                        pk.data = (CMD_START_LOGGING, id,
-                                   block.period)
-                        self.cf.send_packet(pk)
-                        block.added = True
-                    else:
-                        msg = self._err_codes[error_status]
-                        logger.warning("Error %d when adding id=%d (%s)"
-                                       , error_status, id, msg)
-                        block.err_no = error_status
-                        block.added_cb.call(False)
-                        block.error_cb.call(block, msg)
-
-                else:
-                    logger.warning("No LogEntry to assign block to !!!")
+            if self._setup_answer(cmd, id, error_status):
+                return
+            if (cmd == CMD_CREATE_BLOCK or cmd == CMD_APPEND_BLOCK):
+                logger.debug("Ignoring late answer %d for block %d", cmd, id)
             if (cmd == CMD_START_LOGGING):
                 if (error_status == 0x00):
                     logger.info("Have successfully started logging for block=%d",
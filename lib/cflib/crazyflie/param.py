@@ -118,6 +118,8 @@ class Param():
         self.cf = crazyflie
         self.param_update_callbacks = {}
         self.group_update_callbacks = {}
+        # Values set since the TOC was fetched, set again when resuming
+        self._values = {}
         self.param_updater = _ParamUpdater(self.cf, self._param_updated)
         self.param_updater.start()
 
@@ -141,12 +143,14 @@ class Param():
         """
         if not name:
             if not group in self.group_update_callbacks:
-                self.group_update_callbacks[group] = Caller()
+                self.group_update_callbacks[group] = Caller(
+                    "Param.%s" % group)
             self.group_update_callbacks[group].add_callback(cb)
         else:
             paramname = "{}.{}".format(group, name)
             if not paramname in self.param_update_callbacks:
-                self.param_update_callbacks[paramname] = Caller()
+                self.param_update_callbacks[paramname] = Caller(
+                    "Param.%s" % paramname)
             self.param_update_callbacks[paramname].add_callback(cb)
 
     def refresh_toc(self, refresh_done_callback, toc_cache):
@@ -154,11 +158,31 @@ class Param():
         Initiate a refresh of the parameter TOC.
         """
         self.toc = Toc()
+        self._values = {}
         toc_fetcher = TocFetcher(self.cf, ParamTocElement,
                                 CRTPPort.PARAM, self.toc,
                                 refresh_done_callback, toc_cache)
         toc_fetcher.start()
 
+    def resume(self, resume_done_callback, toc_cache):
+        """
+        Resume after the connection was lost. The TOC is only fetched again
+        if its CRC changed, then the request that was not answered and all
+        the values set are sent again.
+        """
+        toc_fetcher = TocFetcher(self.cf, ParamTocElement,
+                                 CRTPPort.PARAM, self.toc,
+                                 lambda: self._resume_values(
+                                     resume_done_callback),
+                                 toc_cache)
+        toc_fetcher.start()
+
+    def _resume_values(self, resume_done_callback):
+        self.param_updater.resend_pending()
+        for (complete_name, value) in self._values.items():
+            self.set_value(complete_name, value)
+        resume_done_callback()
+
     def request_param_update(self, complete_name):
         """
         Request an update of the value for the supplied parameter.
@@ -183,6 +207,7 @@ class Param():
             pk.set_header(CRTPPort.PARAM, WRITE_CHANNEL)
             pk.data = struct.pack('<B', varid)
             pk.data += struct.pack(element.pytype, eval(value))
+            self._values[complete_name] = value
             self.param_updater.request_param_setvalue(pk)
 
 
@@ -197,6 +222,8 @@ class _ParamUpdater(Thread):
         self.cf = cf
         self.updated_callback = updated_callback
         self.request_queue = Queue()
+        # Request waiting for its answer
+        self._pending = None
         self.cf.add_port_callback(CRTPPort.PARAM, self._new_packet_cb)
 
     def request_param_setvalue(self, pk):
@@ -208,7 +235,15 @@ class _ParamUpdater(Thread):
         """Callback for newly arrived packets"""
         if (pk.channel != TOC_CHANNEL):
             self.updated_callback(pk)
-            self.wait_lock.release()
+            if self._pending is not None:
+                self._pending = None
+                self.wait_lock.release()
+
+    def resend_pending(self):
+        """Send again the request lost with the connection, if any"""
+        pk = self._pending
+        if pk is not None:
+            self.cf.send_packet(pk, expect_answer=True)
 
     def request_param_update(self, varid):
         """Place a param update request on the queue"""
@@ -221,4 +256,5 @@ class _ParamUpdater(Thread):
         while(True):
             pk = self.request_queue.get()  # Wait for request update
             self.wait_lock.acquire()
+            self._pending = pk
             self.cf.send_packet(pk, expect_answer=True)
@@ -0,0 +1,576 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Run the link to the Crazyflie in a child process.
+
+The CrazyflieProcess has the interface of the Crazyflie used by the client,
+but the link driver, the packet handling, the TOC and parameter handling and
+the decoding of the log data all run in a child process with a Crazyflie of
+its own. A busy GUI then no longer delays the radio loop or the setpoints,
+since the two processes do not share an interpreter lock.
+
+The commands and the events are sent as tuples over a pipe. The log data is
+passed through a ShmRing: each sample is a record of the block id, the log
+timestamp, the time the child received it and the values, packed with the
+struct layout of the LogBlockPlan of the block.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['CrazyflieProcess']
+
+import time
+import signal
+import struct
+import logging
+import threading
+import multiprocessing
+
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.utils.callbacks import Caller
+from cflib.utils.shmring import ShmRing
+from .log import Log, LogConfig, LogVariable, LogSetup
+from .toc import Toc
+
+logger = logging.getLogger(__name__)
+
+# Header of the log data records, block id, log timestamp and receive time
+RECORD = struct.Struct("<BId")
+RECORD_FIELDS = 3
+
+# Period of the polling of the log data ring
+RING_POLL = 0.005
+
+# Time to wait for the child to quit
+QUIT_TIMEOUT = 2.0
+
+
+def _record_struct(plan):
+    """Return the struct of the log data records of a block"""
+    return struct.Struct(RECORD.format + plan.layout.format[1:])
+
+
+def _run_link_process(conn, ring, enable_debug_driver, ro_cache, rw_cache):
+    """Entry point of the child process"""
+    # Ctrl-C is handled by the parent, that stops the child
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _LinkProcess(conn, ring, enable_debug_driver, ro_cache, rw_cache).run()
+
+
+class _LinkProcess():
+    """The child side, runs a Crazyflie on behalf of the parent"""
+
+    def __init__(self, conn, ring, enable_debug_driver, ro_cache, rw_cache):
+        import cflib.crtp
+        from cflib.crazyflie import Crazyflie
+        cflib.crtp.init_drivers(enable_debug_driver=enable_debug_driver)
+        self._conn = conn
+        self._ring = ring
+        self._send_lock = threading.Lock()
+        self._blocks = {}
+        self._setups = {}
+        self._link_quality = None
+        self._packet_ports = set()
+        self._all_packets = False
+
+        self.cf = cf = Crazyflie(ro_cache=ro_cache, rw_cache=rw_cache)
+        cf.connectionInitiated.add_callback(
+            lambda uri: self._event("connectionInitiated", uri))
+        cf.connected.add_callback(lambda uri: self._event("connected", uri))
+        cf.connectSetupFinished.add_callback(self._setup_finished)
+        cf.connectionResumed.add_callback(self._resumed)
+        cf.connectionFailed.add_callback(
+            lambda uri, msg: self._event("connectionFailed", uri, msg))
+        cf.connectionLost.add_callback(
+            lambda uri, msg: self._event("connectionLost", uri, msg))
+        cf.disconnected.add_callback(
+            lambda uri: self._event("disconnected", uri))
+        cf.linkQuality.add_callback(self._quality)
+        cf.console.receivedChar.add_callback(
+            lambda text: self._event("console", text))
+        cf.receivedPacket.add_callback(self._packet)
+
+    def _event(self, *event):
+        with self._send_lock:
+            try:
+                self._conn.send(event)
+            except (IOError, EOFError):
+                # The parent is gone, the main loop will notice it
+                pass
+
+    def run(self):
+        while True:
+            try:
+                command = self._conn.recv()
+            except (IOError, EOFError):
+                logger.info("Parent closed the pipe, quitting")
+                break
+            if command[0] == "quit":
+                break
+            try:
+                getattr(self, "_cmd_" + command[0])(*command[1:])
+            except Exception:
+                logger.exception("Command %s failed", command[0])
+        self.cf.close_link()
+
+    def _tocs(self):
+        """Send the TOCs of the connection to the parent"""
+        self._event("tocs", self.cf.log.toc.toc, self.cf.log.toc.crc,
+                    self.cf.param.toc.toc, self.cf.param.toc.crc)
+
+    def _setup_finished(self, uri):
+        # The blocks of the last connection are gone with the log reset
+        self._blocks = {}
+        self._tocs()
+        self._event("connectSetupFinished", uri)
+
+    def _resumed(self, uri):
+        self._tocs()
+        self._event("connectionResumed", uri)
+
+    def _quality(self, percentage):
+        # Called on every radio transaction, only pass on the changes
+        if percentage != self._link_quality:
+            self._link_quality = percentage
+            self._event("linkQuality", percentage)
+
+    def _packet(self, pk):
+        if self._all_packets or pk.port in self._packet_ports:
+            self._event("packet", pk.header, pk.data)
+
+    def _log_data(self, block, record):
+        """Return the unpacking of the log data of block into the ring"""
+        def unpack_log_data(log_data, timestamp):
+            values = block.plan.layout.unpack_from(log_data)
+            self._ring.put(record.pack(block.id, timestamp, time.time(),
+                                       *values))
+        return unpack_log_data
+
+    def _cmd_open_link(self, uri):
+        self._link_quality = None
+        self.cf.open_link(uri)
+
+    def _cmd_close_link(self):
+        self.cf.close_link()
+
+    def _cmd_set_resume_enabled(self, enabled):
+        self.cf.set_resume_enabled(enabled)
+
+    def _cmd_send_packet(self, header, data, expect_answer):
+        self.cf.send_packet(CRTPPacket(header, data), expect_answer)
+
+    def _cmd_subscribe_packets(self, ports, all_packets):
+        self._packet_ports = set(ports)
+        self._all_packets = all_packets
+
+    def _cmd_setpoint(self, roll, pitch, yaw, thrust):
+        self.cf.commander.send_setpoint(roll, pitch, yaw, thrust)
+
+    def _cmd_set_client_xmode(self, enabled):
+        self.cf.commander.set_client_xmode(enabled)
+
+    def _cmd_param_subscribe(self, group, name):
+        self.cf.param.add_update_callback(
+            group=group, name=name,
+            cb=lambda name, value: self._event("param", name, value))
+
+    def _cmd_set_param(self, complete_name, value):
+        self.cf.param.set_value(complete_name, value)
+
+    def _cmd_request_param(self, complete_name):
+        self.cf.param.request_param_update(complete_name)
+
+    def _cmd_add_config(self, ident, name, period_in_ms, variables):
+        block = LogConfig(name, period_in_ms)
+        block.id = ident
+        block.variables = [LogVariable(*v) for v in variables]
+        self.cf.log.add_config(block)
+        if not block.valid:
+            self._event("block", ident, "valid", False)
+            return
+        self._blocks[ident] = block
+        record = _record_struct(block.plan)
+        # The samples go to the parent instead of the data callbacks
+        block.unpack_log_data = self._log_data(block, record)
+        block.added_cb.add_callback(
+            lambda added: self._event("block", ident, "added", added))
+        block.started_cb.add_callback(
+            lambda started: self._event("block", ident, "started", started))
+        block.error_cb.add_callback(
+            lambda block, msg: self._event("block_error", ident, msg))
+
+    def _cmd_start_configs(self, setup_id, idents):
+        setup = self.cf.log.start_configs([self._blocks[ident]
+                                           for ident in idents
+                                           if ident in self._blocks])
+        setup.finished.add_callback(
+            lambda setup: self._event(
+                "setup", setup_id, [b.id for b in setup.started],
+                [(b.id, msg) for (b, msg) in setup.failed]))
+
+
+class _RemoteLog(Log):
+    """
+    The log configurations of a CrazyflieProcess. They are validated against
+    the copy of the TOC, then created in the child.
+    """
+
+    def __init__(self, crazyflie):
+        # Log.__init__ would listen to the log port, the child does it
+        self.cf = crazyflie
+        self.log_blocks = []
+        self.block_added_cb = Caller()
+        self.toc_updated = Caller()
+        self.toc = Toc()
+        self._blocks = {}
+        self._records = {}
+        self._pending_setups = {}
+        self._next_setup = 0
+        self._setup_lock = threading.RLock()
+
+    def _add_valid_config(self, logconf, plan):
+        self._blocks[logconf.id] = logconf
+        self._records[logconf.id] = _record_struct(plan)
+        self.cf._command("add_config", logconf.id, logconf.name,
+                         logconf.period_in_ms,
+                         [(v.name, v.fetch_as_string, v.type,
+                           v.stored_as_string, v.address)
+                          for v in plan.variables])
+        Log._add_valid_config(self, logconf, plan)
+
+    def start_configs(self, configs):
+        setup = LogSetup(configs)
+        with self._setup_lock:
+            self._next_setup += 1
+            self._pending_setups[self._next_setup] = setup
+            self.cf._command("start_configs", self._next_setup,
+                             [block.id for block in configs])
+        return setup
+
+    def _reset(self):
+        """The child reset the logging for a new connection"""
+        self.log_blocks = []
+        self._blocks = {}
+        self._records = {}
+
+    def _setup_done(self, setup_id, started, failed):
+        with self._setup_lock:
+            setup = self._pending_setups.pop(setup_id, None)
+        if setup is None:
+            return
+        blocks = dict((block.id, block) for block in setup.configs)
+        for ident in started:
+            setup._config_done(blocks[ident])
+        for (ident, msg) in failed:
+            setup._config_done(blocks[ident], msg)
+        # Blocks the child did not know, added before the last reset
+        for block in setup.configs:
+            if block.id not in started and block.id not in dict(failed):
+                setup._config_done(block, "Unknown block")
+
+    def _block_state(self, ident, attribute, value):
+        block = self._blocks.get(ident)
+        if block is not None:
+            setattr(block, attribute, value)
+
+    def _block_error(self, ident, msg):
+        block = self._blocks.get(ident)
+        if block is not None:
+            block.error_cb.call(block, msg)
+
+    def _samples(self, records, received_sample):
+        for data in records:
+            (ident, timestamp, receive_time) = RECORD.unpack_from(data)
+            block = self._blocks.get(ident)
+            record = self._records.get(ident)
+            if block is None or record.size != len(data):
+                continue
+            values = record.unpack(data)[RECORD_FIELDS:]
+            received_sample.call(block, receive_time)
+            block.data_received_cb.call(timestamp,
+                                        dict(zip(block.plan.names, values)),
+                                        block)
+
+
+class _RemoteParam():
+    """The parameters of a CrazyflieProcess"""
+
+    def __init__(self, crazyflie):
+        self.cf = crazyflie
+        self.toc = Toc()
+        self.param_update_callbacks = {}
+        self.group_update_callbacks = {}
+
+    def add_update_callback(self, group, name=None, cb=None):
+        """
+        Add a callback for a specific parameter name or for a whole group,
+        see Param.add_update_callback()
+        """
+        if not name:
+            callbacks = self.group_update_callbacks
+            key = group
+        else:
+            callbacks = self.param_update_callbacks
+            key = "{}.{}".format(group, name)
+        if not key in callbacks:
+            callbacks[key] = Caller("Param.%s" % key)
+            self.cf._command("param_subscribe", group, name)
+        callbacks[key].add_callback(cb)
+
+    def request_param_update(self, complete_name):
+        self.cf._command("request_param", complete_name)
+
+    def set_value(self, complete_name, value):
+        self.cf._command("set_param", complete_name, value)
+
+    def _updated(self, complete_name, value):
+        group = complete_name.split(".")[0]
+        if complete_name in self.param_update_callbacks:
+            self.param_update_callbacks[complete_name].call(complete_name,
+                                                            value)
+        if group in self.group_update_callbacks:
+            self.group_update_callbacks[group].call(complete_name, value)
+
+
+class _RemoteCommander():
+    """The commander of a CrazyflieProcess"""
+
+    def __init__(self, crazyflie):
+        self._cf = crazyflie
+
+    def set_client_xmode(self, enabled):
+        self._cf._command("set_client_xmode", enabled)
+
+    def send_setpoint(self, roll, pitch, yaw, thrust):
+        self._cf._command("setpoint", roll, pitch, yaw, thrust)
+
+
+class _RemoteConsole():
+    """The console of a CrazyflieProcess"""
+
+    def __init__(self):
+        self.receivedChar = Caller("Console.receivedChar")
+
+
+class _PacketCaller(Caller):
+    """Caller of the received packets, only forwarded while subscribed"""
+
+    def __init__(self, crazyflie, name):
+        Caller.__init__(self, name)
+        self._cf = crazyflie
+
+    def add_callback(self, cb, *args, **kwargs):
+        Caller.add_callback(self, cb, *args, **kwargs)
+        self._cf._update_packet_subscription()
+
+    def remove_callback(self, cb):
+        Caller.remove_callback(self, cb)
+        self._cf._update_packet_subscription()
+
+
+class CrazyflieProcess():
+    """
+    A Crazyflie with its link in a child process. The callbacks are called
+    from the threads reading the events and the log data of the child.
+    Call stop() to end the child process.
+    """
+
+    def __init__(self, ro_cache=None, rw_cache=None,
+                 enable_debug_driver=False, ring_size=None):
+        self.disconnected = Caller("Crazyflie.disconnected")
+        self.connectionLost = Caller("Crazyflie.connectionLost")
+        self.connected = Caller("Crazyflie.connected")
+        self.connectionInitiated = Caller("Crazyflie.connectionInitiated")
+        self.connectSetupFinished = Caller("Crazyflie.connectSetupFinished")
+        self.connectionFailed = Caller("Crazyflie.connectionFailed")
+        self.connectionResumed = Caller("Crazyflie.connectionResumed")
+        self.receivedPacket = _PacketCaller(self, "Crazyflie.receivedPacket")
+        self.linkQuality = Caller("Crazyflie.linkQuality")
+        # Called with (logconf, receive time) for each log sample, the time
+        # is when the child received it
+        self.receivedLogSample = Caller("Crazyflie.receivedLogSample")
+
+        self.link = None
+        self.link_uri = ""
+        self.commander = _RemoteCommander(self)
+        self.log = _RemoteLog(self)
+        self.console = _RemoteConsole()
+        self.param = _RemoteParam(self)
+        self._port_callbacks = {}
+
+        self._send_lock = threading.Lock()
+        if ring_size:
+            self._ring = ShmRing(ring_size)
+        else:
+            self._ring = ShmRing()
+        (self._conn, child_conn) = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_run_link_process, name="CrazyflieLink",
+            args=(child_conn, self._ring, enable_debug_driver, ro_cache,
+                  rw_cache))
+        self._process.daemon = True
+        self._process.start()
+        child_conn.close()
+
+        self._running = True
+        self._event_thread = threading.Thread(target=self._read_events,
+                                              name="CrazyflieProcessEvents")
+        self._event_thread.daemon = True
+        self._event_thread.start()
+        self._ring_thread = threading.Thread(target=self._read_ring,
+                                             name="CrazyflieProcessRing")
+        self._ring_thread.daemon = True
+        self._ring_thread.start()
+
+    def _command(self, *command):
+        with self._send_lock:
+            try:
+                self._conn.send(command)
+            except (IOError, EOFError):
+                logger.warning("Link process is gone, dropping %s",
+                               command[0])
+
+    def open_link(self, link_uri):
+        """Open the link in the child, see Crazyflie.open_link()"""
+        self.link_uri = link_uri
+        self.link = link_uri
+        self._command("open_link", link_uri)
+
+    def close_link(self):
+        """Close the link in the child"""
+        self.link = None
+        self._command("close_link")
+
+    def set_resume_enabled(self, enabled):
+        """See Crazyflie.set_resume_enabled()"""
+        self._command("set_resume_enabled", enabled)
+
+    def send_packet(self, pk, expect_answer=False):
+        """Send a packet through the link of the child"""
+        if self.link is not None:
+            self._command("send_packet", pk.header, pk.data, expect_answer)
+
+    def add_port_callback(self, port, cb):
+        """Add a callback for the packets received on port"""
+        if not port in self._port_callbacks:
+            self._port_callbacks[port] = Caller()
+        self._port_callbacks[port].add_callback(cb)
+        self._update_packet_subscription()
+
+    def remove_port_callback(self, port, cb):
+        """Remove the callback cb on port"""
+        self._port_callbacks[port].remove_callback(cb)
+        if not self._port_callbacks[port].callbacks:
+            del self._port_callbacks[port]
+        self._update_packet_subscription()
+
+    def _update_packet_subscription(self):
+        self._command("subscribe_packets", self._port_callbacks.keys(),
+                      len(self.receivedPacket.callbacks) > 0)
+
+    def get_ring_stats(self):
+        """Return the statistics of the log data ring"""
+        return self._ring.get_stats()
+
+    def stop(self):
+        """Close the link and end the child process"""
+        self._running = False
+        self._command("quit")
+        self._process.join(QUIT_TIMEOUT)
+        if self._process.is_alive():
+            logger.warning("Link process did not quit, terminating it")
+            self._process.terminate()
+        self._conn.close()
+        self._ring_thread.join()
+
+    def _read_events(self):
+        while self._running:
+            try:
+                event = self._conn.recv()
+            except (IOError, EOFError):
+                break
+            try:
+                self._dispatch(event)
+            except Exception:
+                logger.exception("Error when handling the event %s",
+                                 event[0])
+        if self._running:
+            logger.error("Link process died")
+            self._running = False
+            if self.link is not None:
+                self.link = None
+                self.connectionLost.call(self.link_uri, "Link process died")
+                self.disconnected.call(self.link_uri)
+
+    def _dispatch(self, event):
+        name = event[0]
+        args = event[1:]
+        if name == "tocs":
+            (log_toc, log_crc, param_toc, param_crc) = args
+            self.log.toc = self._mirror(log_toc, log_crc)
+            self.param.toc = self._mirror(param_toc, param_crc)
+        elif name == "param":
+            self.param._updated(*args)
+        elif name == "block":
+            self.log._block_state(*args)
+        elif name == "block_error":
+            self.log._block_error(*args)
+        elif name == "setup":
+            self.log._setup_done(*args)
+        elif name == "console":
+            self.console.receivedChar.call(*args)
+        elif name == "packet":
+            pk = CRTPPacket(*args)
+            self.receivedPacket.call(pk)
+            if pk.port in self._port_callbacks:
+                self._port_callbacks[pk.port].call(pk)
+        elif name == "linkQuality":
+            self.linkQuality.call(*args)
+        else:
+            if name == "connectSetupFinished":
+                self.log._reset()
+            elif name in ("connectionFailed", "connectionLost",
+                          "disconnected"):
+                self.link = None
+            elif name in ("connectionInitiated", "connectionResumed"):
+                self.link = args[0]
+            getattr(self, name).call(*args)
+
+    def _mirror(self, elements, crc):
+        toc = Toc()
+        toc.toc = elements
+        toc.crc = crc
+        return toc
+
+    def _read_ring(self):
+        while self._running:
+            records = self._ring.get_all()
+            if records:
+                self.log._samples(records, self.receivedLogSample)
+            else:
+                time.sleep(RING_POLL)
@@ -70,10 +70,17 @@ class Toc:
 
     def __init__(self):
         self.toc = {}
+        # CRC of the TOC in the Crazyflie, set once fetched
+        self.crc = None
+        # Index of the elements by id, rebuilt when the elements change
+        self._ids = None
+        self._ids_source = None
 
     def clear(self):
         """Clear the TOC"""
         self.toc = {}
+        self.crc = None
+        self._ids = None
 
     def add_element(self, element):
         """Add a new TocElement to the TOC container."""
@@ -82,21 +89,21 @@ class Toc:
         except KeyError:
             self.toc[element.group] = {}
             self.toc[element.group][element.name] = element
+        self._ids = None
 
     def get_element_by_complete_name(self, complete_name):
         """Get a TocElement element identified by complete name from the
         container."""
         try:
-            return self.get_element_by_id(self.get_element_id(complete_name))
+            [group, name] = complete_name.split(".", 1)
         except ValueError:
-            # Item not found
             return None
+        return self._get_element(group, name)
 
     def get_element_id(self, complete_name):
         """Get the TocElement element id-number of the element with the
         supplied name."""
-        [group, name] = complete_name.split(".")
-        element = self._get_element(group, name)
+        element = self.get_element_by_complete_name(complete_name)
         if element:
             return element.ident
         else:
@@ -114,11 +121,13 @@ class Toc:
     def get_element_by_id(self, ident):
         """Get a TocElement element identified by index number from the
         container."""
-        for group in self.toc.keys():
-            for name in self.toc[group].keys():
-                if self.toc[group][name].ident == ident:
-                    return self.toc[group][name]
-        return None
+        if self._ids is None or self._ids_source is not self.toc:
+            # The elements can also be replaced as a whole, from the cache
+            self._ids = dict((element.ident, element)
+                             for group in self.toc.values()
+                             for element in group.values())
+            self._ids_source = self.toc
+        return self._ids.get(ident)
 
 
 class TocFetcher:
@@ -151,6 +160,7 @@ class TocFetcher:
 
     def _toc_fetch_finished(self):
         """Callback for when the TOC fetching is finished"""
+        self.toc.crc = self._crc
         self.cf.remove_port_callback(self.port, self._new_packet_cb)
         logger.debug("[%d]: Done!", self.port)
         self.finished_callback()
@@ -159,8 +169,10 @@ class TocFetcher:
         """Handle a newly arrived packet"""
         chan = packet.channel
         if (chan != 0):
-            logger.error("Got packet that was not on TOC channel, TOC fetch"
-                         " will probably not succeed")
+            # Log data and setup answers still arrive while the TOC of a
+            # resumed connection is fetched
+            logger.debug("[%d]: Ignoring packet on channel %d during the TOC"
+                         " fetch", self.port, chan)
             return
         payload = struct.pack("B" * (len(packet.datal) - 1), *packet.datal[1:])
 
@@ -169,6 +181,13 @@ class TocFetcher:
             logger.debug("[%d]: Got TOC CRC, %d items and crc=0x%08X",
                          self.port, self.nbr_of_items, self._crc)
 
+            if self.toc.crc == self._crc and self.toc.toc:
+                # Resuming a connection, the TOC holder is still up to date
+                logger.info("TOC for port [%s] unchanged" % self.port)
+                self._toc_fetch_finished()
+                return
+            self.toc.clear()
+
             cache_data = self._toc_cache.fetch(self._crc)
             if (cache_data):
                 self.toc.toc = cache_data
@@ -31,35 +31,72 @@
 __author__ = 'Bitcraze AB'
 __all__ = []
 
-
+import importlib
 import logging
 logger = logging.getLogger(__name__)
 
-from .radiodriver import RadioDriver
-from .udpdriver import UdpDriver
-from .serialdriver import SerialDriver
-from .debugdriver import DebugDriver
 from .exceptions import WrongUriType
 
-DRIVERS = [RadioDriver, SerialDriver, UdpDriver, DebugDriver]
-INSTANCES = []
+# Registry of the drivers by URI scheme, as (module, class). The driver module
+# is only imported, and the driver instantiated, when its scheme is first used
+# so that users of one link type does not pay for the others.
+DRIVERS = {"radio": (".radiodriver", "RadioDriver"),
+           "serial": (".serialdriver", "SerialDriver"),
+           "udp": (".udpdriver", "UdpDriver"),
+           "debug": (".debugdriver", "DebugDriver")}
+# Order used when scanning the interfaces
+SCHEMES = ["radio", "serial", "udp", "debug"]
+# Driver instances by scheme, None if the driver could not be loaded
+INSTANCES = {}
+
+_enabled_schemes = []
+
+
+def register_driver(scheme, module, class_name):
+    """Register the driver class_name in module (absolute or relative to this
+    package) as the driver of scheme://"""
+    DRIVERS[scheme] = (module, class_name)
+    if scheme not in SCHEMES:
+        SCHEMES.append(scheme)
+    if scheme in INSTANCES:
+        del INSTANCES[scheme]
 
 
 def init_drivers(enable_debug_driver=False):
-    """Initialize all the drivers."""
-    for driver in DRIVERS:
+    """Initialize all the drivers. Nothing is loaded until used."""
+    global _enabled_schemes
+    _enabled_schemes = [scheme for scheme in SCHEMES
+                        if scheme != "debug" or enable_debug_driver]
+
+
+def _get_driver(scheme):
+    """Return the driver instance for the scheme, loading it if needed"""
+    if scheme not in _enabled_schemes or scheme not in DRIVERS:
+        return None
+    if scheme not in INSTANCES:
+        (module_name, class_name) = DRIVERS[scheme]
         try:
-            if driver != DebugDriver or enable_debug_driver:
-                INSTANCES.append(driver())
-        except Exception:  # pylint: disable=W0703
-            continue
+            module = importlib.import_module(module_name, __name__)
+            INSTANCES[scheme] = getattr(module, class_name)()
+            logger.debug("Loaded driver %s for %s://", class_name, scheme)
+        except Exception as e:  # pylint: disable=W0703
+            logger.warning("Could not load the %s:// driver: %s", scheme, e)
+            INSTANCES[scheme] = None
+    return INSTANCES[scheme]
+
+
+def _loaded_drivers():
+    """Load and return all the enabled drivers, used when all the interfaces
+    are needed"""
+    drivers = [_get_driver(scheme) for scheme in _enabled_schemes]
+    return [driver for driver in drivers if driver]
 
 
 def scan_interfaces():
     """ Scan all the interfaces for available Crazyflies """
     available = []
     found = []
-    for instance in INSTANCES:
+    for instance in _loaded_drivers():
         logger.debug("Scanning: %s", instance)
         try:
             found = instance.scan_interface()
@@ -72,7 +109,7 @@ def scan_interfaces():
 def get_interfaces_status():
     """Get the status of all the interfaces"""
     status = {}
-    for instance in INSTANCES:
+    for instance in _loaded_drivers():
         try:
             status[instance.get_name()] = instance.get_status()
         except Exception:
@@ -82,9 +119,11 @@ def get_interfaces_status():
 
 def get_link_driver(uri, link_quality_callback=None, link_error_callback=None):
     """Return the link driver for the given URI"""
-    for instance in INSTANCES:
-        try:
-            instance.connect(uri, link_quality_callback, link_error_callback)
-            return instance
-        except WrongUriType:
-            continue
+    instance = _get_driver(uri.split("://", 1)[0])
+    if instance is None:
+        return None
+    try:
+        instance.connect(uri, link_quality_callback, link_error_callback)
+        return instance
+    except WrongUriType:
+        return None
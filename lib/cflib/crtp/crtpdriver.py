@@ -65,6 +65,20 @@ class CRTPDriver:
         @return One CRTP packet or None if no packet has been received.
         """
 
+    def get_receive_stats(self):
+        """
+        Return the statistics of the receive queue, as a dict of
+        statistics by packet class. Empty if the driver does not keep any.
+        """
+        return {}
+
+    def get_send_stats(self):
+        """
+        Return the statistics of the send queue, as a dict of statistics by
+        traffic class. Empty if the driver does not keep any.
+        """
+        return {}
+
     def get_status(self):
         """
         Return a status string from the interface.
@@ -64,6 +64,8 @@ class CRTPPacket(object):
         self.header = header
         self._port = (header & 0xF0) >> 4
         self._channel = header & 0x03
+        # Latency trace following the packet, see cflib.utils.latency
+        self.trace = None
         if data:
             self._set_data(data)
 
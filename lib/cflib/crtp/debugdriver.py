@@ -44,7 +44,9 @@ from threading import Thread
 from .crtpdriver import CRTPDriver
 from .crtpstack import CRTPPacket, CRTPPort
 from .exceptions import WrongUriType
+from .priorityqueue import PriorityPacketQueue
 import Queue
+import errno
 import re
 import time
 import struct
@@ -226,6 +228,12 @@ class DebugDriver (CRTPDriver):
     def get_status(self):
         return "Ok"
 
+    def get_receive_stats(self):
+        """Return the statistics of the receive queue by packet class"""
+        if not hasattr(self, "queue"):
+            return {}
+        return self.queue.get_stats()
+
     def get_name(self):
         return "debug"
 
@@ -236,7 +244,7 @@ class DebugDriver (CRTPDriver):
 
         self.fakeLoggingThreads = []
 
-        self.queue = Queue.Queue()
+        self.queue = PriorityPacketQueue()
 
         self.linkErrorCallback = linkErrorCallback
         self.linkQualityCallback = linkQualityCallback
@@ -450,19 +458,34 @@ class DebugDriver (CRTPDriver):
             if (cmd == 0):
                 blockId = ord(pk.data[1])
                 logger.info("LOG:Adding block id=%d", blockId)
-                listofvars = pk.data[3:]
-                fakeThread = _FakeLoggingDataThread(self.queue, blockId,
-                                                    listofvars,
-                                                    self.fakeLogToc)
-                self.fakeLoggingThreads.append(fakeThread)
-                fakeThread.start()
+                status = 0x00
+                if [fb for fb in self.fakeLoggingThreads
+                        if fb.blockId == blockId]:
+                    status = errno.EEXIST
+                else:
+                    listofvars = pk.data[3:]
+                    fakeThread = _FakeLoggingDataThread(self.queue, blockId,
+                                                        listofvars,
+                                                        self.fakeLogToc)
+                    self.fakeLoggingThreads.append(fakeThread)
+                    fakeThread.start()
                 # Anser that everything is ok
                 p = CRTPPacket()
                 p.set_header(5, 1)
-                p.data = struct.pack('<BBB', 0, blockId, 0x00)
+                p.data = struct.pack('<BBB', 0, blockId, status)
                 self.queue.put(p)
             if (cmd == 1):
-                logger.warning("LOG: Appending block not implemented!")
+                blockId = ord(pk.data[1])
+                logger.info("LOG:Appending to block id=%d", blockId)
+                status = errno.ENOENT
+                for fb in self.fakeLoggingThreads:
+                    if (fb.blockId == blockId):
+                        fb.add_variables(pk.data[3:])
+                        status = 0x00
+                p = CRTPPacket()
+                p.set_header(5, 1)
+                p.data = struct.pack('<BBB', cmd, blockId, status)
+                self.queue.put(p)
             if (cmd == 2):
                 blockId = ord(pk.data[1])
                 logger.info("LOG: Should delete block %d", blockId)
@@ -471,6 +494,7 @@ class DebugDriver (CRTPDriver):
                     if (fb.blockId == blockId):
                         fb._disable_logging()
                         fb.stop()
+                        self.fakeLoggingThreads.remove(fb)
 
                         p = CRTPPacket()
                         p.set_header(5, 1)
@@ -481,7 +505,10 @@ class DebugDriver (CRTPDriver):
                 if (success is False):
                     logger.warning("LOG: Could not delete block=%d, not found",
                                    blockId)
-                    # TODO: Send back error code
+                    p = CRTPPacket()
+                    p.set_header(5, 1)
+                    p.data = struct.pack('<BBB', cmd, blockId, errno.ENOENT)
+                    self.queue.put(p)
 
             if (cmd == 3):
                 blockId = ord(pk.data[1])
@@ -519,6 +546,12 @@ class DebugDriver (CRTPDriver):
                     logger.warning("LOG:Could not pause block=%d, not found",
                                    blockId)
                     # TODO: Send back error code
+            if (cmd == 5):
+                logger.info("LOG: Reset logging")
+                for fb in self.fakeLoggingThreads:
+                    fb._disable_logging()
+                    fb.stop()
+                self.fakeLoggingThreads = []
         elif (chan > 1):
             logger.warning("LOG: Uplink packets with channes > 1 not"
                            " supported!")
@@ -543,6 +576,10 @@ class _FakeLoggingDataThread (Thread):
         self.shouldQuit = False
 
         logging.info("FakeDataLoggingThread created for blockid=%d", blockId)
+        self.add_variables(listofvars)
+
+    def add_variables(self, listofvars):
+        """Add the variables of a create or append block command"""
         i = 0
         while (i < len(listofvars)):
             varType = ord(listofvars[i])
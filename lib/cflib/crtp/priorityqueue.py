@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Queue used by the link drivers for the incoming packets. The packets are
+sorted by port and channel into classes that are served with weighted round
+robin, so that a flood of log data does not delay the answers that the
+library is waiting for.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['PriorityPacketQueue', 'DEFAULT_CLASSES']
+
+import time
+import Queue
+import threading
+from collections import deque
+
+from .crtpstack import CRTPPort
+
+# The classes as (name, weight, [(port, channel), ...]), a channel of None
+# matches all the channels of the port. Packets that does not match any class
+# goes in the last one. The weight is the number of packets taken from the
+# class before the next class gets its turn.
+# The link control and bootloader packets are both on port 0x0F.
+DEFAULT_CLASSES = [("link", 8, [(CRTPPort.LINKCTRL, None)]),
+                   ("answers", 4, [(CRTPPort.PARAM, None),
+                                   (CRTPPort.LOGGING, 0),
+                                   (CRTPPort.LOGGING, 1)]),
+                   ("logdata", 1, [(CRTPPort.LOGGING, 2)]),
+                   ("other", 2, [])]
+
+
+class _PacketClass():
+    """One class of packets with its queue and statistics"""
+    def __init__(self, name, weight, headers):
+        self.name = name
+        self.weight = weight
+        self.headers = headers
+        self.queue = deque()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.received = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def stats(self):
+        served = self.received - len(self.queue)
+        return {"weight": self.weight,
+                "depth": len(self.queue),
+                "max_depth": self.max_depth,
+                "received": self.received,
+                "mean_wait": self.total_wait / served if served else 0.0,
+                "max_wait": self.max_wait}
+
+
+class PriorityPacketQueue():
+    """
+    Drop in replacement of Queue.Queue for the incoming packets, with one
+    queue per packet class. put() never blocks and get() follows the
+    Queue.Queue semantics.
+    """
+
+    def __init__(self, classes=DEFAULT_CLASSES):
+        self._classes = [_PacketClass(n, w, h) for (n, w, h) in classes]
+        self._lookup = {}
+        for c in self._classes:
+            for header in c.headers:
+                self._lookup[header] = c
+        self._cond = threading.Condition(threading.Lock())
+        self._size = 0
+        self._current = 0
+        self._credit = self._classes[0].weight
+
+    def _classify(self, pk):
+        return (self._lookup.get((pk.port, pk.channel)) or
+                self._lookup.get((pk.port, None)) or
+                self._classes[-1])
+
+    def set_weight(self, name, weight):
+        """Set the weight (at least 1) of the class name"""
+        with self._cond:
+            for c in self._classes:
+                if c.name == name:
+                    c.weight = max(1, int(weight))
+
+    def put(self, pk, block=True, timeout=None):
+        """Add the packet to the queue of its class"""
+        with self._cond:
+            c = self._classify(pk)
+            c.queue.append((time.time(), pk))
+            c.received += 1
+            c.max_depth = max(c.max_depth, len(c.queue))
+            self._size += 1
+            self._cond.notify()
+
+    def get(self, block=True, timeout=None):
+        """Return the next packet, raise Queue.Empty like Queue.Queue"""
+        with self._cond:
+            if not block:
+                if self._size == 0:
+                    raise Queue.Empty
+            elif timeout is None:
+                while self._size == 0:
+                    self._cond.wait()
+            else:
+                end = time.time() + timeout
+                while self._size == 0:
+                    remaining = end - time.time()
+                    if remaining <= 0.0:
+                        raise Queue.Empty
+                    self._cond.wait(remaining)
+            return self._pop()
+
+    def _pop(self):
+        """Take the next packet, the queue is not empty"""
+        while True:
+            c = self._classes[self._current]
+            if c.queue and self._credit > 0:
+                self._credit -= 1
+                (ts, pk) = c.queue.popleft()
+                wait = time.time() - ts
+                c.total_wait += wait
+                c.max_wait = max(c.max_wait, wait)
+                self._size -= 1
+                return pk
+            self._current = (self._current + 1) % len(self._classes)
+            self._credit = self._classes[self._current].weight
+
+    def qsize(self):
+        return self._size
+
+    def empty(self):
+        return self._size == 0
+
+    def get_stats(self):
+        """Return the statistics of each class as a dict by class name"""
+        with self._cond:
+            return dict((c.name, c.stats()) for c in self._classes)
+
+    def reset_stats(self):
+        with self._cond:
+            for c in self._classes:
+                c.reset_stats()
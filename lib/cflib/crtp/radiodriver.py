@@ -42,6 +42,9 @@ logger = logging.getLogger(__name__)
 from cflib.crtp.crtpdriver import CRTPDriver
 from .crtpstack import CRTPPacket
 from .exceptions import WrongUriType
+from .priorityqueue import PriorityPacketQueue
+from .sendqueue import SendScheduler
+from cflib.utils import latency
 import threading
 import Queue
 import re
@@ -117,9 +120,10 @@ class RadioDriver(CRTPDriver):
         self.cradio.set_data_rate(datarate)
 
         # Prepare the inter-thread communication queue
-        self.in_queue = Queue.Queue()
-        # Limited size out queue to avoid "ReadBack" effect
-        self.out_queue = Queue.Queue(50)
+        self.in_queue = PriorityPacketQueue()
+        # Setpoints are coalesced and the other classes are limited in size
+        # to avoid "ReadBack" effect
+        self.out_queue = SendScheduler()
 
         # Launch the comm thread
         self._thread = _RadioDriverThread(self.cradio, self.in_queue,
@@ -151,10 +155,23 @@ class RadioDriver(CRTPDriver):
             except Queue.Empty:
                 return None
 
+    def get_receive_stats(self):
+        """Return the statistics of the receive queue by packet class"""
+        if self.in_queue is None:
+            return {}
+        return self.in_queue.get_stats()
+
+    def get_send_stats(self):
+        """Return the statistics of the send queue by traffic class"""
+        if self.out_queue is None:
+            return {}
+        return self.out_queue.get_stats()
+
     def send_packet(self, pk):
-        """ Send the packet pk though the link """
-        # if self.out_queue.full():
-        #    self.out_queue.get()
+        """
+        Send the packet pk though the link. Only blocks when the fifo class
+        of the packet is full, setpoints replace the one still waiting.
+        """
         if (self.cradio is None):
             return
 
@@ -278,6 +295,7 @@ class _RadioDriverThread (threading.Thread):
     def run(self):
         """ Run the receiver thread """
         dataOut = array.array('B', [0xFF])
+        trace = None
         waitTime = 0
         emptyCtr = 0
 
@@ -286,7 +304,9 @@ class _RadioDriverThread (threading.Thread):
                 break
 
             try:
-                ackStatus = self.cradio.send_packet(dataOut)
+                ackStatus = self.cradio.send_packet(dataOut, trace)
+                latency.finish(trace)
+                trace = None
             except Exception as e:
                 import traceback
                 self.link_error_callback("Error communicating with crazy radio"
@@ -343,6 +363,7 @@ class _RadioDriverThread (threading.Thread):
 
             if outPacket:
                 # print "-> " + outPacket.__str__()
+                trace = outPacket.trace
                 dataOut.append(outPacket.header)
                 for X in outPacket.data:
                     if type(X) == int:
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Scheduler used by the link drivers for the outgoing packets. The packets are
+sorted by port and channel into traffic classes that are served in strict
+priority order:
+
+ * latest  : only the last packet for each port/channel is kept, a new
+             packet replaces the one still waiting (commander setpoints)
+ * fifo    : bounded FIFO, put() blocks when full (settings, TOC requests
+             and bootloader, where every packet counts)
+ * besteffort : bounded FIFO, the oldest packet is dropped when full
+
+The time each packet waits in the scheduler is collected in one histogram
+per class.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['SendScheduler', 'DEFAULT_SEND_CLASSES', 'LATEST', 'FIFO',
+           'BEST_EFFORT']
+
+import time
+import Queue
+import threading
+from collections import deque
+
+from .crtpstack import CRTPPort
+from cflib.utils import latency
+
+LATEST = "latest"
+FIFO = "fifo"
+BEST_EFFORT = "besteffort"
+
+# Upper bounds in ms of the latency histogram buckets, the last bucket holds
+# everything above the last bound.
+HISTOGRAM_BOUNDS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+# The classes as (name, policy, depth, [(port, channel), ...]) in priority
+# order. A channel of None matches all the channels of the port and packets
+# that does not match any class goes in the last one.
+DEFAULT_SEND_CLASSES = [("setpoint", LATEST, 1, [(CRTPPort.COMMANDER, None)]),
+                        ("settings", FIFO, 50, [(CRTPPort.PARAM, None),
+                                                (CRTPPort.LOGGING, None),
+                                                (CRTPPort.LINKCTRL, None)]),
+                        ("other", BEST_EFFORT, 50, [])]
+
+
+class _SendClass():
+    """One traffic class with its queue and statistics"""
+    def __init__(self, name, policy, depth, headers):
+        self.name = name
+        self.policy = policy
+        self.depth = depth
+        self.headers = headers
+        self.queue = deque()
+        # Packets waiting in a LATEST class by (port, channel)
+        self.latest = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def add_latency(self, latency):
+        self.sent += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        ms = latency * 1000.0
+        bucket = 0
+        while bucket < len(HISTOGRAM_BOUNDS) and ms > HISTOGRAM_BOUNDS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+
+    def stats(self):
+        bounds = ["<={}ms".format(b) for b in HISTOGRAM_BOUNDS]
+        bounds.append(">{}ms".format(HISTOGRAM_BOUNDS[-1]))
+        return {"policy": self.policy,
+                "depth": len(self.queue),
+                "sent": self.sent,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "mean_latency": (self.total_latency / self.sent
+                                 if self.sent else 0.0),
+                "max_latency": self.max_latency,
+                "histogram": zip(bounds, self.histogram)}
+
+
+class SendScheduler():
+    """
+    Drop in replacement of Queue.Queue for the outgoing packets. put() only
+    blocks for the fifo classes and get() follows the Queue.Queue semantics,
+    returning the packets by class priority.
+    """
+
+    def __init__(self, classes=DEFAULT_SEND_CLASSES):
+        self._classes = [_SendClass(n, p, d, h) for (n, p, d, h) in classes]
+        self._lookup = {}
+        for c in self._classes:
+            for header in c.headers:
+                self._lookup[header] = c
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._size = 0
+
+    def _classify(self, pk):
+        return (self._lookup.get((pk.port, pk.channel)) or
+                self._lookup.get((pk.port, None)) or
+                self._classes[-1])
+
+    def put(self, pk, block=True, timeout=None):
+        """
+        Add the packet to its class, raise Queue.Full like Queue.Queue if a
+        fifo class is still full after the timeout.
+        """
+        latency.mark(pk.trace, "enqueue")
+        with self._lock:
+            c = self._classify(pk)
+            now = time.time()
+            if c.policy == LATEST:
+                key = (pk.port, pk.channel)
+                if key in c.latest:
+                    # Replace the waiting packet in place, it keeps its turn
+                    c.latest[key][0] = now
+                    c.latest[key][1] = pk
+                    c.coalesced += 1
+                    return
+                entry = [now, pk]
+                c.latest[key] = entry
+                c.queue.append(entry)
+            elif c.policy == FIFO:
+                if len(c.queue) >= c.depth:
+                    if not block:
+                        raise Queue.Full
+                    end = None if timeout is None else now + timeout
+                    while len(c.queue) >= c.depth:
+                        if end is None:
+                            self._not_full.wait()
+                        else:
+                            remaining = end - time.time()
+                            if remaining <= 0.0:
+                                raise Queue.Full
+                            self._not_full.wait(remaining)
+                c.queue.append([time.time(), pk])
+            else:
+                if len(c.queue) >= c.depth:
+                    c.queue.popleft()
+                    c.dropped += 1
+                    self._size -= 1
+                c.queue.append([now, pk])
+            self._size += 1
+            self._not_empty.notify()
+
+    def get(self, block=True, timeout=None):
+        """Return the next packet, raise Queue.Empty like Queue.Queue"""
+        with self._lock:
+            if not block:
+                if self._size == 0:
+                    raise Queue.Empty
+            elif timeout is None:
+                while self._size == 0:
+                    self._not_empty.wait()
+            else:
+                end = time.time() + timeout
+                while self._size == 0:
+                    remaining = end - time.time()
+                    if remaining <= 0.0:
+                        raise Queue.Empty
+                    self._not_empty.wait(remaining)
+            return self._pop()
+
+    def _pop(self):
+        """Take the next packet by priority, the scheduler is not empty"""
+        for c in self._classes:
+            if c.queue:
+                (ts, pk) = c.queue.popleft()
+                if c.policy == LATEST:
+                    del c.latest[(pk.port, pk.channel)]
+                elif c.policy == FIFO:
+                    self._not_full.notify_all()
+                c.add_latency(time.time() - ts)
+                latency.mark(pk.trace, "dequeue")
+                self._size -= 1
+                return pk
+
+    def qsize(self):
+        return self._size
+
+    def empty(self):
+        return self._size == 0
+
+    def get_stats(self):
+        """Return the statistics of each class as a dict by class name"""
+        with self._lock:
+            return dict((c.name, c.stats()) for c in self._classes)
+
+    def reset_stats(self):
+        with self._lock:
+            for c in self._classes:
+                c.reset_stats()
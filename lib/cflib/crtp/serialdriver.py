@@ -27,36 +27,425 @@
 #  MA  02110-1301, USA.
 
 """
-An early serial link driver. This could still be used (after some fixing) to
-run high-speed CRTP with the Crazyflie. The UART can be run at 2Mbit.
+Serial CRTP link driver, for a Crazyflie wired to a serial port (the UART can
+be run at 2Mbit) on POSIX systems.
+
+The URI is serial://<device>[/<baudrate>], the device being relative to /dev
+unless it starts with a /, ie serial://ttyUSB0/2000000 or
+serial:///dev/pts/3. The baudrate is 2000000 by default, a trailing number
+that is part of the device path is not taken as the baudrate.
+
+Each CRTP packet is sent as a frame:
+
+    0xBC 0xCF <length> <header> <data...> <crc low> <crc high>
+
+where length is the size of the header and data and the CRC is the CRC-16
+CCITT (initial value 0xFFFF) of the length, header and data. After a CRC error
+the decoder searches the next start of frame from the byte after the bad
+start of frame.
 """
 
 __author__ = 'Bitcraze AB'
-__all__ = ['SerialDriver']
+__all__ = ['SerialDriver', 'encode_frame', 'FrameDecoder', 'DEFAULT_BAUDRATE']
 
-from .crtpdriver import CRTPDriver
+import logging
+logger = logging.getLogger(__name__)
 
+from .crtpdriver import CRTPDriver
+from .crtpstack import CRTPPacket
 from .exceptions import WrongUriType
+from .priorityqueue import PriorityPacketQueue
+from .sendqueue import SendScheduler
 
+import io
+import os
 import re
+import sys
+import time
+import errno
+import Queue
+import select
+import struct
+import termios
+import binascii
+import threading
+
+SYNC = "\xBC\xCF"
+# Sync, length and CRC
+FRAME_OVERHEAD = 5
+MAX_PACKET = 32
+DEFAULT_BAUDRATE = 2000000
+# Size of the read buffer, the reader reads as much as available up to this
+READ_SIZE = 4096
+
+# Speeds above 460800 are not in the termios module of Python 2, these are
+# the values of linux/termbits.h
+_LINUX_BAUDRATES = {500000: 0o10005, 576000: 0o10006, 921600: 0o10007,
+                    1000000: 0o10010, 1152000: 0o10011, 1500000: 0o10012,
+                    2000000: 0o10013, 2500000: 0o10014, 3000000: 0o10015,
+                    3500000: 0o10016, 4000000: 0o10017}
+
+
+def _baudrates():
+    """Return the termios speed constant by baudrate"""
+    rates = {}
+    if sys.platform.startswith("linux"):
+        rates.update(_LINUX_BAUDRATES)
+    for name in dir(termios):
+        if name.startswith("B") and name[1:].isdigit():
+            rates[int(name[1:])] = getattr(termios, name)
+    return rates
+
+BAUDRATES = _baudrates()
+
 
+def encode_frame(pk):
+    """Return the frame of the CRTP packet pk"""
+    body = chr(len(pk.data) + 1) + chr(pk.header) + pk.data
+    return SYNC + body + struct.pack("<H", binascii.crc_hqx(body, 0xFFFF))
 
-class SerialDriver (CRTPDriver):
+
+class FrameDecoder():
+    """
+    Decode the frames from a stream of bytes. The bytes are read into a
+    buffer reused for the whole stream.
+    """
+
+    def __init__(self, size=READ_SIZE):
+        self.buffer = bytearray(size + MAX_PACKET + FRAME_OVERHEAD)
+        self._view = memoryview(self.buffer)
+        self._start = 0
+        self._end = 0
+        self.frames = 0
+        self.errors = 0
+
+    def read_from(self, stream):
+        """
+        Read what is available from the stream (with readinto()) in the free
+        part of the buffer, return the number of bytes read. packets() must
+        be called after each read.
+        """
+        if self._start > 0:
+            # Move the incomplete frame to the start of the buffer
+            remaining = self._end - self._start
+            self.buffer[0:remaining] = self.buffer[self._start:self._end]
+            (self._start, self._end) = (0, remaining)
+        count = stream.readinto(self._view[self._end:])
+        if count:
+            self._end += count
+        return count
+
+    def packets(self):
+        """Return the list of packets of the complete frames in the buffer"""
+        packets = []
+        buf = self.buffer
+        pos = self._start
+        end = self._end
+        while end - pos >= FRAME_OVERHEAD + 1:
+            if buf[pos] != 0xBC or buf[pos + 1] != 0xCF:
+                pos = buf.find(SYNC, pos + 1, end)
+                if pos < 0:
+                    # Keep the last byte, it could be the first sync byte
+                    pos = end - 1
+                continue
+            size = buf[pos + 2]
+            if size == 0 or size > MAX_PACKET:
+                self.errors += 1
+                pos += 1
+                continue
+            if end - pos < size + FRAME_OVERHEAD:
+                break
+            crc = buf[pos + size + 3] | (buf[pos + size + 4] << 8)
+            if binascii.crc_hqx(buffer(buf, pos + 2, size + 1),
+                                0xFFFF) != crc:
+                self.errors += 1
+                pos += 1
+                continue
+            packets.append(CRTPPacket(buf[pos + 3],
+                                      str(buf[pos + 4:pos + 3 + size])))
+            self.frames += 1
+            pos += size + FRAME_OVERHEAD
+        self._start = pos
+        return packets
+
+
+class SerialDriver(CRTPDriver):
+    """ Serial link driver """
     def __init__(self):
-        None
+        """ Create the link driver """
+        CRTPDriver.__init__(self)
+        self.uri = ""
+        self.link_error_callback = None
+        self.link_quality_callback = None
+        self.in_queue = None
+        self.out_queue = None
+        self._fd = None
+        self._thread = None
 
-    def connect(self, uri, linkQualityCallback, linkErrorCallback):
-        #check if the URI is a serial URI
+    def connect(self, uri, link_quality_callback, link_error_callback):
+        """
+        Connect the link driver to a specified URI of the format:
+        serial://<device>[/<baudrate>]
+        """
         if not re.search("^serial://", uri):
             raise WrongUriType("Not a serial URI")
 
-        #Check if it is a valid serial URI
-        uriRe = re.search("^serial://([a-z A-Z 0-9]+)/?([0-9]+)?$", uri)
-        if not uriRe:
-            raise Exception("Invalid serial URI")
+        uri_data = re.search("^serial://(.+?)(/([0-9]+))?$", uri)
+        if not uri_data:
+            raise WrongUriType("Invalid serial URI")
+
+        (device, baudrate) = (self._device(uri_data.group(1)),
+                              DEFAULT_BAUDRATE)
+        if uri_data.group(3):
+            # The last number is part of the device for serial:///dev/pts/3
+            full = self._device(uri_data.group(1) + uri_data.group(2))
+            if os.path.exists(full):
+                device = full
+            else:
+                baudrate = int(uri_data.group(3))
+        if baudrate not in BAUDRATES:
+            raise Exception("Baudrate %d not supported" % baudrate)
+
+        if self._fd is not None:
+            raise Exception("Link already open!")
+
+        self.uri = uri
+        self.link_quality_callback = link_quality_callback
+        self.link_error_callback = link_error_callback
+
+        self._fd = os.open(device, os.O_RDWR | os.O_NOCTTY)
+        try:
+            self._configure(self._fd, BAUDRATES[baudrate])
+        except termios.error:
+            os.close(self._fd)
+            self._fd = None
+            raise
+
+        self.in_queue = PriorityPacketQueue()
+        self.out_queue = SendScheduler()
+
+        self._thread = _SerialDriverThread(self._fd, self.in_queue,
+                                           self.out_queue,
+                                           link_quality_callback,
+                                           link_error_callback)
+        self._thread.start()
+
+    def _device(self, name):
+        if name.startswith("/"):
+            return name
+        return "/dev/" + name
+
+    def _configure(self, fd, speed):
+        """Set the port in raw 8N1 mode at speed"""
+        attrs = termios.tcgetattr(fd)
+        # iflag, oflag, cflag, lflag, ispeed, ospeed, cc
+        attrs[0] = 0
+        attrs[1] = 0
+        attrs[2] = termios.CS8 | termios.CREAD | termios.CLOCAL
+        attrs[3] = 0
+        attrs[4] = speed
+        attrs[5] = speed
+        attrs[6][termios.VMIN] = 1
+        attrs[6][termios.VTIME] = 0
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+        termios.tcflush(fd, termios.TCIOFLUSH)
+
+    def receive_packet(self, time=0):
+        """
+        Receive a packet though the link. This call is blocking but will
+        timeout and return None if a timeout is supplied.
+        """
+        if time == 0:
+            try:
+                return self.in_queue.get(False)
+            except Queue.Empty:
+                return None
+        elif time < 0:
+            try:
+                return self.in_queue.get(True)
+            except Queue.Empty:
+                return None
+        else:
+            try:
+                return self.in_queue.get(True, time)
+            except Queue.Empty:
+                return None
+
+    def send_packet(self, pk):
+        """
+        Send the packet pk though the link. Only blocks when the fifo class
+        of the packet is full, setpoints replace the one still waiting.
+        """
+        if self._fd is None:
+            return
+
+        try:
+            self.out_queue.put(pk, True, 2)
+        except Queue.Full:
+            if self.link_error_callback:
+                self.link_error_callback("SerialDriver: Could not send packet"
+                                         " to copter")
+
+    def get_receive_stats(self):
+        """Return the statistics of the receive queue by packet class"""
+        if self.in_queue is None:
+            return {}
+        return self.in_queue.get_stats()
+
+    def get_send_stats(self):
+        """Return the statistics of the send queue by traffic class"""
+        if self.out_queue is None:
+            return {}
+        return self.out_queue.get_stats()
+
+    def get_frame_stats(self):
+        """Return the number of frames and bytes sent and received"""
+        if self._thread is None:
+            return {}
+        return self._thread.get_stats()
+
+    def close(self):
+        """ Close the link. """
+        if self._thread:
+            self._thread.stop()
+            self._thread = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def get_status(self):
+        return "No information available"
 
     def get_name(self):
         return "serial"
 
     def scan_interface(self):
         return []
+
+
+class _SerialDriverThread(threading.Thread):
+    """
+    Writes the outgoing packets, all the packets waiting in the send queue
+    in one write, and reads the incoming frames into the receive queue from
+    a second thread.
+    """
+
+    # Period of the link quality reports
+    QUALITY_PERIOD = 0.1
+    # Maximum number of packets written at once
+    MAX_BATCH = 32
+
+    def __init__(self, fd, in_queue, out_queue, link_quality_callback,
+                 link_error_callback):
+        threading.Thread.__init__(self)
+        self.name = "SerialDriverWriter"
+        self.daemon = True
+        self._fd = fd
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.link_quality_callback = link_quality_callback
+        self.link_error_callback = link_error_callback
+        self._sp = False
+        self._failed = False
+        self._decoder = FrameDecoder()
+        self._stats = {"frames_sent": 0, "writes": 0, "bytes_sent": 0,
+                       "bytes_received": 0}
+        # Wakes up the reader when stopping
+        (self._wake_r, self._wake_w) = os.pipe()
+        self._reader = threading.Thread(target=self._read_loop,
+                                        name="SerialDriverReader")
+        self._reader.daemon = True
+
+    def start(self):
+        threading.Thread.start(self)
+        self._reader.start()
+
+    def stop(self):
+        """ Stop the threads """
+        self._sp = True
+        # Wake up the writer, the packet itself is never sent
+        try:
+            self.out_queue.put(CRTPPacket(0xFF), False)
+        except Queue.Full:
+            pass
+        os.write(self._wake_w, "x")
+        for thread in (self, self._reader):
+            try:
+                thread.join()
+            except Exception:
+                pass
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    def get_stats(self):
+        stats = dict(self._stats)
+        stats["frames_received"] = self._decoder.frames
+        stats["crc_errors"] = self._decoder.errors
+        return stats
+
+    def _error(self, message):
+        """Report the link error once"""
+        if not self._failed:
+            self._failed = True
+            if self.link_error_callback:
+                self.link_error_callback(message)
+
+    def run(self):
+        """ Write loop """
+        while True:
+            frames = [encode_frame(self.out_queue.get())]
+            if self._sp:
+                break
+            while len(frames) < self.MAX_BATCH:
+                try:
+                    frames.append(encode_frame(self.out_queue.get(False)))
+                except Queue.Empty:
+                    break
+            data = "".join(frames)
+            size = len(data)
+            try:
+                while data:
+                    written = os.write(self._fd, data)
+                    data = data[written:]
+            except OSError as e:
+                self._error("Error writing to the serial port: %s" % e)
+                continue
+            self._stats["frames_sent"] += len(frames)
+            self._stats["writes"] += 1
+            self._stats["bytes_sent"] += size
+
+    def _report_quality(self, frames, errors):
+        """Report the percentage of good frames since the last report"""
+        if self.link_quality_callback is None:
+            return
+        total = frames + errors
+        self.link_quality_callback(100 * frames / total if total else 100)
+
+    def _read_loop(self):
+        """ Read loop """
+        stream = io.FileIO(self._fd, "r", closefd=False)
+        decoder = self._decoder
+        next_report = time.time() + self.QUALITY_PERIOD
+        (frames, errors) = (decoder.frames, decoder.errors)
+        while not self._sp:
+            try:
+                (readable, _, _) = select.select([self._fd, self._wake_r], [],
+                                                 [], self.QUALITY_PERIOD)
+                if self._fd in readable:
+                    count = decoder.read_from(stream)
+                    if not count:
+                        self._error("The serial port has been closed")
+                        break
+                    self._stats["bytes_received"] += count
+                    for pk in decoder.packets():
+                        self.in_queue.put(pk)
+            except (OSError, IOError, select.error) as e:
+                if getattr(e, "errno", None) == errno.EINTR:
+                    continue
+                self._error("Error reading the serial port: %s" % e)
+                break
+            if time.time() >= next_report:
+                self._report_quality(decoder.frames - frames,
+                                     decoder.errors - errors)
+                (frames, errors) = (decoder.frames, decoder.errors)
+                next_report = time.time() + self.QUALITY_PERIOD
@@ -26,80 +26,372 @@
 #  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
 #  MA  02110-1301, USA.
 
-""" CRTP UDP Driver. Work either with the UDP server or with an UDP device
-See udpserver.py for the protocol"""
+"""
+CRTP UDP driver, used to reach a Crazyflie through a UDP gateway (see
+udpgateway.py and bin/cfudpgateway) running on the host with the Crazyradio.
+
+The URI is udp://<host>[:<port>], the port is 2399 by default.
+
+Each datagram starts with a type byte:
+
+ * DATA       : zero or more CRTP packets, each as a length byte (header
+                plus data) followed by the header byte and the data. An empty
+                DATA datagram is used as keepalive.
+ * CONNECT    : client to gateway, open the link (the gateway opens its radio
+                link with the first client)
+ * DISCONNECT : client to gateway, close the link
+ * LINK       : gateway to client, link quality in percent as one byte. Sent
+                as keepalive by the gateway.
+ * ERROR      : gateway to client, the radio link failed, the rest of the
+                datagram is the error message
+
+The packets waiting to be sent when a datagram is built are all put in the
+same datagram, so that bursts (TOC download, log data) use few datagrams
+while a single packet is never delayed.
+"""
 
 __author__ = 'Bitcraze AB'
-__all__ = ['UdpDriver']
+__all__ = ['UdpDriver', 'pack_packets', 'unpack_packets', 'send_batches',
+           'DEFAULT_PORT', 'DATA', 'CONNECT', 'DISCONNECT', 'LINK', 'ERROR']
 
+import logging
+logger = logging.getLogger(__name__)
 
 from .crtpdriver import CRTPDriver
 from .crtpstack import CRTPPacket
 from .exceptions import WrongUriType
+from .priorityqueue import PriorityPacketQueue
+from .sendqueue import SendScheduler
+import threading
 import Queue
+import socket
+import select
+import time
 import re
-import struct
-from socket import socket
+
+DEFAULT_PORT = 2399
+
+DATA = 0x00
+CONNECT = 0x01
+DISCONNECT = 0x02
+LINK = 0x03
+ERROR = 0x04
+
+# Packets are added to a datagram until it would be larger than this, which
+# stays below the usual Ethernet MTU
+MAX_DATAGRAM = 1400
+# Maximum size of a CRTP packet: header and 31 bytes of data
+MAX_PACKET = 32
+# Both ends send a keepalive when idle for this long and the other end is
+# considered gone after LINK_TIMEOUT without any datagram
+KEEPALIVE_PERIOD = 0.2
+LINK_TIMEOUT = 2.0
+
+
+def pack_packets(packets):
+    """Return the DATA datagram holding the list of CRTP packets"""
+    parts = [chr(DATA)]
+    for pk in packets:
+        parts.append(chr(len(pk.data) + 1))
+        parts.append(chr(pk.header))
+        parts.append(pk.data)
+    return "".join(parts)
+
+
+def unpack_packets(data):
+    """
+    Return the list of CRTP packets of a DATA datagram, a truncated record at
+    the end is ignored.
+    """
+    packets = []
+    pos = 1
+    while pos < len(data):
+        size = ord(data[pos])
+        if size == 0 or pos + 1 + size > len(data):
+            break
+        packets.append(CRTPPacket(ord(data[pos + 1]),
+                                  data[pos + 2:pos + 1 + size]))
+        pos += 1 + size
+    return packets
+
+
+def send_batches(first, get_next, send):
+    """
+    Send the packet first and the packets returned by get_next() until it
+    returns None, in as few datagrams as possible using send(datagram).
+    Return the number of (packets, datagrams) sent.
+    """
+    (packets, datagrams) = (0, 0)
+    batch = []
+    size = 1
+    pk = first
+    while pk is not None:
+        if batch and size + len(pk.data) + 2 > MAX_DATAGRAM:
+            send(pack_packets(batch))
+            datagrams += 1
+            batch = []
+            size = 1
+        batch.append(pk)
+        size += len(pk.data) + 2
+        packets += 1
+        pk = get_next()
+    send(pack_packets(batch))
+    return (packets, datagrams + 1)
 
 
 class UdpDriver(CRTPDriver):
+    """ UDP link driver, talking to a UDP gateway """
     def __init__(self):
-        None
+        """ Create the link driver """
+        CRTPDriver.__init__(self)
+        self.uri = ""
+        self.link_error_callback = None
+        self.link_quality_callback = None
+        self.in_queue = None
+        self.out_queue = None
+        self._socket = None
+        self._thread = None
 
-    def connect(self, uri, linkQualityCallback, linkErrorCallback):
-        #check if the URI is a radio URI
+    def connect(self, uri, link_quality_callback, link_error_callback):
+        """
+        Connect the link driver to the gateway at the URI of the format:
+        udp://<host>[:<port>]
+        """
         if not re.search("^udp://", uri):
             raise WrongUriType("Not an UDP URI")
 
-        self.queue = Queue.Queue()
-        self.socket = socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.addr = ("localhost", 7777)
-        self.socket.connect(self.addr)
+        uri_data = re.search("^udp://([^:/]+)(:([0-9]+))?/?$", uri)
+        if not uri_data:
+            raise WrongUriType("Wrong UDP URI format!")
 
-        #Add this to the server clients list
-        self.socket.sendto("\xFF\x01\x01\x01", self.addr)
+        if self._socket is not None:
+            raise Exception("Link already open!")
 
-    def receive_packet(self, time=0):
-        data, addr = self.socket.recvfrom(1024)
+        port = DEFAULT_PORT
+        if uri_data.group(3):
+            port = int(uri_data.group(3))
 
-        if data:
-            data = struct.unpack('b' * (len(data) - 1), data[0:len(data) - 1])
-            pk = CRTPPacket()
-            pk.port = data[0]
-            pk.data = data[1:]
-            return pk
+        self.uri = uri
+        self.link_quality_callback = link_quality_callback
+        self.link_error_callback = link_error_callback
 
-        try:
-            if time == 0:
-                return self.rxqueue.get(False)
-            elif time < 0:
-                while True:
-                    return self.rxqueue.get(True, 10)
-            else:
-                return self.rxqueue.get(True, time)
-        except Queue.Empty:
-            return None
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # connect() only sets the default destination and filters out the
+        # datagrams from other hosts
+        self._socket.connect((uri_data.group(1), port))
+
+        self.in_queue = PriorityPacketQueue()
+        self.out_queue = SendScheduler()
+
+        self._thread = _UdpDriverThread(self._socket, self.in_queue,
+                                        self.out_queue,
+                                        link_quality_callback,
+                                        link_error_callback)
+        self._thread.start()
+
+    def receive_packet(self, time=0):
+        """
+        Receive a packet though the link. This call is blocking but will
+        timeout and return None if a timeout is supplied.
+        """
+        if time == 0:
+            try:
+                return self.in_queue.get(False)
+            except Queue.Empty:
+                return None
+        elif time < 0:
+            try:
+                return self.in_queue.get(True)
+            except Queue.Empty:
+                return None
+        else:
+            try:
+                return self.in_queue.get(True, time)
+            except Queue.Empty:
+                return None
 
     def send_packet(self, pk):
-        raw = (pk.port,) + struct.unpack("B"* len(pk.data), pk.data)
+        """
+        Send the packet pk though the link. Only blocks when the fifo class
+        of the packet is full, setpoints replace the one still waiting.
+        """
+        if self._socket is None:
+            return
 
-        cksum = 0
-        for i in raw:
-            cksum += i
+        try:
+            self.out_queue.put(pk, True, 2)
+        except Queue.Full:
+            if self.link_error_callback:
+                self.link_error_callback("UdpDriver: Could not send packet"
+                                         " to the gateway")
 
-        cksum %= 256
+    def get_receive_stats(self):
+        """Return the statistics of the receive queue by packet class"""
+        if self.in_queue is None:
+            return {}
+        return self.in_queue.get_stats()
 
-        data = ''.join(chr(v) for v in (raw + (cksum,)))
+    def get_send_stats(self):
+        """Return the statistics of the send queue by traffic class"""
+        if self.out_queue is None:
+            return {}
+        return self.out_queue.get_stats()
 
-        #print tuple(data)
-        self.socket.sendto(data, self.addr)
+    def get_datagram_stats(self):
+        """Return the number of packets and datagrams sent and received"""
+        if self._thread is None:
+            return {}
+        return self._thread.get_stats()
 
     def close(self):
-        #Remove this to the server clients list
-        self.socket.sendto("\xFF\x01\x02\x02", self.addr)
+        """ Close the link. """
+        if self._thread:
+            self._thread.stop()
+            self._thread = None
+        if self._socket:
+            try:
+                self._socket.send(chr(DISCONNECT))
+            except socket.error:
+                pass
+            self._socket.close()
+            self._socket = None
+
+    def get_status(self):
+        return "No information available"
 
     def get_name(self):
         return "udp"
 
     def scan_interface(self):
         return []
+
+
+class _UdpDriverThread(threading.Thread):
+    """
+    Sends the outgoing packets in batches and reads the incoming datagrams
+    into the receive queue.
+
+    The send loop blocks on the send queue without timeout, a timed wait on
+    a Condition polls with sleeps of up to 50 ms in Python 2. The receive
+    loop waits in select() and sends the keepalive instead.
+    """
+
+    def __init__(self, sock, in_queue, out_queue, link_quality_callback,
+                 link_error_callback):
+        threading.Thread.__init__(self)
+        self.name = "UdpDriverThread"
+        self.daemon = True
+        self._socket = sock
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.link_quality_callback = link_quality_callback
+        self.link_error_callback = link_error_callback
+        self._sp = False
+        self._failed = False
+        self._last_send = time.time()
+        self._lock = threading.Lock()
+        self._stats = {"packets_sent": 0, "datagrams_sent": 0,
+                       "packets_received": 0, "datagrams_received": 0}
+        self._receiver = threading.Thread(target=self._receive_loop,
+                                          name="UdpDriverReceiver")
+        self._receiver.daemon = True
+
+    def start(self):
+        threading.Thread.start(self)
+        self._receiver.start()
+
+    def stop(self):
+        """ Stop the threads """
+        self._sp = True
+        # Wake up the send loop, the packet itself is never sent
+        try:
+            self.out_queue.put(CRTPPacket(0xFF), False)
+        except Queue.Full:
+            pass
+        for thread in (self, self._receiver):
+            try:
+                thread.join()
+            except Exception:
+                pass
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, packets, datagrams, direction):
+        with self._lock:
+            self._stats["packets_" + direction] += packets
+            self._stats["datagrams_" + direction] += datagrams
+
+    def _error(self, message):
+        """Report the link error once"""
+        if not self._failed:
+            self._failed = True
+            if self.link_error_callback:
+                self.link_error_callback(message)
+
+    def _send(self, datagram):
+        self._last_send = time.time()
+        self._socket.send(datagram)
+
+    def _next_packet(self):
+        if self._sp:
+            return None
+        try:
+            return self.out_queue.get(False)
+        except Queue.Empty:
+            return None
+
+    def run(self):
+        """ Send loop """
+        try:
+            self._send(chr(CONNECT))
+        except socket.error as e:
+            self._error("Could not reach the UDP gateway: %s" % e)
+            return
+
+        while True:
+            pk = self.out_queue.get()
+            if self._sp:
+                break
+            try:
+                (packets, datagrams) = send_batches(pk, self._next_packet,
+                                                    self._send)
+                self._count(packets, datagrams, "sent")
+            except socket.error as e:
+                self._error("Error sending to the UDP gateway: %s" % e)
+
+    def _receive_loop(self):
+        """ Receive loop, also detects the loss of the gateway """
+        last = time.time()
+        while not self._sp:
+            try:
+                (readable, _, _) = select.select([self._socket], [], [],
+                                                 KEEPALIVE_PERIOD)
+                if time.time() - self._last_send > KEEPALIVE_PERIOD:
+                    self._send(chr(DATA))
+                if not readable:
+                    if time.time() - last > LINK_TIMEOUT:
+                        self._error("No answer from the UDP gateway")
+                    continue
+                data = self._socket.recv(MAX_DATAGRAM + MAX_PACKET)
+            except (socket.error, select.error) as e:
+                # Connection refused is reported here when nothing listens
+                # on the gateway port, the timeout reports the error
+                logger.debug("UDP receive error: %s", e)
+                time.sleep(KEEPALIVE_PERIOD)
+                continue
+            if not data:
+                continue
+            last = time.time()
+            kind = ord(data[0])
+            if kind == DATA:
+                packets = unpack_packets(data)
+                for pk in packets:
+                    self.in_queue.put(pk)
+                self._count(len(packets), 1, "received")
+            elif kind == LINK and len(data) > 1:
+                if self.link_quality_callback:
+                    self.link_quality_callback(ord(data[1]))
+            elif kind == ERROR:
+                self._error("UDP gateway: %s" % data[1:])
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Gateway between a local link (usually a Crazyradio) and remote UdpDriver
+clients, see udpdriver.py for the protocol.
+
+The link is opened when the first client connects and closed when the last
+one leaves. The packets from all the clients are sent on the link and the
+packets from the link are sent to all the clients.
+
+There is no authentication, any client that can reach the gateway can fly the
+Crazyflie. The gateway only listens on the loopback interface by default, when
+listening on other interfaces the clients should be limited to a list of
+allowed hosts.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['UdpGateway']
+
+import logging
+logger = logging.getLogger(__name__)
+
+import threading
+import socket
+import select
+import time
+
+import cflib.crtp
+from .udpdriver import (DATA, CONNECT, DISCONNECT, LINK, ERROR, DEFAULT_PORT,
+                        MAX_DATAGRAM, MAX_PACKET, KEEPALIVE_PERIOD,
+                        LINK_TIMEOUT, unpack_packets, send_batches)
+
+# Timeout when reading the link. A timed wait polls with growing sleeps in
+# Python 2, this short timeout bounds the latency added by the gateway.
+LINK_POLL = 0.002
+
+# Only local clients can connect unless another address is given
+DEFAULT_ADDRESS = "127.0.0.1"
+
+
+class UdpGateway():
+    """
+    Serve the link at link_uri to the UDP clients on (address, port). If
+    allowed is a list of host addresses, the datagrams from other hosts are
+    ignored.
+    """
+
+    def __init__(self, link_uri, address=DEFAULT_ADDRESS, port=DEFAULT_PORT,
+                 client_timeout=LINK_TIMEOUT, allowed=None):
+        self.link_uri = link_uri
+        self.address = address
+        self.allowed = set(allowed) if allowed is not None else None
+        self.port = port
+        self.client_timeout = client_timeout
+        self._socket = None
+        self._link = None
+        self._quality = 0
+        self._link_error = None
+        # Time of the last datagram by client address
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._sp = False
+        self._threads = []
+        self._stats = {"packets_to_link": 0, "datagrams_from_clients": 0,
+                       "packets_from_link": 0, "datagrams_to_clients": 0}
+
+    def start(self):
+        """Bind the socket and start serving, return the bound port"""
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((self.address, self.port))
+        self.port = self._socket.getsockname()[1]
+        self._sp = False
+        self._threads = [threading.Thread(target=self._serve,
+                                          name="UdpGatewayServer"),
+                         threading.Thread(target=self._forward_link,
+                                          name="UdpGatewayLink")]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+        logger.info("Serving %s on UDP port %d", self.link_uri, self.port)
+        return self.port
+
+    def stop(self):
+        """Stop serving, disconnect the clients and close the link"""
+        self._sp = True
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._drop_clients("Gateway stopped")
+        self._close_link()
+        self._socket.close()
+        self._socket = None
+
+    def get_clients(self):
+        """Return the addresses of the connected clients"""
+        with self._lock:
+            return self._clients.keys()
+
+    def get_stats(self):
+        """Return the packet and datagram counters and the link quality"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["clients"] = len(self.get_clients())
+        stats["link_quality"] = self._quality
+        stats["link_open"] = self._link is not None
+        return stats
+
+    def _count(self, key, value):
+        with self._lock:
+            self._stats[key] += value
+
+    def _link_quality(self, percentage):
+        self._quality = percentage
+
+    def _link_failed(self, message):
+        # Called from the link thread, the link is closed by _serve()
+        if self._link_error is None:
+            self._link_error = message
+
+    def _open_link(self):
+        self._link_error = None
+        try:
+            self._link = cflib.crtp.get_link_driver(self.link_uri,
+                                                    self._link_quality,
+                                                    self._link_failed)
+        except Exception as e:
+            self._link_error = "Could not open %s: %s" % (self.link_uri, e)
+            return
+        if self._link is None:
+            self._link_error = "No driver for %s" % self.link_uri
+        else:
+            logger.info("Link %s opened", self.link_uri)
+
+    def _close_link(self):
+        if self._link is not None:
+            link = self._link
+            self._link = None
+            link.close()
+            logger.info("Link %s closed", self.link_uri)
+
+    def _send(self, datagram, addresses=None):
+        if addresses is None:
+            addresses = self.get_clients()
+        for address in addresses:
+            try:
+                self._socket.sendto(datagram, address)
+            except socket.error as e:
+                logger.debug("Could not send to %s: %s", address, e)
+
+    def _broadcast(self, datagram):
+        self._send(datagram)
+        self._count("datagrams_to_clients", 1)
+
+    def _drop_clients(self, message):
+        self._send(chr(ERROR) + message)
+        with self._lock:
+            self._clients.clear()
+
+    def _handle(self, data, address):
+        """Handle one datagram from a client"""
+        if self.allowed is not None and address[0] not in self.allowed:
+            logger.debug("Ignoring datagram from %s:%d", *address)
+            return
+        kind = ord(data[0])
+        if kind == CONNECT:
+            logger.info("Client %s:%d connected", *address)
+            with self._lock:
+                self._clients[address] = time.time()
+            if self._link is None:
+                self._open_link()
+            self._send(chr(LINK) + chr(self._quality), [address])
+        elif kind == DISCONNECT:
+            logger.info("Client %s:%d disconnected", *address)
+            with self._lock:
+                self._clients.pop(address, None)
+        elif kind == DATA:
+            with self._lock:
+                known = address in self._clients
+                if known:
+                    self._clients[address] = time.time()
+            if not known:
+                # The gateway was restarted, make the client reconnect
+                self._send(chr(ERROR) + "Not connected", [address])
+                return
+            packets = unpack_packets(data)
+            self._count("datagrams_from_clients", 1)
+            self._count("packets_to_link", len(packets))
+            link = self._link
+            if link is not None:
+                for pk in packets:
+                    link.send_packet(pk)
+
+    def _housekeeping(self):
+        """Report link errors, expire the clients and send the keepalive"""
+        if self._link_error is not None:
+            logger.warning("Link error: %s", self._link_error)
+            self._drop_clients(self._link_error)
+            self._link_error = None
+        now = time.time()
+        with self._lock:
+            for (address, last) in self._clients.items():
+                if now - last > self.client_timeout:
+                    logger.info("Client %s:%d timed out", *address)
+                    del self._clients[address]
+            clients = len(self._clients)
+        if clients == 0:
+            self._close_link()
+        else:
+            self._send(chr(LINK) + chr(self._quality))
+
+    def _serve(self):
+        """Read the datagrams from the clients"""
+        next_housekeeping = time.time()
+        while not self._sp:
+            timeout = max(0.0, next_housekeeping - time.time())
+            try:
+                (readable, _, _) = select.select([self._socket], [], [],
+                                                 timeout)
+                if readable:
+                    (data, address) = self._socket.recvfrom(MAX_DATAGRAM +
+                                                            MAX_PACKET)
+                    if data:
+                        self._handle(data, address)
+            except (socket.error, select.error) as e:
+                logger.debug("UDP receive error: %s", e)
+            if time.time() >= next_housekeeping:
+                self._housekeeping()
+                next_housekeeping = time.time() + KEEPALIVE_PERIOD
+
+    def _forward_link(self):
+        """Send the packets from the link to the clients, in batches"""
+        while not self._sp:
+            link = self._link
+            if link is None:
+                time.sleep(KEEPALIVE_PERIOD / 2)
+                continue
+            pk = link.receive_packet(LINK_POLL)
+            if pk is None:
+                continue
+            (packets, _) = send_batches(pk, lambda: link.receive_packet(0),
+                                        self._broadcast)
+            self._count("packets_from_link", packets)
@@ -31,12 +31,13 @@ USB driver for the Crazyradio USB dongle.
 """
 
 __author__ = 'Bitcraze AB'
-__all__ = ['Crazyradio']
+__all__ = ['Crazyradio', 'get_device_count']
 
 
 import os
 import usb
 import logging
+from cflib.utils import latency
 logger = logging.getLogger(__name__)
 
 #USB parameters
@@ -84,6 +85,11 @@ def _find_devices():
     return ret
 
 
+def get_device_count():
+    """Return the number of Crazyradio dongles connected to the computer"""
+    return len(list(_find_devices()))
+
+
 class _radio_ack:
     ack = False
     powerDet = False
@@ -227,19 +233,23 @@ class Crazyradio:
             return result
 
     ### Data transferts ###
-    def send_packet(self, dataOut):
+    def send_packet(self, dataOut, trace=None):
         """ Send a packet and receive the ack from the radio dongle
             The ack contains information about the packet transmition
-            and a data payload if the ack packet contained any """
+            and a data payload if the ack packet contained any. The optional
+            latency trace is marked after the write and the read """
         ackIn = None
         data = None
         try:
             if (pyusb1 is False):
                 self.handle.bulkWrite(1, dataOut, 1000)
+                latency.mark(trace, "usb_write")
                 data = self.handle.bulkRead(0x81, 64, 1000)
             else:
                 self.handle.write(1, dataOut, 0, 1000)
+                latency.mark(trace, "usb_write")
                 data = self.handle.read(0x81, 64, 0, 1000)
+            latency.mark(trace, "usb_ack")
         except usb.USBError:
             pass
 
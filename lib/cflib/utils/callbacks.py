@@ -28,29 +28,376 @@
 
 """
 Callback objects used in the Crazyflie library
+
+The callbacks are run inline on the calling thread, so a slow callback on the
+receive path stalls the packet handling. Profiling can be enabled to record
+the call count and the cumulative and max duration of each callback, and to
+log a warning when a callback runs longer than the budget. get_report() then
+names the callbacks taking the most time, optionally only the ones run from
+a given thread (i.e. "IncomingPacketHandler" for the receive path).
+
+A callback can also be added with a queue, it is then run from a worker
+thread instead of the calling thread. Each such subscriber has its own
+bounded queue and the policy when the queue is full is selectable:
+
+ * DROP_OLDEST : the oldest waiting call is dropped (i.e. plotting)
+ * DROP_NEWEST : the new call is dropped
+ * BLOCK       : the caller waits for room in the queue (i.e. recording)
+
+The worker is either dedicated to the subscriber or a CallbackPool shared by
+several subscribers. A subscriber is never run by two workers at the same
+time, so its calls are always made in order.
 """
 
 __author__ = 'Bitcraze AB'
-__all__ = ['Caller']
+__all__ = ['Caller', 'CallbackPool', 'shared_pool', 'timed_call',
+           'enable_profiling', 'reset_profiling', 'get_report',
+           'format_report', 'DROP_OLDEST', 'DROP_NEWEST', 'BLOCK']
+
+import time
+import weakref
+import inspect
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+BLOCK = "block"
+
+# Default budget of a callback in seconds before a warning is logged
+DEFAULT_BUDGET = 0.005
+# Minimum time in seconds between two warnings for the same callback
+WARNING_INTERVAL = 1.0
+
+_profiling = False
+_budget = DEFAULT_BUDGET
+_lock = threading.Lock()
+# Statistics by (caller name, callback name, thread name). The callbacks are
+# keyed by name so the statistics do not keep them (and their owners) alive
+# once removed.
+_stats = {}
+# Names of the profiled callbacks, without keeping the callbacks alive
+_names = weakref.WeakKeyDictionary()
+
+
+class _CallbackStats():
+    """Timing of one callback called from one Caller and thread"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.over_budget = 0
+        self.last_warning = 0.0
+
+
+def enable_profiling(enabled=True, budget=None):
+    """
+    Enable or disable the timing of the callbacks. budget is the time in
+    seconds a callback can run before a warning is logged.
+    """
+    global _profiling, _budget
+    if budget is not None:
+        _budget = budget
+    _profiling = enabled
+
+
+def reset_profiling():
+    """Clear the recorded timings"""
+    with _lock:
+        _stats.clear()
+
+
+def describe(cb):
+    """Return a readable name for the callback cb"""
+    if isinstance(cb, _AsyncSubscriber):
+        return "queue of %s" % describe(cb.cb)
+    if inspect.ismethod(cb):
+        owner = cb.im_self if cb.im_self is not None else cb.im_class
+        if not inspect.isclass(owner):
+            owner = owner.__class__
+        return "%s.%s.%s" % (owner.__module__, owner.__name__, cb.__name__)
+    if inspect.isfunction(cb):
+        if cb.__name__ == "<lambda>":
+            code = cb.func_code
+            return "<lambda> %s:%d" % (code.co_filename, code.co_firstlineno)
+        return "%s.%s" % (cb.__module__, cb.__name__)
+    return repr(cb)
+
+
+def timed_call(caller_name, cb, *args):
+    """Call cb with args, recording its duration when profiling"""
+    if not _profiling:
+        return cb(*args)
+    start = time.time()
+    try:
+        return cb(*args)
+    finally:
+        _record(caller_name, cb, time.time() - start)
+
+
+def _record(caller_name, cb, duration):
+    thread = threading.current_thread().name
+    try:
+        name = _names.get(cb)
+        if name is None:
+            name = _names[cb] = describe(cb)
+    except TypeError:
+        # Not weak referenceable
+        name = describe(cb)
+    with _lock:
+        key = (caller_name, name, thread)
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = _CallbackStats()
+        stats.count += 1
+        stats.total += duration
+        stats.max = max(stats.max, duration)
+        if duration <= _budget:
+            return
+        stats.over_budget += 1
+        now = time.time()
+        if now - stats.last_warning < WARNING_INTERVAL:
+            return
+        stats.last_warning = now
+    logger.warning("Callback %s on %s took %.1fms in thread %s (budget "
+                   "%.1fms)", name, caller_name, duration * 1000,
+                   thread, _budget * 1000)
+
+
+def get_report(thread=None):
+    """
+    Return the timing of the callbacks as a list of dicts sorted by the
+    cumulative time, the slowest first. Only the callbacks called from
+    the thread with the name thread are returned if it is given.
+    """
+    with _lock:
+        items = [(key, s.count, s.total, s.max, s.over_budget)
+                 for (key, s) in _stats.items()
+                 if thread is None or key[2] == thread]
+    report = []
+    for ((caller_name, name, thread_name), count, total, max_duration,
+         over_budget) in items:
+        report.append({"caller": caller_name,
+                       "callback": name,
+                       "thread": thread_name,
+                       "count": count,
+                       "total": total,
+                       "mean": total / count,
+                       "max": max_duration,
+                       "over_budget": over_budget})
+    report.sort(key=lambda r: r["total"], reverse=True)
+    return report
+
+
+def format_report(report=None):
+    """Return the report as a printable table"""
+    if report is None:
+        report = get_report()
+    lines = ["%8s %10s %9s %9s %6s  %s" % ("count", "total ms", "mean ms",
+                                           "max ms", "over", "callback")]
+    for r in report:
+        lines.append("%8d %10.1f %9.3f %9.3f %6d  %s (%s, %s)" % (
+                     r["count"], r["total"] * 1000, r["mean"] * 1000,
+                     r["max"] * 1000, r["over_budget"], r["callback"],
+                     r["caller"], r["thread"]))
+    return "\n".join(lines)
+
+
+class CallbackPool():
+    """Worker threads running the queued calls of async subscribers"""
+    def __init__(self, threads=2, name="CallbackPool"):
+        self._ready = deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+        self._workers = []
+        for i in range(threads):
+            t = threading.Thread(target=self._run,
+                                 name="%s-%d" % (name, i))
+            t.daemon = True
+            t.start()
+            self._workers.append(t)
+
+    def schedule(self, subscriber):
+        """Make the subscriber run its next call on a worker"""
+        with self._cond:
+            self._ready.append(subscriber)
+            self._cond.notify()
+
+    def close(self):
+        """Stop the workers once the scheduled calls have been run"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for t in self._workers:
+            if t is not threading.current_thread():
+                t.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._ready and not self._closed:
+                    self._cond.wait()
+                if not self._ready:
+                    return
+                subscriber = self._ready.popleft()
+            subscriber.run_next()
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_pool():
+    """Return the CallbackPool shared by the library and the client"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = CallbackPool(name="SharedCallbackPool")
+        return _shared_pool
+
+
+class _AsyncSubscriber(object):
+    """
+    Callback queuing its calls to be run by a worker. Compares equal to the
+    wrapped callback so it can be found and removed like the callback.
+    """
+    def __init__(self, caller_name, cb, queue_size, policy, pool):
+        if policy not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError("Unknown queue policy [%s]" % policy)
+        self.cb = cb
+        self._caller_name = caller_name
+        self._queue_size = queue_size
+        self._policy = policy
+        self._own_pool = pool is None
+        self._pool = CallbackPool(1, "Callback") if pool is None else pool
+        self._queue = deque()
+        self._cond = threading.Condition(threading.Lock())
+        # True while the subscriber is scheduled or running in the pool
+        self._scheduled = False
+        self._closed = False
+        self.delivered = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def __eq__(self, other):
+        if isinstance(other, _AsyncSubscriber):
+            return self.cb == other.cb
+        return self.cb == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __call__(self, *args):
+        """Queue a call to the callback"""
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._queue) >= self._queue_size:
+                if self._policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return
+                elif self._policy == DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    while (len(self._queue) >= self._queue_size and
+                           not self._closed):
+                        self._cond.wait()
+                    if self._closed:
+                        return
+            self._queue.append(args)
+            self.max_depth = max(self.max_depth, len(self._queue))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._pool.schedule(self)
+
+    def run_next(self):
+        """Run the next queued call, called from a worker of the pool"""
+        with self._cond:
+            args = self._queue.popleft()
+            self._cond.notify_all()
+        try:
+            timed_call(self._caller_name, self.cb, *args)
+        except Exception:
+            logger.exception("Exception in queued callback %s",
+                             describe(self.cb))
+        with self._cond:
+            self.delivered += 1
+            if not self._queue:
+                self._scheduled = False
+                self._cond.notify_all()
+                return
+        # Give the other subscribers of the pool a turn
+        self._pool.schedule(self)
+
+    def stats(self):
+        with self._cond:
+            return {"depth": len(self._queue),
+                    "max_depth": self.max_depth,
+                    "delivered": self.delivered,
+                    "dropped": self.dropped}
+
+    def close(self):
+        """Stop queuing calls and wait for the queued ones to be run"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            if (threading.current_thread() not in self._pool._workers):
+                while self._scheduled:
+                    self._cond.wait()
+        if self._own_pool:
+            self._pool.close()
 
 
 class Caller():
     """ An object were callbacks can be registered and called """
 
-    def __init__(self):
-        """ Create the object """
+    def __init__(self, name=None):
+        """
+        Create the object, the name is used to identify the callbacks when
+        profiling
+        """
         self.callbacks = []
+        self.name = name
 
-    def add_callback(self, cb):
-        """ Register cb as a new callback. Will not register duplicates. """
+    def add_callback(self, cb, queue_size=0, policy=DROP_OLDEST, pool=None):
+        """
+        Register cb as a new callback. Will not register duplicates.
+
+        If queue_size is given the callback is run from a worker thread with
+        at most queue_size calls waiting, the policy selects what to do when
+        the queue is full. The worker is dedicated to the callback unless a
+        CallbackPool is given.
+        """
         if ((cb in self.callbacks) is False):
+            if queue_size > 0:
+                cb = _AsyncSubscriber(self.name, cb, queue_size, policy, pool)
             self.callbacks.append(cb)
 
     def remove_callback(self, cb):
-        """ Un-register cb from the callbacks """
-        self.callbacks.remove(cb)
+        """
+        Un-register cb from the callbacks, waits for the queued calls of an
+        async callback to be run.
+        """
+        index = self.callbacks.index(cb)
+        removed = self.callbacks.pop(index)
+        if isinstance(removed, _AsyncSubscriber):
+            removed.close()
+
+    def get_queue_stats(self):
+        """Return the queue statistics of the async callbacks by name"""
+        return dict((describe(cb.cb), cb.stats()) for cb in self.callbacks
+                    if isinstance(cb, _AsyncSubscriber))
 
     def call(self, *args):
         """ Call the callbacks registered with the arguments args """
-        for cb in self.callbacks:
-            cb(*args)
+        if _profiling:
+            for cb in self.callbacks:
+                timed_call(self.name, cb, *args)
+        else:
+            for cb in self.callbacks:
+                cb(*args)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Optional latency tracing of the control path, from the input device to the
+USB write to the Crazyradio.
+
+When enabled, JoystickReader starts a trace each time the input is read. The
+trace is the current trace of the thread while the input callbacks are called
+(until clear() is called), the Commander attaches it to the set-point packet
+and it then follows the packet through the link driver. Each stage records
+the time since the previous stage in a histogram and the total time from the
+input read is recorded once the Crazyradio has acked the packet. Set-points
+replaced in the send queue by newer ones never complete their trace.
+
+The stages in order are:
+
+ * read_input     : the input device is read (start of the trace)
+ * input_updated  : the set-point is computed and the callbacks are called
+ * send_setpoint  : the Commander has built the packet
+ * enqueue        : the packet is in the send queue of the driver
+ * dequeue        : the driver thread has taken the packet for sending
+ * usb_write      : the packet has been written to the Crazyradio
+ * usb_ack        : the ack has been read back from the Crazyradio
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['enable', 'is_enabled', 'start', 'current', 'clear', 'mark',
+           'finish', 'get_report', 'format_report', 'reset', 'STAGES']
+
+import time
+import threading
+
+STAGES = ["read_input", "input_updated", "send_setpoint", "enqueue",
+          "dequeue", "usb_write", "usb_ack"]
+
+# Upper bounds in ms of the histogram buckets, the last bucket holds
+# everything above the last bound.
+HISTOGRAM_BOUNDS = [0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100]
+
+_enabled = False
+_local = threading.local()
+_lock = threading.Lock()
+_histograms = {}
+_started = 0
+_incomplete = 0
+
+
+class _Histogram():
+    """Latency histogram of one stage"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def add(self, latency):
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+        ms = latency * 1000.0
+        bucket = 0
+        while bucket < len(HISTOGRAM_BOUNDS) and ms > HISTOGRAM_BOUNDS[bucket]:
+            bucket += 1
+        self.buckets[bucket] += 1
+
+    def percentile(self, fraction):
+        """Return the upper bound in ms of the bucket holding the fraction"""
+        target = fraction * self.count
+        seen = 0
+        for (bound, count) in zip(HISTOGRAM_BOUNDS, self.buckets):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def get(self):
+        bounds = ["<={}ms".format(b) for b in HISTOGRAM_BOUNDS]
+        bounds.append(">{}ms".format(HISTOGRAM_BOUNDS[-1]))
+        return {"count": self.count,
+                "mean": self.total / self.count if self.count else 0.0,
+                "max": self.max,
+                "p50": self.percentile(0.5) if self.count else 0.0,
+                "p99": self.percentile(0.99) if self.count else 0.0,
+                "histogram": zip(bounds, self.buckets)}
+
+
+class _Trace(object):
+    """Time of each stage reached by one set-point"""
+    __slots__ = ["marks"]
+
+    def __init__(self):
+        self.marks = [("read_input", time.time())]
+
+
+def enable(enabled=True):
+    """Enable or disable the tracing, the statistics are kept"""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def start():
+    """Start a new trace and make it current for this thread"""
+    global _started
+    if not _enabled:
+        return None
+    trace = _Trace()
+    _local.trace = trace
+    with _lock:
+        _started += 1
+    return trace
+
+
+def current():
+    """Return the current trace of this thread, None if not tracing"""
+    if not _enabled:
+        return None
+    return getattr(_local, "trace", None)
+
+
+def clear():
+    """End the current trace of this thread, later set-points sent from the
+    thread are not traced"""
+    _local.trace = None
+
+
+def mark(trace, stage):
+    """Record that the trace reached stage, does nothing if trace is None"""
+    if trace is not None:
+        trace.marks.append((stage, time.time()))
+
+
+def finish(trace):
+    """
+    Record the latencies of a completed trace, a trace that did not reach
+    the last stage (USB error) is only counted as incomplete.
+    """
+    global _incomplete
+    if trace is None or not trace.marks:
+        return
+    with _lock:
+        if trace.marks[-1][0] != STAGES[-1]:
+            _incomplete += 1
+            trace.marks = []
+            return
+        (previous, first) = (trace.marks[0][1], trace.marks[0][1])
+        for (stage, ts) in trace.marks[1:]:
+            _histogram(stage).add(ts - previous)
+            previous = ts
+        _histogram("total").add(previous - first)
+    trace.marks = []
+
+
+def _histogram(stage):
+    if stage not in _histograms:
+        _histograms[stage] = _Histogram()
+    return _histograms[stage]
+
+
+def reset():
+    """Clear the collected statistics"""
+    global _started, _incomplete
+    with _lock:
+        _histograms.clear()
+        _started = 0
+        _incomplete = 0
+
+
+def get_report():
+    """
+    Return the statistics as a dict by stage, each stage being the latency
+    from the previous stage, and "total" for the whole path. "started" is
+    the number of traces started and "incomplete" the number of traces that
+    failed before the ack.
+    """
+    with _lock:
+        report = dict((stage, h.get()) for (stage, h) in _histograms.items())
+        report["started"] = _started
+        report["incomplete"] = _incomplete
+        return report
+
+
+def format_report(report=None):
+    """Return the report as a printable table"""
+    if report is None:
+        report = get_report()
+    lines = ["{:<14} {:>8} {:>9} {:>9} {:>9} {:>9}".format(
+             "stage", "count", "mean ms", "p50 ms", "p99 ms", "max ms")]
+    for stage in STAGES[1:] + ["total"]:
+        if stage not in report:
+            continue
+        s = report[stage]
+        lines.append("{:<14} {:>8} {:>9.3f} {:>9} {:>9} {:>9.3f}".format(
+                     stage, s["count"], s["mean"] * 1000.0, s["p50"],
+                     s["p99"], s["max"] * 1000.0))
+    lines.append("{} traces started, {} incomplete".format(
+                 report["started"], report["incomplete"]))
+    return "\n".join(lines)
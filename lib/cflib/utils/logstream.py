@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Export of the log blocks of a Crazyflie as named rings in shared memory, so
+that other processes on the same computer can read the samples live without
+touching the link or the client.
+
+Each block with data becomes a file in /dev/shm (or the temporary directory
+when there is none) named <prefix>-<block name>. The file starts with a
+header, followed by a ring of fixed width records:
+
+ * magic "CFLS", version (<H) and flags (<H, bit 0 set once closed)
+ * header size, record size, capacity in records and schema length (<IIII)
+ * number of records written since the start (<Q), updated after each record
+ * the schema as JSON: {"name", "id", "period_ms", "format", "fields"} with
+   fields the list of {"name", "type", "offset"} of the record
+
+A record is the time the sample was received (double), the log timestamp
+(uint32_t) and the variables of the block with their fetch types, packed
+without padding. Record n is at index n % capacity of the ring, the oldest
+records are overwritten so a slow reader never holds up the client.
+
+A LogStreamReader attaches to a stream by path. Its records() is a NumPy
+structured array viewing the ring without any copy, read_new() returns the
+records written since the last call in order.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['LogStreamExporter', 'LogStreamReader', 'list_streams']
+
+import os
+import re
+import json
+import glob
+import mmap
+import time
+import struct
+import logging
+import tempfile
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from cflib.crazyflie.log import LogTocElement
+
+logger = logging.getLogger(__name__)
+
+MAGIC = "CFLS"
+VERSION = 1
+FLAG_CLOSED = 0x01
+
+HEADER = struct.Struct("<4sHHIIIIQ")
+FLAGS_OFFSET = 6
+WRITTEN_OFFSET = 24
+FLAGS = struct.Struct("<H")
+WRITTEN = struct.Struct("<Q")
+
+# Fields added before the variables of the block
+RECORD_PREFIX = [("time", "double", "d"), ("timestamp", "uint32_t", "I")]
+
+# Default number of records of a ring
+DEFAULT_CAPACITY = 4096
+
+# NumPy types of the types of the schema
+NUMPY_TYPES = {"uint8_t": "<u1", "uint16_t": "<u2", "uint32_t": "<u4",
+               "int8_t": "<i1", "int16_t": "<i2", "int32_t": "<i4",
+               "FP16": "<i2", "float": "<f4", "double": "<f8"}
+
+
+def default_directory():
+    """Return the directory where the streams are created by default"""
+    if os.path.isdir("/dev/shm"):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+def list_streams(prefix="cflog", directory=None):
+    """Return the paths of the streams with the prefix"""
+    return sorted(glob.glob(os.path.join(directory or default_directory(),
+                                         prefix + "-*")))
+
+
+def _schema(logconf):
+    """Return the schema and the struct of the records of a log block"""
+    fields = list(RECORD_PREFIX)
+    for var in logconf.variables:
+        fields.append((var.name,
+                       LogTocElement.get_cstring_from_id(var.fetch_as),
+                       LogTocElement.get_unpack_string_from_id(
+                           var.fetch_as)[1:]))
+    record = struct.Struct("<" + "".join(code for (_, _, code) in fields))
+    offsets = []
+    offset = 0
+    for (name, ctype, code) in fields:
+        offsets.append({"name": name, "type": ctype, "offset": offset})
+        offset += struct.calcsize("<" + code)
+    schema = {"name": logconf.name,
+              "id": logconf.id,
+              "period_ms": logconf.period_in_ms,
+              "format": record.format,
+              "fields": offsets}
+    return (schema, record)
+
+
+class _StreamWriter():
+    """Writes the samples of one log block to its ring"""
+
+    def __init__(self, path, logconf, capacity):
+        self.path = path
+        self.logconf = logconf
+        (schema, self._record) = _schema(logconf)
+        self._names = [var.name for var in logconf.variables]
+        schema_data = json.dumps(schema)
+        self._header_size = (HEADER.size + len(schema_data) + 63) & ~63
+        self._capacity = capacity
+        size = self._header_size + capacity * self._record.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0644)
+        try:
+            os.ftruncate(fd, size)
+            self._buf = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        HEADER.pack_into(self._buf, 0, MAGIC, VERSION, 0, self._header_size,
+                         self._record.size, capacity, len(schema_data), 0)
+        self._buf[HEADER.size:HEADER.size + len(schema_data)] = schema_data
+        self._written = 0
+
+    def write(self, timestamp, data):
+        offset = (self._header_size +
+                  (self._written % self._capacity) * self._record.size)
+        self._record.pack_into(self._buf, offset, time.time(), timestamp,
+                               *[data[name] for name in self._names])
+        self._written += 1
+        WRITTEN.pack_into(self._buf, WRITTEN_OFFSET, self._written)
+
+    def close(self):
+        """Mark the stream as closed for the readers and remove it"""
+        FLAGS.pack_into(self._buf, FLAGS_OFFSET, FLAG_CLOSED)
+        self._buf.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class LogStreamExporter():
+    """
+    Export the log blocks of a Crazyflie with data as shared memory streams.
+    A stream is created with the first sample of a block and removed when
+    the link is closed, or when a new block with the same name replaces it.
+    """
+
+    def __init__(self, crazyflie, prefix="cflog", directory=None,
+                 capacity=DEFAULT_CAPACITY):
+        self._cf = crazyflie
+        self._prefix = prefix
+        self._directory = directory or default_directory()
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        # The writers by block name, the blocks exported and the ones that
+        # could not be
+        self._writers = {}
+        self._blocks = []
+        self._failed = set()
+
+    def start(self):
+        self._cf.log.block_added_cb.add_callback(self._block_added)
+        self._cf.disconnected.add_callback(self._disconnected)
+        for logconf in self._cf.log.log_blocks:
+            self._block_added(logconf)
+
+    def stop(self):
+        self._cf.log.block_added_cb.remove_callback(self._block_added)
+        self._cf.disconnected.remove_callback(self._disconnected)
+        self._close_all()
+
+    def get_streams(self):
+        """Return the paths of the streams by block name"""
+        with self._lock:
+            return dict((name, writer.path)
+                        for (name, writer) in self._writers.items())
+
+    def _path(self, name):
+        return os.path.join(self._directory, "%s-%s" % (
+            self._prefix, re.sub(r"[^A-Za-z0-9_.-]", "_", name)))
+
+    def _block_added(self, logconf):
+        with self._lock:
+            self._blocks.append(logconf)
+        logconf.data_received_cb.add_callback(self._data_received)
+
+    def _data_received(self, timestamp, data, logconf):
+        with self._lock:
+            if logconf in self._failed:
+                return
+            writer = self._writers.get(logconf.name)
+            if writer is None or writer.logconf is not logconf:
+                if writer is not None:
+                    writer.close()
+                path = self._path(logconf.name)
+                try:
+                    writer = _StreamWriter(path, logconf, self._capacity)
+                except (IOError, OSError) as e:
+                    logger.warning("Cannot export %s to %s: %s",
+                                   logconf.name, path, e)
+                    self._failed.add(logconf)
+                    return
+                logger.info("Exporting log block %s to %s", logconf.name,
+                            path)
+                self._writers[logconf.name] = writer
+            writer.write(timestamp, data)
+
+    def _disconnected(self, link_uri):
+        self._close_all()
+
+    def _close_all(self):
+        with self._lock:
+            blocks = self._blocks
+            writers = self._writers.values()
+            self._blocks = []
+            self._writers = {}
+            self._failed = set()
+        for logconf in blocks:
+            logconf.data_received_cb.remove_callback(self._data_received)
+        for writer in writers:
+            writer.close()
+
+
+class LogStreamReader():
+    """
+    Read a log stream exported by a LogStreamExporter, see the module
+    documentation for the format.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            self._buf = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        (magic, version, _, self._header_size, record_size, self.capacity,
+         schema_length, _) = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self._buf.close()
+            raise ValueError("%s is not a version %d log stream" %
+                             (path, VERSION))
+        self.schema = json.loads(
+            self._buf[HEADER.size:HEADER.size + schema_length])
+        self.names = [field["name"] for field in self.schema["fields"]]
+        self._record = struct.Struct(str(self.schema["format"]))
+        assert self._record.size == record_size
+        # Number of records read by read_new() and records lost because
+        # they were overwritten before being read
+        self.read = self.written
+        self.lost = 0
+
+    @property
+    def written(self):
+        """Number of records written since the stream was created"""
+        return WRITTEN.unpack_from(self._buf, WRITTEN_OFFSET)[0]
+
+    @property
+    def closed(self):
+        """True once the exporter has removed the stream"""
+        return bool(FLAGS.unpack_from(self._buf, FLAGS_OFFSET)[0] &
+                    FLAG_CLOSED)
+
+    def dtype(self):
+        """Return the NumPy dtype of the records"""
+        fields = self.schema["fields"]
+        return numpy.dtype({"names": [str(f["name"]) for f in fields],
+                            "formats": [NUMPY_TYPES[f["type"]]
+                                        for f in fields],
+                            "offsets": [f["offset"] for f in fields],
+                            "itemsize": self._record.size})
+
+    def records(self):
+        """
+        Return the ring as a NumPy structured array, without copying. Record
+        n is at index n % capacity and can be overwritten at any time.
+        """
+        if numpy is None:
+            raise ImportError("NumPy is needed for records()")
+        return numpy.frombuffer(self._buf, dtype=self.dtype(),
+                                count=self.capacity,
+                                offset=self._header_size)
+
+    def read_new(self):
+        """
+        Return the records written since the last call in order, as a NumPy
+        array if NumPy is available and as a list of tuples otherwise
+        """
+        written = self.written
+        first = max(self.read, written - self.capacity)
+        self.lost += first - self.read
+        if numpy is not None:
+            ring = self.records()
+            indexes = numpy.arange(first, written) % self.capacity
+            new = ring[indexes]
+        else:
+            new = [self._record.unpack_from(
+                self._buf,
+                self._header_size + (n % self.capacity) * self._record.size)
+                for n in xrange(first, written)]
+        # Drop what the writer overwrote while it was copied, including the
+        # record it might be writing
+        overwritten = self.written + 1 - self.capacity - first
+        if overwritten > 0:
+            self.lost += overwritten
+            new = new[overwritten:]
+        self.read = written
+        return new
+
+    def close(self):
+        self._buf.close()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Ring buffer of messages in shared memory, used to pass data between two
+processes without copying it through a pipe. There must be exactly one
+writer and one reader.
+
+The shared memory starts with a header of three counters: the total number
+of bytes written, the total number of bytes read and the number of messages
+dropped because the ring was full. Each message is stored as its length
+(<I) followed by its bytes, wrapping around the end of the ring. The writer
+only updates the written and dropped counters and the reader only the read
+counter, so no lock is needed.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['ShmRing']
+
+import mmap
+import struct
+import logging
+
+logger = logging.getLogger(__name__)
+
+COUNTER = struct.Struct("<Q")
+LENGTH = struct.Struct("<I")
+
+WRITTEN_OFFSET = 0
+READ_OFFSET = 8
+DROPPED_OFFSET = 16
+HEADER_SIZE = 64
+
+# Default size of the data part of the ring
+RING_SIZE = 1 << 20
+
+
+class ShmRing():
+    """
+    Single writer, single reader ring of messages in an anonymous shared
+    mapping. Create it before forking so that both processes share it.
+    """
+
+    def __init__(self, size=RING_SIZE):
+        self.size = size
+        self._buf = mmap.mmap(-1, HEADER_SIZE + size)
+        # Local copies of the counters owned by this side
+        self._written = 0
+        self._read = 0
+        self._dropped = 0
+
+    def _get(self, offset):
+        return COUNTER.unpack_from(self._buf, offset)[0]
+
+    def put(self, message):
+        """Write a message, return False if it was dropped"""
+        length = LENGTH.size + len(message)
+        if length > self.size - (self._written - self._get(READ_OFFSET)):
+            self._dropped += 1
+            COUNTER.pack_into(self._buf, DROPPED_OFFSET, self._dropped)
+            return False
+        self._copy_in(self._written, LENGTH.pack(len(message)) + message)
+        self._written += length
+        # Publish the message once it is completely written
+        COUNTER.pack_into(self._buf, WRITTEN_OFFSET, self._written)
+        return True
+
+    def get_all(self):
+        """Return the messages written since the last call"""
+        written = self._get(WRITTEN_OFFSET)
+        messages = []
+        pos = self._read
+        while pos < written:
+            length = LENGTH.unpack(self._copy_out(pos, LENGTH.size))[0]
+            messages.append(self._copy_out(pos + LENGTH.size, length))
+            pos += LENGTH.size + length
+        if pos != self._read:
+            self._read = pos
+            COUNTER.pack_into(self._buf, READ_OFFSET, pos)
+        return messages
+
+    def _copy_in(self, pos, data):
+        start = pos % self.size
+        first = min(len(data), self.size - start)
+        self._buf[HEADER_SIZE + start:HEADER_SIZE + start + first] = \
+            data[:first]
+        if first < len(data):
+            self._buf[HEADER_SIZE:HEADER_SIZE + len(data) - first] = \
+                data[first:]
+
+    def _copy_out(self, pos, length):
+        start = pos % self.size
+        first = min(length, self.size - start)
+        data = self._buf[HEADER_SIZE + start:HEADER_SIZE + start + first]
+        if first < length:
+            data += self._buf[HEADER_SIZE:HEADER_SIZE + length - first]
+        return data
+
+    def get_stats(self):
+        """Return the counters of the ring as a dict"""
+        written = self._get(WRITTEN_OFFSET)
+        read = self._get(READ_OFFSET)
+        return {"size": self.size,
+                "depth": written - read,
+                "written": written,
+                "dropped": self._get(DROPPED_OFFSET)}
+
+    def close(self):
+        self._buf.close()
@@ -0,0 +1,501 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2011-2013 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+
+"""
+Fan-out of the telemetry of one Crazyflie to local clients.
+
+The TelemetryServer runs in the process owning the link and re-publishes the
+decoded log blocks, the console text and the link statistics to any number
+of clients connected over TCP or UNIX sockets, so that extra consumers do
+not add any radio load.
+
+Every message is a frame of a 3 bytes header, the frame type and the payload
+length (<BH), followed by the payload. The definitions are sent as JSON
+once, the log data is packed binary:
+
+ * HELLO     (server) JSON {"version", "uri"}
+ * SUBSCRIBE (client) JSON {"blocks": [names], "variables": [names],
+                            "console": bool, "link": bool}
+ * STREAM    (server) <B stream id + JSON {"block", "variables", "format"}
+ * DATA      (server) <BI stream id and timestamp + values packed with the
+                      format of the stream
+ * CONSOLE   (server) console text
+ * LINK      (server) <B latest link quality in percent, once per second
+ * STATS     (server) JSON link queue statistics and frames dropped for the
+                      client, once per second
+ * STATE     (server) JSON {"state", "uri"} on connection changes
+
+A stream is a subscribed subset of the variables of one log block, the ids
+are local to each client. A subscription replaces the previous one.
+
+Each client has a bounded queue of frames written by the server thread with
+non blocking sockets. When a client does not keep up its data frames are
+dropped (and counted), so a slow client never stalls the link or the other
+clients.
+"""
+
+__author__ = 'Bitcraze AB'
+__all__ = ['TelemetryServer', 'TelemetryClient', 'parse_address']
+
+import os
+import json
+import time
+import errno
+import fcntl
+import select
+import socket
+import struct
+import logging
+import threading
+from collections import deque
+
+from cflib.crazyflie.log import LogTocElement
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+
+HEADER = struct.Struct("<BH")
+
+HELLO = 0
+SUBSCRIBE = 1
+STREAM = 2
+DATA = 3
+CONSOLE = 4
+LINK = 5
+STATS = 6
+STATE = 7
+
+# Seconds between two LINK and STATS frames
+STATS_PERIOD = 1.0
+
+
+def parse_address(address):
+    """
+    Parse an address of the form tcp:<host>:<port> or unix:<path> into
+    (family, sockaddr)
+    """
+    if address.startswith("unix:"):
+        return (socket.AF_UNIX, address[5:])
+    if address.startswith("tcp:"):
+        (host, port) = address[4:].rsplit(":", 1)
+        return (socket.AF_INET, (host or "127.0.0.1", int(port)))
+    raise ValueError("Telemetry address must be tcp:<host>:<port> or "
+                     "unix:<path>, not [%s]" % address)
+
+
+def _frame(frame_type, payload):
+    return HEADER.pack(frame_type, len(payload)) + payload
+
+
+def _split_frames(buf):
+    """Return the complete frames in buf as [(type, payload)] and the rest"""
+    frames = []
+    while len(buf) >= HEADER.size:
+        (frame_type, length) = HEADER.unpack(buf[:HEADER.size])
+        end = HEADER.size + length
+        if len(buf) < end:
+            break
+        frames.append((frame_type, buf[HEADER.size:end]))
+        buf = buf[end:]
+    return (frames, buf)
+
+
+class _Client():
+    """State of one connected client, protected by the server lock"""
+    def __init__(self, sock, queue_size):
+        self.sock = sock
+        self.queue_size = queue_size
+        self.rbuf = ""
+        self.out = deque()
+        self.partial = ""
+        self.blocks = set()
+        self.variables = set()
+        self.console = False
+        self.link = False
+        # Stream (id, names, struct) by block name, None if not subscribed
+        self.streams = {}
+        self.next_stream = 0
+        self.dropped = 0
+
+    def subscribe(self, request):
+        self.blocks = set(request.get("blocks", []))
+        self.variables = set(request.get("variables", []))
+        self.console = bool(request.get("console", False))
+        self.link = bool(request.get("link", False))
+        self.streams = {}
+
+    def queue(self, frame, droppable=False):
+        if droppable and len(self.out) >= self.queue_size:
+            self.dropped += 1
+            return
+        self.out.append(frame)
+
+    def stream(self, logconf):
+        """Return the stream of the block, sending its definition first"""
+        if logconf.name in self.streams:
+            return self.streams[logconf.name]
+        names = []
+        fmt = "<"
+        for var in logconf.variables:
+            if (logconf.name in self.blocks or var.name in self.variables):
+                names.append(var.name)
+                fmt += LogTocElement.types[var.fetch_as][1][1]
+        stream = None
+        if names and self.next_stream < 256:
+            stream = (self.next_stream, names, struct.Struct(fmt))
+            self.next_stream += 1
+            self.queue(_frame(STREAM, struct.pack("<B", stream[0]) +
+                              json.dumps({"block": logconf.name,
+                                          "variables": names,
+                                          "format": fmt})))
+        self.streams[logconf.name] = stream
+        return stream
+
+
+class TelemetryServer():
+    """Re-publish the telemetry of a Crazyflie to local socket clients"""
+
+    def __init__(self, crazyflie, addresses, queue_size=1000):
+        """
+        Listen on the addresses (see parse_address) and publish the data of
+        crazyflie. queue_size is the number of frames that can wait for each
+        client before its data frames are dropped.
+        """
+        self._cf = crazyflie
+        self._addresses = addresses
+        self._queue_size = queue_size
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._listeners = []
+        self._thread = None
+        self._stop = False
+        self._quality = 0
+        (self._wake_r, self._wake_w) = os.pipe()
+        for fd in (self._wake_r, self._wake_w):
+            fcntl.fcntl(fd, fcntl.F_SETFL,
+                        fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+
+    def start(self):
+        """Start listening and publishing"""
+        for address in self._addresses:
+            (family, sockaddr) = parse_address(address)
+            if family == socket.AF_UNIX and os.path.exists(sockaddr):
+                os.unlink(sockaddr)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            if family == socket.AF_INET:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(sockaddr)
+            sock.listen(5)
+            sock.setblocking(False)
+            self._listeners.append(sock)
+            logger.info("Telemetry server listening on %s", address)
+
+        self._cf.log.block_added_cb.add_callback(self._block_added)
+        for logconf in self._cf.log.log_blocks:
+            self._block_added(logconf)
+        self._cf.console.receivedChar.add_callback(self._console)
+        self._cf.linkQuality.add_callback(self._link_quality)
+        self._cf.connected.add_callback(self._connected)
+        self._cf.disconnected.add_callback(self._disconnected)
+        self._cf.connectionLost.add_callback(self._connection_lost)
+
+        self._thread = threading.Thread(target=self._run,
+                                        name="TelemetryServer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Disconnect the clients and stop listening"""
+        self._cf.log.block_added_cb.remove_callback(self._block_added)
+        for logconf in self._cf.log.log_blocks:
+            if self._block_data in logconf.data_received_cb.callbacks:
+                logconf.data_received_cb.remove_callback(self._block_data)
+        self._cf.console.receivedChar.remove_callback(self._console)
+        self._cf.linkQuality.remove_callback(self._link_quality)
+        self._cf.connected.remove_callback(self._connected)
+        self._cf.disconnected.remove_callback(self._disconnected)
+        self._cf.connectionLost.remove_callback(self._connection_lost)
+        self._stop = True
+        self._wake()
+        self._thread.join()
+
+    def get_clients(self):
+        """Return the number of connected clients"""
+        with self._lock:
+            return len(self._clients)
+
+    def _wake(self):
+        try:
+            os.write(self._wake_w, "x")
+        except OSError:
+            # The pipe is full, the server thread will wake up anyway
+            pass
+
+    def _publish(self, make_frame, wanted, droppable=False):
+        """Queue the frame made by make_frame(client) to wanted clients"""
+        queued = False
+        with self._lock:
+            for client in self._clients.values():
+                if wanted(client):
+                    frame = make_frame(client)
+                    if frame:
+                        client.queue(frame, droppable)
+                        queued = True
+        # Only wake up the server thread when there is something to send
+        if queued:
+            self._wake()
+
+    def _block_added(self, logconf):
+        logconf.data_received_cb.add_callback(self._block_data)
+
+    def _block_data(self, timestamp, data, logconf):
+        def make_frame(client):
+            stream = client.stream(logconf)
+            if stream is None:
+                return None
+            (stream_id, names, packer) = stream
+            return _frame(DATA, struct.pack("<BI", stream_id, timestamp) +
+                          packer.pack(*[data[n] for n in names]))
+        self._publish(make_frame, lambda c: c.blocks or c.variables,
+                      droppable=True)
+
+    def _console(self, text):
+        payload = text.encode("utf-8") if isinstance(text, unicode) else text
+        self._publish(lambda c: _frame(CONSOLE, payload),
+                      lambda c: c.console)
+
+    def _link_quality(self, percentage):
+        # Called for every radio transaction, only the latest value is kept
+        # and sent with the statistics
+        self._quality = percentage
+
+    def _state(self, state, uri):
+        payload = json.dumps({"state": state, "uri": uri})
+        self._publish(lambda c: _frame(STATE, payload), lambda c: True)
+
+    def _connected(self, uri):
+        self._state("connected", uri)
+
+    def _disconnected(self, uri):
+        self._state("disconnected", uri)
+
+    def _connection_lost(self, uri, msg):
+        self._state("lost", uri)
+
+    def _publish_stats(self):
+        quality = self._quality
+        self._publish(lambda c: _frame(LINK, struct.pack("<B", quality)),
+                      lambda c: c.link, droppable=True)
+
+        link = self._cf.link
+        stats = {"quality": quality,
+                 "receive": link.get_receive_stats() if link else {},
+                 "send": link.get_send_stats() if link else {}}
+
+        def make_frame(client):
+            stats["dropped"] = client.dropped
+            return _frame(STATS, json.dumps(stats))
+        self._publish(make_frame, lambda c: c.link, droppable=True)
+
+    def _accept(self, listener):
+        try:
+            (sock, _) = listener.accept()
+        except socket.error:
+            return
+        sock.setblocking(False)
+        client = _Client(sock, self._queue_size)
+        client.queue(_frame(HELLO, json.dumps(
+            {"version": PROTOCOL_VERSION, "uri": self._cf.link_uri})))
+        with self._lock:
+            self._clients[sock] = client
+        logger.info("Telemetry client connected")
+
+    def _drop(self, sock):
+        with self._lock:
+            del self._clients[sock]
+        sock.close()
+        logger.info("Telemetry client disconnected")
+
+    def _read(self, sock):
+        try:
+            data = sock.recv(4096)
+        except socket.error as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return
+            data = ""
+        if not data:
+            self._drop(sock)
+            return
+        with self._lock:
+            client = self._clients[sock]
+            (frames, client.rbuf) = _split_frames(client.rbuf + data)
+            for (frame_type, payload) in frames:
+                if frame_type == SUBSCRIBE:
+                    try:
+                        client.subscribe(json.loads(payload))
+                    except ValueError:
+                        logger.warning("Bad telemetry subscription [%s]",
+                                       payload)
+
+    def _write(self, sock):
+        with self._lock:
+            client = self._clients[sock]
+            if not client.partial and client.out:
+                # Send as much as possible in one go
+                client.partial = "".join(client.out)
+                client.out.clear()
+            data = client.partial
+        try:
+            sent = sock.send(data)
+        except socket.error as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return
+            self._drop(sock)
+            return
+        with self._lock:
+            client.partial = client.partial[sent:]
+
+    def _run(self):
+        next_stats = time.time() + STATS_PERIOD
+        while not self._stop:
+            with self._lock:
+                clients = self._clients.keys()
+                writers = [s for (s, c) in self._clients.items()
+                           if c.out or c.partial]
+            timeout = max(next_stats - time.time(), 0)
+            (readable, writable, _) = select.select(
+                self._listeners + clients + [self._wake_r], writers, [],
+                timeout)
+            for sock in readable:
+                if sock is self._wake_r:
+                    try:
+                        os.read(self._wake_r, 4096)
+                    except OSError:
+                        pass
+                elif sock in self._listeners:
+                    self._accept(sock)
+                elif sock in self._clients:
+                    self._read(sock)
+            for sock in writable:
+                if sock in self._clients:
+                    self._write(sock)
+            if time.time() >= next_stats:
+                next_stats = time.time() + STATS_PERIOD
+                self._publish_stats()
+
+        with self._lock:
+            for sock in self._clients.keys():
+                sock.close()
+            self._clients = {}
+        for sock in self._listeners:
+            if sock.family == socket.AF_UNIX:
+                try:
+                    os.unlink(sock.getsockname())
+                except OSError:
+                    pass
+            sock.close()
+        self._listeners = []
+
+
+class TelemetryClient():
+    """Client of a TelemetryServer"""
+
+    def __init__(self, address):
+        (family, sockaddr) = parse_address(address)
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.connect(sockaddr)
+        self._buf = ""
+        # Stream (block, names, struct) by stream id
+        self._streams = {}
+        self.hello = None
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def subscribe(self, blocks=None, variables=None, console=False,
+                  link=False):
+        """
+        Subscribe to the log blocks and variables given by name, to the
+        console and to the link statistics. Replaces the last subscription.
+        """
+        self._streams = {}
+        request = {"blocks": blocks or [], "variables": variables or [],
+                   "console": console, "link": link}
+        self._sock.sendall(_frame(SUBSCRIBE, json.dumps(request)))
+
+    def read(self, timeout=None):
+        """
+        Wait up to timeout seconds (forever if None) for data and return the
+        received events as a list of:
+
+         * ("data", block name, timestamp, {variable name: value})
+         * ("console", text)
+         * ("link", quality)
+         * ("stats", {statistics})
+         * ("state", {"state", "uri"})
+
+        Raises EOFError when the server has closed the connection.
+        """
+        (readable, _, _) = select.select([self._sock], [], [], timeout)
+        if not readable:
+            return []
+        data = self._sock.recv(65536)
+        if not data:
+            raise EOFError("Telemetry server closed the connection")
+        (frames, self._buf) = _split_frames(self._buf + data)
+        events = []
+        for (frame_type, payload) in frames:
+            if frame_type == DATA:
+                (stream_id, timestamp) = struct.unpack("<BI", payload[:5])
+                if stream_id not in self._streams:
+                    continue
+                (block, names, packer) = self._streams[stream_id]
+                values = packer.unpack(payload[5:])
+                events.append(("data", block, timestamp,
+                               dict(zip(names, values))))
+            elif frame_type == STREAM:
+                stream_id = ord(payload[0])
+                definition = json.loads(payload[1:])
+                self._streams[stream_id] = (
+                    definition["block"], definition["variables"],
+                    struct.Struct(str(definition["format"])))
+            elif frame_type == CONSOLE:
+                events.append(("console", payload))
+            elif frame_type == LINK:
+                events.append(("link", ord(payload[0])))
+            elif frame_type == STATS:
+                events.append(("stats", json.loads(payload)))
+            elif frame_type == STATE:
+                events.append(("state", json.loads(payload)))
+            elif frame_type == HELLO:
+                self.hello = json.loads(payload)
+        return events
+
+    def close(self):
+        self._sock.close()
@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 
 from distutils.core import setup
+from distutils.command.build_py import build_py
 import glob
 import os
+import sys
 
 VERSION = '2013.11.99'  # Year.Month.fix  if fix=99 means dev version
 
@@ -17,6 +19,22 @@ with open(os.path.join(os.path.dirname(__file__),
                        "version.py"), "w") as versionpy:
     versionpy.write("VERSION='{}'".format(VERSION))
 
+
+
+class build_py_ui(build_py):
+    """Compile the Qt Designer .ui files to Python modules before building,
+    loading them with uic at startup is slow"""
+    def run(self):
+        try:
+            sys.path.insert(0, os.path.join(os.path.dirname(__file__), "lib"))
+            from cfclient.utils.uiloader import compile_ui_files
+            compile_ui_files(os.path.join(os.path.dirname(__file__),
+                                          "lib", "cfclient"))
+        except ImportError as e:
+            print("Warning: .ui files not compiled, uic will be used "
+                  "({})".format(e))
+        build_py.run(self)
+
 setup(name='cfclient',
       description='Bitcraze Cazyflie nano quadcopter client',
       version=VERSION,
@@ -30,6 +48,7 @@ setup(name='cfclient',
                 'cflib.bootloader', 'cflib.crazyflie', 'cflib.drivers',
                 'cflib.utils', 'cflib.crtp'],
       scripts=['bin/cfclient'],
+      cmdclass={'build_py': build_py_ui},
 
       # Py2exe specifics
       console=['bin/cfclient'],